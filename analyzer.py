@@ -1,22 +1,26 @@
-import google.generativeai as genai
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-def analyze_article(text, api_key):
-    """
-    Analyzes the article text to provide a summary and bias rating.
-    
-    Args:
-        text (str): The text content of the article.
-        api_key (str): The Google Gemini API key.
-        
-    Returns:
-        dict: A dictionary containing 'summary' and 'bias_rating'.
-    """
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        prompt = f"""
+from cache import DEFAULT_CACHE_DIR, DiskCache, content_hash, normalize_text
+from dedup_index import get_dedup_index
+from metrics import count, in_current_context, record, span
+from preprocess import estimate_tokens
+from rate_limiter import INTERACTIVE, get_scheduler, register_model
+
+MODEL_NAME = 'gemini-2.0-flash'
+register_model(
+    MODEL_NAME,
+    requests_per_minute=int(os.environ.get("NEWS_GEMINI_RPM", 15)),
+    tokens_per_minute=int(os.environ.get("NEWS_GEMINI_TPM", 1000000)),
+)
+# Alternative Gemini endpoint (e.g. http://127.0.0.1:8765 for the offline benchmark server).
+GEMINI_API_ENDPOINT = os.environ.get("GEMINI_API_ENDPOINT")
+
+PROMPT_TEMPLATE = """
         You are a helpful news analyst. Please perform the following two tasks on the provided text (which may be a news article or a video transcript):
         
         1. Summarize the news in exactly 5 lines.
@@ -35,8 +39,396 @@ def analyze_article(text, api_key):
         Article Text:
         {text}
         """
+
+CHUNK_PROMPT_TEMPLATE = """
+        You are a helpful news analyst. The text below is part {index} of {count} of a longer news article or video transcript.
+        
+        1. Summarize the news content of this part in at most 5 lines, keeping names, numbers and claims.
+        2. Note any signs of bias in this part (loaded language, one-sided sourcing, omitted context) in one line, or write "None".
+        
+        Format the output exactly as follows:
+        Summary:
+        [Lines]
+        
+        Bias Notes: [Notes]
+        
+        Text:
+        {text}
+        """
+
+REDUCE_PROMPT_TEMPLATE = """
+        You are a helpful news analyst. Below are summaries and bias notes for consecutive parts of one news article or video transcript, in order.
+        Please perform the following two tasks on the whole story:
+        
+        1. Summarize the news in exactly 5 lines.
+        2. Rate it in terms of bias on a scale of 1 to 5, where 1 is neutral and 5 is very biased. Provide only the number.
+        
+        Format the output exactly as follows:
+        Summary:
+        [Line 1]
+        [Line 2]
+        [Line 3]
+        [Line 4]
+        [Line 5]
+        
+        Bias Rating: [Rating]
+        
+        Part Summaries:
+        {text}
+        """
+
+# Texts estimated above this many tokens are analyzed chunk by chunk (map-reduce).
+LONG_DOCUMENT_THRESHOLD = int(os.environ.get("NEWS_LONG_DOCUMENT_THRESHOLD", 8000))
+# Token budget of each chunk in long-document mode.
+CHUNK_TOKENS = int(os.environ.get("NEWS_CHUNK_TOKENS", 3000))
+# Chunks summarized in parallel in long-document mode.
+CHUNK_CONCURRENCY = int(os.environ.get("NEWS_CHUNK_CONCURRENCY", 4))
+
+# Expected response size, counted against the tokens-per-minute limit.
+RESPONSE_TOKENS = 300
+
+# Reuse the analysis of a near-duplicate story (see dedup_index) when caching is on.
+REUSE_NEAR_DUPLICATES = os.environ.get("NEWS_REUSE_NEAR_DUPLICATES", "1").lower() not in ("0", "false", "no")
+
+ANALYSIS_CACHE_PATH = os.environ.get(
+    "NEWS_ANALYSIS_CACHE_PATH", os.path.join(DEFAULT_CACHE_DIR, "analysis.sqlite3")
+)
+ANALYSIS_CACHE_TTL = float(os.environ.get("NEWS_ANALYSIS_CACHE_TTL", 7 * 24 * 3600))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get("NEWS_ANALYSIS_CACHE_MAX_ENTRIES", 10000))
+
+_analysis_cache = None
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache():
+    """Returns the process-wide analysis cache, opening it on first use."""
+    global _analysis_cache
+    with _analysis_cache_lock:
+        if _analysis_cache is None:
+            _analysis_cache = DiskCache(
+                ANALYSIS_CACHE_PATH,
+                ttl=ANALYSIS_CACHE_TTL,
+                max_entries=ANALYSIS_CACHE_MAX_ENTRIES,
+            )
+        return _analysis_cache
+
+
+def analysis_cache_key(text, model_name=MODEL_NAME, prompt_template=PROMPT_TEMPLATE):
+    """Cache key for an analysis: hash of the normalized text, prompt template and model name."""
+    return content_hash(model_name, prompt_template, normalize_text(text))
+
+
+def split_into_chunks(text, max_tokens=CHUNK_TOKENS):
+    """
+    Splits text into chunks of at most max_tokens, breaking on sentence boundaries.
+    
+    A single sentence longer than the budget (common in unpunctuated
+    transcripts) is split on word boundaries instead.
+    
+    Args:
+        text (str): The text to split.
+        max_tokens (int): Token budget per chunk.
         
-        response = model.generate_content(prompt)
+    Returns:
+        list: The chunks, in order.
+    """
+    sentences = []
+    for sentence in re.split(r'(?<=[.!?])\s+', text.strip()):
+        if estimate_tokens(sentence) <= max_tokens:
+            sentences.append(sentence)
+            continue
+        words = []
+        for word in sentence.split():
+            if words and estimate_tokens(" ".join(words + [word])) > max_tokens:
+                sentences.append(" ".join(words))
+                words = []
+            words.append(word)
+        if words:
+            sentences.append(" ".join(words))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence in sentences:
+        tokens = estimate_tokens(sentence)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current = []
+            current_tokens = 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _request_tokens(prompt):
+    """Tokens a request is expected to consume: the prompt plus a typical response."""
+    return estimate_tokens(prompt) + RESPONSE_TOKENS
+
+
+_configure_lock = threading.Lock()
+
+
+@lru_cache(maxsize=32)
+def get_model(api_key):
+    """
+    Returns the GenerativeModel for an API key, creating it on first use.
+    
+    google.generativeai is imported here rather than at module load, so the
+    app starts without it. genai.configure is process-global, so it only runs
+    when a new key is seen, and the model is bound to that key's client right
+    away. Later calls with other keys therefore can't switch it.
+    
+    The SDK has no public per-model client, so this sets GenerativeModel's
+    private _client, but only where the installed SDK still has it.
+    """
+    import google.generativeai as genai
+    try:
+        from google.generativeai.client import get_default_generative_client
+    except ImportError:
+        get_default_generative_client = None
+
+    with _configure_lock:
+        if GEMINI_API_ENDPOINT:
+            genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+        else:
+            genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(MODEL_NAME)
+        # GenerativeModel otherwise looks up the default client lazily, on its first request.
+        if get_default_generative_client is not None and hasattr(model, "_client"):
+            model._client = get_default_generative_client()
+    return model
+
+
+def _generate_content(prompt, api_key, stream=False):
+    return get_model(api_key).generate_content(prompt, stream=stream)
+
+
+def _generate(prompt, api_key, priority=INTERACTIVE):
+    """Sends one prompt to Gemini through the shared scheduler and returns the response text."""
+    with span("gemini"):
+        response = get_scheduler().call(MODEL_NAME, _generate_content, prompt, api_key,
+                                        tokens=_request_tokens(prompt), priority=priority)
         return response.text
+
+
+def _generate_stream(prompt, api_key, priority=INTERACTIVE):
+    """
+    Sends one prompt to Gemini and yields the response text as it arrives.
+    
+    Failures before the first chunk are retried by the scheduler; once output
+    has been yielded, errors are raised to the caller.
+    """
+    start = time.perf_counter()
+    first = True
+    with span("gemini_stream"):
+        response = get_scheduler().call(MODEL_NAME, _generate_content, prompt, api_key, stream=True,
+                                        tokens=_request_tokens(prompt), priority=priority)
+        for chunk in response:
+            try:
+                piece = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. only a finish reason) have no .text.
+                continue
+            if piece:
+                if first:
+                    first = False
+                    record("gemini_first_token", time.perf_counter() - start)
+                yield piece
+
+
+def _reduce_prompt(text, api_key, chunk_tokens, max_workers, priority=INTERACTIVE):
+    """Summarizes the chunks of a long text in parallel and returns the prompt that combines them."""
+    chunks = split_into_chunks(text, chunk_tokens)
+    print(f"Long document: analyzing {len(chunks)} chunks with {max_workers} workers...")
+    count("long_documents")
+    count("chunks", len(chunks))
+    prompts = [CHUNK_PROMPT_TEMPLATE.format(index=i + 1, count=len(chunks), text=chunk)
+               for i, chunk in enumerate(chunks)]
+    with span("analyze_chunks"), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(in_current_context(_generate), prompt, api_key, priority) for prompt in prompts]
+        partials = [future.result() for future in futures]
+    
+    combined = "\n\n".join(f"Part {i + 1}:\n{partial.strip()}" for i, partial in enumerate(partials))
+    return REDUCE_PROMPT_TEMPLATE.format(text=combined)
+
+
+def analyze_long_article(text, api_key, chunk_tokens=CHUNK_TOKENS, max_workers=CHUNK_CONCURRENCY,
+                         priority=INTERACTIVE):
+    """
+    Analyzes a long text by summarizing token-budgeted chunks in parallel, then reducing them.
+    
+    Args:
+        text (str): The text content of the article or transcript.
+        api_key (str): The Google Gemini API key.
+        chunk_tokens (int): Token budget per chunk.
+        max_workers (int): Chunks summarized concurrently.
+        priority (int): rate_limiter.INTERACTIVE or rate_limiter.BATCH.
+        
+    Returns:
+        str: The model output in the same format as analyze_article.
+    """
+    return _generate(_reduce_prompt(text, api_key, chunk_tokens, max_workers, priority), api_key, priority)
+
+
+def _lookup_analysis(text, use_cache, long_document, chunk_tokens):
+    """Returns (cache, key, scope, cached_result); cache is None when caching is off or unavailable."""
+    if long_document:
+        prompt_template = CHUNK_PROMPT_TEMPLATE + REDUCE_PROMPT_TEMPLATE + str(chunk_tokens)
+    else:
+        prompt_template = PROMPT_TEMPLATE
+    key = analysis_cache_key(text, prompt_template=prompt_template)
+    # Near-duplicates only reuse analyses made by the same model and prompt.
+    scope = content_hash(MODEL_NAME, prompt_template)
+    if not use_cache:
+        return None, key, scope, None
+    try:
+        cache = get_analysis_cache()
+        cached = cache.get(key)
     except Exception as e:
+        print(f"Analysis cache unavailable: {e}")
+        return None, key, scope, None
+    if cached is not None:
+        count("cache_hits", cache="analysis")
+        return cache, key, scope, cached
+    if REUSE_NEAR_DUPLICATES:
+        try:
+            # Not copied into the exact cache: that would restart its TTL.
+            cached, similarity = get_dedup_index().find(text, scope)
+            if cached is not None:
+                print(f"Reusing analysis of a near-duplicate story (similarity {similarity:.2f}).")
+                count("cache_hits", cache="near_duplicate")
+                return cache, key, scope, cached
+        except Exception as e:
+            print(f"Near-duplicate index unavailable: {e}")
+    count("cache_misses", cache="analysis")
+    return cache, key, scope, cached
+
+
+def _check_result(result):
+    """Raises if the model produced no text, e.g. because the response was safety-blocked."""
+    if not result.strip():
+        raise ValueError("the model returned no text")
+
+
+def _store_analysis(cache, key, scope, text, result):
+    if cache is None:
+        return
+    try:
+        cache.set(key, result)
+        if REUSE_NEAR_DUPLICATES:
+            get_dedup_index().add(text, result, scope)
+    except Exception as e:
+        print(f"Failed to cache analysis: {e}")
+
+
+def analyze_article(text, api_key, use_cache=True, long_threshold=LONG_DOCUMENT_THRESHOLD,
+                    chunk_tokens=CHUNK_TOKENS, max_workers=CHUNK_CONCURRENCY, priority=INTERACTIVE):
+    """
+    Analyzes the article text to provide a summary and bias rating.
+    
+    Results are cached on disk by content, so analyzing the same text again
+    does not call Gemini, and near-duplicates of already analyzed stories
+    (syndicated wire copy) reuse the stored analysis. Texts longer than long_threshold tokens are split
+    into chunks that are summarized in parallel and then combined. Calls go
+    through the shared rate limiter, which retries 429/5xx responses.
+    
+    Args:
+        text (str): The text content of the article.
+        api_key (str): The Google Gemini API key.
+        use_cache (bool): Whether to read from and write to the analysis cache.
+        long_threshold (int): Estimated token count above which long-document mode is used.
+        chunk_tokens (int): Token budget per chunk in long-document mode.
+        max_workers (int): Chunks summarized concurrently in long-document mode.
+        priority (int): Scheduling lane, rate_limiter.INTERACTIVE or rate_limiter.BATCH.
+        
+    Returns:
+        str: The model output with the summary and bias rating, or an error message.
+    """
+    with span("analyze"):
+        return _analyze_article(text, api_key, use_cache, long_threshold, chunk_tokens, max_workers, priority)
+
+
+def _analyze_article(text, api_key, use_cache, long_threshold, chunk_tokens, max_workers, priority):
+    long_document = estimate_tokens(text) > long_threshold
+    cache, key, scope, cached = _lookup_analysis(text, use_cache, long_document, chunk_tokens)
+    if cached is not None:
+        return cached
+
+    try:
+        if long_document:
+            result = analyze_long_article(text, api_key, chunk_tokens=chunk_tokens, max_workers=max_workers,
+                                          priority=priority)
+        else:
+            result = _generate(PROMPT_TEMPLATE.format(text=text), api_key, priority)
+        _check_result(result)
+    except Exception as e:
+        count("errors", stage="analyze")
         return f"Error analyzing article: {e}"
+
+    _store_analysis(cache, key, scope, text, result)
+    return result
+
+
+def analyze_article_stream(text, api_key, use_cache=True, long_threshold=LONG_DOCUMENT_THRESHOLD,
+                           chunk_tokens=CHUNK_TOKENS, max_workers=CHUNK_CONCURRENCY, priority=INTERACTIVE):
+    """
+    Streaming variant of analyze_article that yields the output as Gemini produces it.
+    
+    A cached result is yielded in one piece. In long-document mode the chunk
+    summaries are computed first and only the final combining call is
+    streamed. The complete output is cached once the stream finishes.
+    
+    Args:
+        Same as analyze_article.
+        
+    Yields:
+        str: Consecutive pieces of the model output. On failure the last piece
+        is an "Error analyzing article" message.
+    """
+    with span("analyze"):
+        long_document = estimate_tokens(text) > long_threshold
+        cache, key, scope, cached = _lookup_analysis(text, use_cache, long_document, chunk_tokens)
+        if cached is not None:
+            yield cached
+            return
+
+        pieces = []
+        try:
+            if long_document:
+                prompt = _reduce_prompt(text, api_key, chunk_tokens, max_workers, priority)
+            else:
+                prompt = PROMPT_TEMPLATE.format(text=text)
+            for piece in _generate_stream(prompt, api_key, priority):
+                pieces.append(piece)
+                yield piece
+            result = "".join(pieces)
+            _check_result(result)
+        except Exception as e:
+            count("errors", stage="analyze")
+            yield f"Error analyzing article: {e}"
+            return
+
+        _store_analysis(cache, key, scope, text, result)
+
+
+def parse_analysis(result):
+    """
+    Splits the model output into its summary and bias rating.
+    
+    Args:
+        result (str): The text returned by analyze_article.
+        
+    Returns:
+        tuple: (summary, bias_rating), either of which may be None if not found.
+    """
+    summary = None
+    bias_rating = None
+    summary_match = re.search(r"Summary:\s*(.*?)\s*Bias Rating:", result, re.DOTALL)
+    if summary_match:
+        summary = summary_match.group(1).strip()
+    rating_match = re.search(r"Bias Rating:\s*(\d)", result)
+    if rating_match:
+        bias_rating = int(rating_match.group(1))
+    return summary, bias_rating
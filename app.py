@@ -1,14 +1,20 @@
 import streamlit as st
-import re
+import time
 from scraper import scrape_article
-from analyzer import analyze_article
+from analyzer import analyze_article_stream, parse_analysis
+from preprocess import preprocess_text
 from youtube_utils import extract_video_id, get_video_transcript
-from video_generator import generate_video
+from jobs import DONE, QUEUED, RUNNING, QueueFullError, get_job_status, submit_video_job
 from utils import send_notification
+from metrics import start_metrics_server, trace
 import os
 
 st.set_page_config(page_title="News Summarizer & Bias Rater", page_icon="📰")
 
+# Expose /metrics (Prometheus) and /metrics.json when a port is configured
+if os.environ.get("NEWS_METRICS_PORT"):
+    start_metrics_server(int(os.environ["NEWS_METRICS_PORT"]))
+
 st.title("📰 News Summarizer & Bias Rater")
 
 with st.sidebar:
@@ -17,6 +23,8 @@ with st.sidebar:
     st.markdown("[Get your API key here](https://aistudio.google.com/app/apikey)")
     
     st.info("Your API key is used locally for this session and is not stored.")
+    
+    show_timings = st.checkbox("Show timing breakdown", value=False)
 
 url = st.text_input("Enter News Article or YouTube URL", placeholder="https://example.com/news-article or https://youtube.com/watch?v=...")
 
@@ -26,62 +34,82 @@ if st.button("Analyze"):
     elif not url:
         st.error("Please enter a URL.")
     else:
-        article_text = None
-        video_id = extract_video_id(url)
+        # Collect per-stage timings for the sidebar breakdown
+        with trace() as request_trace:
+            article_text = None
+            video_id = extract_video_id(url)
         
-        if video_id:
-            with st.spinner("Fetching YouTube transcript..."):
-                transcript_result = get_video_transcript(video_id)
-                if transcript_result and transcript_result.startswith("Error:"):
-                    st.error(f"Could not retrieve transcript. Details: {transcript_result}")
-                elif not transcript_result:
-                    st.error("Could not retrieve transcript. Unknown error.")
-                else:
-                    article_text = transcript_result
-        else:
-            with st.spinner("Scraping article..."):
-                scrape_result = scrape_article(url)
-                if scrape_result:
-                    article_text, top_image, article_images = scrape_result
+            if video_id:
+                with st.spinner("Fetching YouTube transcript..."):
+                    transcript_result = get_video_transcript(video_id)
+                    if transcript_result and transcript_result.startswith("Error:"):
+                        st.error(f"Could not retrieve transcript. Details: {transcript_result}")
+                    elif not transcript_result:
+                        st.error("Could not retrieve transcript. Unknown error.")
+                    else:
+                        article_text = transcript_result
+            else:
+                with st.spinner("Scraping article..."):
+                    scrape_result = scrape_article(url)
+                    if scrape_result:
+                        article_text, top_image, article_images = scrape_result
                     
-                    # Prioritize top_image
-                    final_images = []
-                    if top_image:
-                        final_images.append(top_image)
+                        # Prioritize top_image
+                        final_images = []
+                        if top_image:
+                            final_images.append(top_image)
                     
-                    # Add other images
-                    if article_images:
-                        final_images.extend(article_images)
+                        # Add other images
+                        if article_images:
+                            final_images.extend(article_images)
                         
-                    st.session_state['article_images'] = final_images
-                else:
-                    article_text = None
-                    st.error("Failed to scrape the article. Please check the URL.")
+                        st.session_state['article_images'] = final_images
+                    else:
+                        article_text = None
+                        st.error("Failed to scrape the article. Please check the URL.")
             
-        if article_text:
-            with st.spinner("Analyzing content..."):
+            if article_text:
+                # Strip boilerplate and duplicates before spending tokens on them
+                article_text, preprocess_stats = preprocess_text(article_text)
+                print(f"Preprocessing saved {preprocess_stats['tokens_saved']} of {preprocess_stats['tokens_before']} tokens")
+            
+                # Render the analysis as it streams in instead of behind a spinner
+                output = st.empty()
+                output.caption("Analyzing content...")
+                result = ""
+                start_time = time.perf_counter()
+                first_token_time = None
                 # Pass the user-provided api_key
-                result = analyze_article(article_text, api_key)
-                st.markdown(result)
-                
+                for piece in analyze_article_stream(article_text, api_key):
+                    if first_token_time is None:
+                        first_token_time = time.perf_counter() - start_time
+                    result += piece
+                    output.markdown(result + "▌")
+                output.markdown(result)
+                total_time = time.perf_counter() - start_time
+                if first_token_time is not None:
+                    print(f"Analysis time to first token: {first_token_time:.2f}s, total: {total_time:.2f}s")
+                    st.caption(f"First output after {first_token_time:.2f}s, complete after {total_time:.2f}s.")
+            
                 # Extract summary for video generation
                 try:
-                    summary_match = re.search(r"Summary:\s*(.*?)\s*Bias Rating:", result, re.DOTALL)
-                    if summary_match:
-                        summary_text = summary_match.group(1).strip()
-                        
+                    summary_text, _ = parse_analysis(result)
+                    if summary_text:
                         # Store summary in session state to persist across reruns (button clicks)
                         st.session_state['summary_text'] = summary_text
-                        
+                        # Keeps the story's AI illustration (and cached video segments) across edits
+                        st.session_state['story_id'] = f"youtube:{video_id}" if video_id else url
+                    
                         # Send notification
                         try:
                             notification_msg = f"New Analysis:\nURL: {url}\nSummary: {summary_text[:100]}..."
                             send_notification(notification_msg)
                         except Exception as e:
                             print(f"Notification error: {e}")
-                            
+                        
                 except Exception as e:
                     st.warning(f"Could not parse summary for video generation: {e}")
+        st.session_state['timing_breakdown'] = {'Analysis': request_trace.breakdown()}
 
 # Display Generate Video button if summary is available
 if 'summary_text' in st.session_state:
@@ -89,22 +117,63 @@ if 'summary_text' in st.session_state:
         if not api_key:
              st.error("Please enter your API Key to generate video.")
         else:
-            with st.spinner("Generating video (this may take a moment)..."):
-                # Get images if they exist
-                images = st.session_state.get('article_images', [])
-                # Pass the user-provided api_key
-                video_path = generate_video(st.session_state['summary_text'], api_key=api_key, article_images=images)
-                if video_path:
-                    st.video(video_path)
-                    st.success("Video generated successfully!")
-                    
-                    # Add Download Button
-                    with open(video_path, "rb") as file:
-                        btn = st.download_button(
-                            label="Download Video",
-                            data=file,
-                            file_name="news_summary.mp4",
-                            mime="video/mp4"
-                        )
-                else:
-                    st.error("Failed to generate video.")
+            # Get images if they exist
+            images = st.session_state.get('article_images', [])
+            try:
+                # Rendering runs in a background worker process; this session only polls it
+                st.session_state.pop('video_result', None)
+                st.session_state['video_job'] = submit_video_job(st.session_state['summary_text'], api_key=api_key,
+                                                                 article_images=images,
+                                                                 story_id=st.session_state.get('story_id'))
+            except QueueFullError as e:
+                st.error(f"The video queue is full. {e}")
+            except Exception as e:
+                st.error(f"Could not start video generation: {e}")
+
+# Poll the background video job, re-running the script until it finishes
+if 'video_job' in st.session_state:
+    job = get_job_status(st.session_state['video_job'])
+    if job is None:
+        st.error("The video job was not found. It may have expired; please generate it again.")
+        st.session_state.pop('video_job')
+    elif job['state'] in (QUEUED, RUNNING):
+        stage = "Waiting for a free worker" if job['state'] == QUEUED else f"Generating video: {job['stage']}"
+        st.progress(job.get('progress', 0.0), text=f"{stage}...")
+        time.sleep(1)
+        st.rerun()
+    else:
+        # The job has finished; job cleanup may delete its status later, so stop polling it
+        st.session_state.pop('video_job')
+        if job['state'] == DONE:
+            st.session_state['video_result'] = job
+            if job.get('timings'):
+                st.session_state.setdefault('timing_breakdown', {})['Video'] = job['timings']
+        else:
+            st.error(f"Failed to generate video. {job.get('error', '')}")
+
+# Keep showing the finished video on later reruns while its file exists
+if 'video_result' in st.session_state:
+    video_path = st.session_state['video_result']['output_path']
+    if not os.path.exists(video_path):
+        st.session_state.pop('video_result')
+    else:
+        st.video(video_path)
+        st.success("Video generated successfully!")
+        
+        # Add Download Button
+        with open(video_path, "rb") as file:
+            btn = st.download_button(
+                label="Download Video",
+                data=file,
+                file_name="news_summary.mp4",
+                mime="video/mp4"
+            )
+
+# Per-request timing breakdown (stages nest and media stages overlap, so they don't add up)
+if show_timings and st.session_state.get('timing_breakdown'):
+    with st.sidebar:
+        st.header("Timing Breakdown")
+        for request_name, stages in st.session_state['timing_breakdown'].items():
+            st.subheader(request_name)
+            st.table([{"Stage": stage["stage"], "Seconds": round(stage["seconds"], 3), "Calls": stage["calls"]}
+                      for stage in stages])
@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+
+from scraper import scrape_article
+from analyzer import analyze_article, get_analysis_cache, parse_analysis
+from metrics import get_metrics
+from preprocess import preprocess_text
+from rate_limiter import BATCH
+from youtube_utils import extract_playlist_id, extract_video_id, get_playlist_video_ids, get_video_transcript
+
+DEFAULT_SCRAPE_CONCURRENCY = 8
+DEFAULT_TRANSCRIPT_CONCURRENCY = 4
+DEFAULT_ANALYZE_CONCURRENCY = 4
+
+
+def read_urls(source):
+    """
+    Reads URLs from a file, one per line. Blank lines and lines starting with '#' are skipped.
+
+    Args:
+        source (str): Path to the file, or '-' to read from stdin.
+
+    Returns:
+        list: The URLs in file order.
+    """
+    if source == '-':
+        lines = sys.stdin.readlines()
+    else:
+        with open(source, encoding='utf-8') as f:
+            lines = f.readlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
+def expand_playlists(urls):
+    """
+    Replaces YouTube playlist URLs with watch URLs for each of their videos.
+
+    Args:
+        urls (list): News article, YouTube video and YouTube playlist URLs.
+
+    Returns:
+        list: The URLs with playlists expanded in place.
+    """
+    expanded = []
+    for url in urls:
+        if url.startswith("http") and not extract_video_id(url) and extract_playlist_id(url):
+            try:
+                video_ids = get_playlist_video_ids(url)
+                print(f"Expanded playlist {url} into {len(video_ids)} videos.", file=sys.stderr)
+                expanded.extend(f"https://www.youtube.com/watch?v={video_id}" for video_id in video_ids)
+                continue
+            except Exception as e:
+                print(f"Could not expand playlist {url}: {e}", file=sys.stderr)
+        expanded.append(url)
+    return expanded
+
+
+def new_record(url):
+    """Returns an empty result record for a URL."""
+    return {"url": url, "source": None, "summary": None, "bias_rating": None,
+            "analysis": None, "images": [], "tokens_saved": 0, "error": None}
+
+
+def _limit(limits, stage):
+    return limits[stage] if limits else nullcontext()
+
+
+def fetch_text(record, limits=None):
+    """
+    Scrapes the record's article or fetches its YouTube transcript, then preprocesses the text.
+
+    Fills in the record's source, images and tokens_saved.
+
+    Args:
+        record (dict): A record from new_record.
+        limits (dict): Semaphores keyed by 'scrape' and 'transcript', or None for no limit.
+
+    Returns:
+        str: The cleaned text, or None with record["error"] set.
+    """
+    url = record["url"]
+    video_id = extract_video_id(url)
+    if video_id:
+        record["source"] = "youtube"
+        with _limit(limits, "transcript"):
+            transcript_result = get_video_transcript(video_id)
+        if not transcript_result or transcript_result.startswith("Error"):
+            record["error"] = transcript_result or "Could not retrieve transcript."
+            return None
+        article_text = transcript_result
+    else:
+        record["source"] = "article"
+        with _limit(limits, "scrape"):
+            scrape_result = scrape_article(url)
+        if not scrape_result:
+            record["error"] = "Failed to scrape the article."
+            return None
+        article_text, top_image, article_images = scrape_result
+        if top_image:
+            record["images"].append(top_image)
+        if article_images:
+            record["images"].extend(article_images)
+
+    article_text, preprocess_stats = preprocess_text(article_text)
+    record["tokens_saved"] = preprocess_stats["tokens_saved"]
+    return article_text
+
+
+def analyze_text(record, text, api_key, limits=None, use_cache=True):
+    """
+    Analyzes text in the batch lane and fills in the record's analysis, summary and bias rating.
+
+    Args:
+        record (dict): The record the text belongs to.
+        text (str): Text returned by fetch_text.
+        api_key (str): The Google Gemini API key.
+        limits (dict): Semaphores keyed by 'analyze', or None for no limit.
+        use_cache (bool): Whether to use the analysis cache.
+    """
+    with _limit(limits, "analyze"):
+        result = analyze_article(text, api_key, use_cache=use_cache, priority=BATCH)
+    record["analysis"] = result
+    if result.startswith("Error analyzing article"):
+        record["error"] = result
+        return
+    record["summary"], record["bias_rating"] = parse_analysis(result)
+
+
+def process_url(url, api_key, limits, use_cache=True):
+    """
+    Runs a single URL through fetching and analysis, holding the stage limit for each step.
+
+    Args:
+        url (str): The news article or YouTube URL.
+        api_key (str): The Google Gemini API key.
+        limits (dict): Semaphores keyed by 'scrape', 'transcript' and 'analyze'.
+        use_cache (bool): Whether to use the analysis cache.
+
+    Returns:
+        dict: The result record for this URL.
+    """
+    record = new_record(url)
+    try:
+        article_text = fetch_text(record, limits)
+        if article_text is not None:
+            analyze_text(record, article_text, api_key, limits, use_cache=use_cache)
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def run_batch(urls, api_key, scrape_concurrency=DEFAULT_SCRAPE_CONCURRENCY,
+              transcript_concurrency=DEFAULT_TRANSCRIPT_CONCURRENCY,
+              analyze_concurrency=DEFAULT_ANALYZE_CONCURRENCY, use_cache=True):
+    """
+    Scrapes, fetches transcripts for and analyzes many URLs concurrently.
+
+    Each stage has its own concurrency limit, so slow Gemini calls don't hold back
+    scraping and vice versa. Results are yielded as soon as each URL finishes, not
+    in input order.
+
+    Args:
+        urls (iterable): The news article or YouTube URLs.
+        api_key (str): The Google Gemini API key.
+        scrape_concurrency (int): Maximum concurrent article scrapes.
+        transcript_concurrency (int): Maximum concurrent transcript fetches.
+        analyze_concurrency (int): Maximum concurrent Gemini calls.
+        use_cache (bool): Whether to reuse and store analyses in the analysis cache.
+
+    Yields:
+        dict: One result record per URL, see process_url.
+    """
+    limits = {
+        "scrape": threading.BoundedSemaphore(scrape_concurrency),
+        "transcript": threading.BoundedSemaphore(transcript_concurrency),
+        "analyze": threading.BoundedSemaphore(analyze_concurrency),
+    }
+    # Each worker holds at most one stage slot at a time, so this many threads
+    # can fill every stage's slots. That keeps the I/O-bound stages (fetching,
+    # transcripts, model calls) busy; CPU-bound work such as preprocessing and
+    # the near-duplicate lookup still runs one thread at a time under the GIL.
+    max_workers = scrape_concurrency + transcript_concurrency + analyze_concurrency
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(process_url, url, api_key, limits, use_cache) for url in urls]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize and rate the bias of many news/YouTube URLs.")
+    parser.add_argument("input", help="File with one URL per line, or '-' for stdin.")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout).")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"),
+                        help="Google Gemini API key (default: $GEMINI_API_KEY).")
+    parser.add_argument("--scrape-concurrency", type=int, default=DEFAULT_SCRAPE_CONCURRENCY)
+    parser.add_argument("--transcript-concurrency", type=int, default=DEFAULT_TRANSCRIPT_CONCURRENCY)
+    parser.add_argument("--analyze-concurrency", type=int, default=DEFAULT_ANALYZE_CONCURRENCY)
+    parser.add_argument("--no-cache", action="store_true", help="Analyze every URL again, ignoring cached analyses.")
+    parser.add_argument("--metrics", help="Write stage timings and counters to this file "
+                                          "(Prometheus text format, or JSON if it ends in .json).")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("a Gemini API key is required (--api-key or $GEMINI_API_KEY)")
+
+    urls = expand_playlists(read_urls(args.input))
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    failed = 0
+    try:
+        for record in run_batch(urls, args.api_key,
+                                scrape_concurrency=args.scrape_concurrency,
+                                transcript_concurrency=args.transcript_concurrency,
+                                analyze_concurrency=args.analyze_concurrency,
+                                use_cache=not args.no_cache):
+            if record["error"]:
+                failed += 1
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Processed {len(urls)} URLs ({failed} failed).", file=sys.stderr)
+    stats = get_analysis_cache().stats()
+    print(f"Analysis cache: {stats['hits']} hits, {stats['misses']} misses.", file=sys.stderr)
+    if args.metrics:
+        metrics = get_metrics()
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(metrics.to_json() if args.metrics.endswith(".json") else metrics.to_prometheus())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
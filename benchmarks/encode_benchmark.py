@@ -0,0 +1,93 @@
+"""
+Compares encode time and file size of the summary-video encoders.
+
+Renders a synthetic slideshow (text overlays on noise backgrounds with a
+silent audio track) through the original moviepy path and the fast ffmpeg
+path, then prints a table and optionally writes JSON.
+
+    python benchmarks/encode_benchmark.py --slides 5 --seconds 30 --json encode.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from video_encoding import (MOVIEPY_BASELINE_SETTINGS, encode_slideshow_ffmpeg,
+                            encode_slideshow_moviepy, get_ffmpeg_exe)
+from video_generator import create_text_overlay
+
+CONFIGS = [
+    ("moviepy baseline (24 fps, medium, crf 23)", encode_slideshow_moviepy, MOVIEPY_BASELINE_SETTINGS),
+    ("fast (concat, veryfast, crf 28)", encode_slideshow_ffmpeg, {"mode": "fast"}),
+    ("fast (concat, ultrafast, crf 30)", encode_slideshow_ffmpeg, {"mode": "fast", "preset": "ultrafast", "crf": 30}),
+    ("fast 720p->480p", encode_slideshow_ffmpeg, {"mode": "fast", "resolution": (854, 480)}),
+]
+
+
+def make_slides(count, size=(1280, 720), seed=0):
+    rng = np.random.default_rng(seed)
+    slides = []
+    for i in range(count):
+        noise = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+        base = Image.fromarray(noise)
+        slides.append(create_text_overlay(f"Benchmark slide {i + 1}: a sentence of typical summary length for the narration.", base, size))
+    return slides
+
+
+def make_silent_audio(path, seconds):
+    subprocess.run([get_ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "lavfi", "-i",
+                    "anullsrc=r=24000:cl=mono", "-t", str(seconds), "-c:a", "libmp3lame", path], check=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slides", type=int, default=5)
+    parser.add_argument("--seconds", type=float, default=30.0, help="Total video length.")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    slides = make_slides(args.slides)
+    durations = [args.seconds / args.slides] * args.slides
+    results = []
+    with tempfile.TemporaryDirectory(prefix="encode_bench_") as workdir:
+        audio_path = os.path.join(workdir, "silence.mp3")
+        make_silent_audio(audio_path, args.seconds)
+        for name, encoder, settings in CONFIGS:
+            times = []
+            for run in range(args.repeat):
+                run_dir = tempfile.mkdtemp(dir=workdir)
+                output_path = os.path.join(run_dir, "out.mp4")
+                start = time.perf_counter()
+                encoder(slides, durations, audio_path, output_path, run_dir, settings)
+                times.append(time.perf_counter() - start)
+            results.append({
+                "config": name,
+                "settings": dict(settings),
+                "encode_seconds": min(times),
+                "file_bytes": os.path.getsize(output_path),
+            })
+
+    baseline = results[0]
+    print(f"{'config':45} {'time (s)':>9} {'speedup':>8} {'size (KB)':>10}")
+    for r in results:
+        speedup = baseline["encode_seconds"] / r["encode_seconds"] if r["encode_seconds"] else float("inf")
+        r["speedup"] = speedup
+        print(f"{r['config']:45} {r['encode_seconds']:9.2f} {speedup:7.1f}x {r['file_bytes'] / 1024:10.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"slides": args.slides, "seconds": args.seconds, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Compares throughput of the fallback extractors on large pages.
+
+Runs scrape_with_bs4 and scrape_with_lxml over the fixture articles, and
+over copies padded with a long comment thread (thousands of paragraphs
+and avatar images after the story, as on busy news sites). lxml is run
+with early termination both on (the default max_chars) and off, to separate
+the parser speedup from the benefit of not reading the whole page.
+
+    python benchmarks/extract_benchmark.py --repeat 20 --comments 5000 --json extract.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from scraper import MAX_ARTICLE_CHARS, scrape_with_bs4, scrape_with_lxml
+
+FIXTURES = ["article_short", "article_syndicated", "article_long"]
+PAGE_URL = "https://news.example.com/world/2024/story.html"
+
+
+def load_fixture(name):
+    with open(os.path.join(BENCH_DIR, "fixtures", f"{name}.html"), encoding="utf-8") as f:
+        # Relative image paths exercise URL resolution.
+        return f.read().replace("{{BASE}}", "")
+
+
+def with_comments(html, comments):
+    thread = "".join(
+        f'<div class="comment"><img src="/avatars/{i}.png" alt="avatar">'
+        f"<p>Reader comment {i}: I think the article misses the bigger picture on this one, again.</p></div>"
+        for i in range(comments)
+    )
+    return html.replace("</body>", f'<section class="comments">{thread}</section></body>')
+
+
+def build_pages(comments):
+    pages = {}
+    for name in FIXTURES:
+        html = load_fixture(name)
+        pages[name] = html.encode("utf-8")
+        pages[f"{name}+{comments}_comments"] = with_comments(html, comments).encode("utf-8")
+    return pages
+
+
+def time_extractor(extract, html, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = extract(PAGE_URL, html)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--comments", type=int, default=5000, help="Comments appended to the padded pages.")
+    parser.add_argument("--max-chars", type=int, default=MAX_ARTICLE_CHARS,
+                        help="Early termination threshold for lxml (default: %(default)s).")
+    parser.add_argument("--json", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    extractors = [
+        ("bs4", scrape_with_bs4),
+        ("lxml (full page)", lambda url, html: scrape_with_lxml(url, html, max_chars=float("inf"))),
+        ("lxml (early stop)", lambda url, html: scrape_with_lxml(url, html, max_chars=args.max_chars)),
+    ]
+    results = []
+    print(f"{'page':42} {'KB':>7} {'extractor':18} {'ms':>8} {'MB/s':>7} {'speedup':>8} {'chars':>8} {'imgs':>5}")
+    for page, html in build_pages(args.comments).items():
+        baseline = None
+        for name, extract in extractors:
+            seconds, result = time_extractor(extract, html, args.repeat)
+            baseline = baseline or seconds
+            text, _, images = result or ("", None, [])
+            row = {
+                "page": page,
+                "bytes": len(html),
+                "extractor": name,
+                "seconds": seconds,
+                "mb_per_s": len(html) / seconds / 1e6,
+                "speedup": baseline / seconds,
+                "text_chars": len(text),
+                "images": len(images),
+            }
+            results.append(row)
+            print(f"{page:42} {len(html) / 1024:7.0f} {name:18} {seconds * 1000:8.2f} {row['mb_per_s']:7.1f} "
+                  f"{row['speedup']:7.1f}x {row['text_chars']:8d} {row['images']:5d}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"repeat": args.repeat, "comments": args.comments, "max_chars": args.max_chars,
+                       "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
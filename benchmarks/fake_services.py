@@ -0,0 +1,253 @@
+"""
+Local stand-ins for the services the pipeline talks to, for offline benchmarks.
+
+FakeServer serves, on one local port:
+    * the Gemini REST API (generateContent and streamGenerateContent),
+    * the Imagen REST API (predict),
+    * fixture article pages under /articles/<name>.html,
+    * the fixture image set under /images/<name>, generated once in memory.
+Each kind of response has its own configurable latency.
+
+FakeTranscriptApi stands in for YouTubeTranscriptApi, serving the fixture
+transcripts with an optional delay.
+"""
+import base64
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PIL import Image
+from youtube_transcript_api import FetchedTranscript, FetchedTranscriptSnippet
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+FAKE_ANALYSIS = """Summary:
+Regional officials delayed the bridge repairs after months of negotiations.
+Lawmakers questioned the cost of the project and the timeline.
+The transport agency said a review of the contract is under way.
+Residents have complained about closures and detours for over a year.
+A final decision is expected at the next council session.
+
+Bias Rating: 2
+"""
+
+
+def _make_image(name, size):
+    """Deterministic test image: a gradient with some noise, encoded by extension."""
+    width, height = size
+    rng = random.Random(name)
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    overlay = Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3)))
+    img = Image.blend(img, overlay, 0.5)
+    buffer = BytesIO()
+    fmt = {"jpg": "JPEG", "png": "PNG", "gif": "GIF"}[name.rsplit(".", 1)[1]]
+    img.save(buffer, fmt, **({"quality": 85} if fmt == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+class FakeServer:
+    """
+    Threaded HTTP server impersonating Gemini, Imagen and news sites.
+
+    Args:
+        gemini_latency (float): Seconds before a Gemini response starts.
+        stream_chunk_delay (float): Seconds between streamed Gemini chunks.
+        imagen_latency (float): Seconds per Imagen call.
+        page_latency (float): Seconds per article page.
+        image_latency (float): Seconds per article image.
+    """
+
+    def __init__(self, gemini_latency=0.5, stream_chunk_delay=0.05, imagen_latency=1.0,
+                 page_latency=0.1, image_latency=0.05, host="127.0.0.1", port=0):
+        self.gemini_latency = gemini_latency
+        self.stream_chunk_delay = stream_chunk_delay
+        self.imagen_latency = imagen_latency
+        self.page_latency = page_latency
+        self.image_latency = image_latency
+        self.request_counts = {}
+        self._lock = threading.Lock()
+
+        with open(os.path.join(FIXTURES_DIR, "images.json"), encoding="utf-8") as f:
+            self.images = {name: _make_image(name, size) for name, size in json.load(f).items()}
+        self.imagen_png = base64.b64encode(_make_image("imagen.png", (1408, 768))).decode("ascii")
+
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def article_url(self, name):
+        return f"{self.base_url}/articles/{name}.html"
+
+    def _count(self, kind):
+        with self._lock:
+            self.request_counts[kind] = self.request_counts.get(kind, 0) + 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                match = re.fullmatch(r"/articles/([\w-]+)\.html", path)
+                if match:
+                    server._count("page")
+                    time.sleep(server.page_latency)
+                    try:
+                        with open(os.path.join(FIXTURES_DIR, match.group(1) + ".html"), encoding="utf-8") as f:
+                            html = f.read().replace("{{BASE}}", server.base_url)
+                    except OSError:
+                        return self._send(404, b"not found", "text/plain")
+                    # A unique comment per response, so parse caches can't hide the scrape cost.
+                    html = html.replace("</body>", f"<!-- {uuid.uuid4().hex} --></body>")
+                    return self._send(200, html.encode("utf-8"), "text/html; charset=utf-8",
+                                      {"Cache-Control": "no-store"})
+                match = re.fullmatch(r"/images/([\w.-]+)", path)
+                if match and match.group(1) in server.images:
+                    server._count("image")
+                    time.sleep(server.image_latency)
+                    name = match.group(1)
+                    content_type = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif"}[name.rsplit(".", 1)[1]]
+                    return self._send(200, server.images[name], content_type)
+                self._send(404, b"not found", "text/plain")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                path = self.path.split("?", 1)[0]
+                if path.endswith(":generateContent"):
+                    server._count("gemini")
+                    time.sleep(server.gemini_latency)
+                    return self._send(200, json.dumps(self._gemini_response(FAKE_ANALYSIS, payload)).encode(),
+                                      "application/json")
+                if path.endswith(":streamGenerateContent"):
+                    server._count("gemini_stream")
+                    return self._stream_gemini(payload)
+                if path.endswith(":predict"):
+                    server._count("imagen")
+                    time.sleep(server.imagen_latency)
+                    body = {"predictions": [{"mimeType": "image/png", "bytesBase64Encoded": server.imagen_png}]}
+                    return self._send(200, json.dumps(body).encode(), "application/json")
+                self._send(404, b"{}", "application/json")
+
+            @staticmethod
+            def _gemini_response(text, payload):
+                prompt = json.dumps(payload)
+                return {
+                    "candidates": [{
+                        "content": {"parts": [{"text": text}], "role": "model"},
+                        "finishReason": "STOP",
+                        "index": 0,
+                    }],
+                    "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4},
+                }
+
+            def _stream_gemini(self, payload):
+                # The REST transport reads a JSON array of responses as it arrives.
+                time.sleep(server.gemini_latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                lines = FAKE_ANALYSIS.splitlines(keepends=True)
+                for i, line in enumerate(lines):
+                    part = ("[" if i == 0 else ",") + json.dumps(self._gemini_response(line, payload))
+                    if i == len(lines) - 1:
+                        part += "]"
+                    data = part.encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                    time.sleep(server.stream_chunk_delay)
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
+
+
+class _FakeTranscript:
+    def __init__(self, api, video_id, language_code, segments):
+        self.api = api
+        self.video_id = video_id
+        self.language_code = language_code
+        self.segments = segments
+        self.is_translatable = True
+
+    def translate(self, language_code):
+        return _FakeTranscript(self.api, self.video_id, language_code, self.segments)
+
+    def fetch(self):
+        time.sleep(self.api.latency)
+        rng = random.Random(self.video_id)
+        words = FAKE_ANALYSIS.split()
+        snippets = [FetchedTranscriptSnippet(text=" ".join(rng.choice(words) for _ in range(8)), start=i * 3.0,
+                                             duration=3.0)
+                    for i in range(self.segments)]
+        return FetchedTranscript(snippets=snippets, video_id=self.video_id, language=self.language_code,
+                                 language_code=self.language_code, is_generated=False)
+
+
+class _FakeTranscriptList:
+    def __init__(self, transcripts):
+        self._transcripts = transcripts
+
+    def find_transcript(self, language_codes):
+        for transcript in self._transcripts:
+            if transcript.language_code in language_codes:
+                return transcript
+        raise LookupError(f"No transcript for {language_codes}")
+
+    def __iter__(self):
+        return iter(self._transcripts)
+
+
+class FakeTranscriptApi:
+    """Stands in for YouTubeTranscriptApi (1.x instance API), serving fixtures/transcripts.json."""
+
+    latency = 0.2
+
+    def list(self, video_id):
+        with open(os.path.join(FIXTURES_DIR, "transcripts.json"), encoding="utf-8") as f:
+            fixtures = json.load(f)
+        time.sleep(self.latency / 2)
+        if video_id not in fixtures:
+            raise LookupError(f"No transcripts for {video_id}")
+        spec = fixtures[video_id]
+        return _FakeTranscriptList([_FakeTranscript(type(self), video_id, spec["language_code"], spec["segments"])])
@@ -0,0 +1,225 @@
+"""
+Offline end-to-end benchmark of the news pipeline.
+
+Starts the local stand-ins from fake_services.py, points the app at them and
+drives scrape_article, get_video_transcript, analyze_article (plain and
+streaming), the concurrent batch pipeline and generate_video. For each stage
+it reports latency percentiles, throughput and peak memory, and writes the
+results as JSON so runs on different commits can be compared:
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --output new.json --compare bench.json
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_services import FakeServer, FakeTranscriptApi
+
+ARTICLES = ["article_short", "article_syndicated", "article_long"]
+VIDEO_IDS = ["benchShort1", "benchForgn1", "benchLong01"]
+API_KEY = "offline-benchmark-key"
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, wall_time, peak_bytes=None):
+    result = {
+        "count": len(latencies),
+        "mean_s": sum(latencies) / len(latencies),
+        "p50_s": percentile(latencies, 50),
+        "p90_s": percentile(latencies, 90),
+        "p99_s": percentile(latencies, 99),
+        "min_s": min(latencies),
+        "max_s": max(latencies),
+        "throughput_per_s": len(latencies) / wall_time if wall_time else None,
+    }
+    if peak_bytes is not None:
+        result["peak_traced_mb"] = peak_bytes / 1e6
+    return result
+
+
+def measure(func, inputs, iterations):
+    """Calls func on every input `iterations` times; returns per-call latencies, wall time and traced peak."""
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for item in inputs:
+            t0 = time.perf_counter()
+            func(item)
+            latencies.append(time.perf_counter() - t0)
+    wall_time = time.perf_counter() - start
+
+    # One extra pass under tracemalloc, kept out of the timings because tracing slows Python down.
+    tracemalloc.start()
+    for item in inputs:
+        func(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, wall_time, peak
+
+
+def fake_tts(get_ffmpeg_exe, words_per_second=2.5):
+    """Replaces gTTS with locally generated silence as long as the narration would be."""
+    def synthesize_speech(text, audio_path):
+        seconds = max(1.0, len(text.split()) / words_per_second)
+        subprocess.run([get_ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "lavfi", "-i",
+                        "anullsrc=r=24000:cl=mono", "-t", f"{seconds:.2f}", "-c:a", "libmp3lame", audio_path],
+                       check=True)
+        return audio_path
+    return synthesize_speech
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    server = FakeServer(gemini_latency=args.gemini_latency, imagen_latency=args.imagen_latency,
+                        page_latency=args.page_latency, image_latency=args.image_latency).start()
+    workdir = tempfile.mkdtemp(prefix="news_bench_")
+    # Configure the app before its modules are imported; they read these at import time.
+    os.environ.update({
+        "GEMINI_API_ENDPOINT": server.base_url,
+        "IMAGEN_API_BASE": server.base_url,
+        "NEWS_CACHE_DIR": os.path.join(workdir, "cache"),
+        "NEWS_VIDEO_OUTPUT_DIR": os.path.join(workdir, "videos"),
+        "NEWS_REUSE_NEAR_DUPLICATES": "0",
+        "NEWS_GEMINI_RPM": "1000000",
+        "NEWS_GEMINI_TPM": "1000000000",
+        "NEWS_IMAGEN_RPM": "1000000",
+    })
+    FakeTranscriptApi.latency = args.transcript_latency
+
+    import analyzer
+    import batch
+    import scraper
+    import video_generator
+    import youtube_utils
+    from video_encoding import get_ffmpeg_exe
+
+    video_generator.synthesize_speech = fake_tts(get_ffmpeg_exe)
+    stages = {}
+
+    try:
+        urls = [server.article_url(name) for name in ARTICLES]
+        print("Benchmarking scrape_article...")
+        stages["scrape"] = summarize(*measure(scraper.scrape_article, urls, args.iterations))
+
+        print("Benchmarking get_video_transcript...")
+        stages["transcript"] = summarize(*measure(
+            lambda vid: youtube_utils.get_video_transcript(vid, use_cache=False, api=FakeTranscriptApi),
+            VIDEO_IDS, args.iterations))
+
+        texts = [scraper.scrape_article(url)[0] for url in urls]
+        print("Benchmarking analyze_article...")
+        stages["analyze"] = summarize(*measure(
+            lambda text: analyzer.analyze_article(text, API_KEY, use_cache=False), texts, args.iterations))
+
+        print("Benchmarking analyze_article_stream (time to first token)...")
+        first_token = []
+
+        def stream(text):
+            start = time.perf_counter()
+            for i, _ in enumerate(analyzer.analyze_article_stream(text, API_KEY, use_cache=False)):
+                if i == 0:
+                    first_token.append(time.perf_counter() - start)
+        stages["analyze_stream"] = summarize(*measure(stream, texts, args.iterations))
+        stages["analyze_stream"]["ttft_p50_s"] = percentile(first_token, 50)
+        stages["analyze_stream"]["ttft_p90_s"] = percentile(first_token, 90)
+
+        print("Benchmarking concurrent batch pipeline...")
+        batch_urls = urls * args.batch_size
+        start = time.perf_counter()
+        # Latency here is time from batch start until each URL's result arrives.
+        batch_latencies = []
+        # Without the analysis cache, so every copy is a real (fake) Gemini call, not an SQLite hit.
+        for record in batch.run_batch(batch_urls, API_KEY, use_cache=False):
+            batch_latencies.append(time.perf_counter() - start)
+        stages["batch"] = summarize(batch_latencies, time.perf_counter() - start)
+
+        print("Benchmarking generate_video...")
+        summary, _ = analyzer.parse_analysis(analyzer.analyze_article(texts[0], API_KEY, use_cache=False))
+        article_images = [f"{server.base_url}/images/hero.jpg"] + [
+            f"{server.base_url}/images/photo_{i}.jpg" for i in range(8)]
+        stages["generate_video"] = summarize(*measure(
+            lambda _: video_generator.generate_video(summary, api_key=API_KEY, article_images=article_images),
+            [None], args.video_iterations))
+    finally:
+        server.stop()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": vars(args),
+        "stages": stages,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "server_requests": server.request_counts,
+    }
+
+
+def print_results(results, baseline=None):
+    print(f"\n{'stage':16} {'n':>4} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'ops/s':>8} {'peak MB':>8}"
+          + (f" {'p50 vs base':>12}" if baseline else ""))
+    for name, stage in results["stages"].items():
+        line = (f"{name:16} {stage['count']:4d} {stage['p50_s'] * 1000:9.1f} {stage['p90_s'] * 1000:9.1f} "
+                f"{stage['p99_s'] * 1000:9.1f} {stage['throughput_per_s'] or 0:8.2f} "
+                f"{stage.get('peak_traced_mb', 0):8.1f}")
+        if baseline and name in baseline.get("stages", {}):
+            base = baseline["stages"][name]["p50_s"]
+            line += f" {(stage['p50_s'] - base) / base * 100:+11.1f}%"
+        print(line)
+    if "ttft_p50_s" in results["stages"].get("analyze_stream", {}):
+        print(f"\nTime to first token: p50 {results['stages']['analyze_stream']['ttft_p50_s'] * 1000:.1f} ms")
+    print(f"Max RSS: {results['max_rss_mb']:.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--video-iterations", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=10, help="Copies of each article in the batch run.")
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--imagen-latency", type=float, default=1.0)
+    parser.add_argument("--page-latency", type=float, default=0.1)
+    parser.add_argument("--image-latency", type=float, default=0.05)
+    parser.add_argument("--transcript-latency", type=float, default=0.2)
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    parser.add_argument("--compare", help="Baseline JSON file from an earlier run.")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Measures app cold-start and rerun overhead.
+
+Three measurements, each in fresh interpreters so nothing is already imported:
+
+- import: time to import the modules app.py imports at the top, and which
+  heavy packages (streamlit aside) that drags in;
+- script: first run and reruns of app.py under Streamlit's AppTest
+  harness, i.e. a cold replica's first page load and the per-interaction rerun;
+- model: creating the Gemini model for an API key, first and cached.
+
+    python benchmarks/startup_benchmark.py --repeat 5 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules app.py imports at the top, apart from streamlit itself.
+APP_MODULES = ["scraper", "analyzer", "preprocess", "youtube_utils", "jobs", "utils", "metrics"]
+# Packages that should only load when a feature actually needs them.
+HEAVY_PACKAGES = ["google.generativeai", "newspaper", "moviepy", "gtts", "PIL", "numpy"]
+
+IMPORT_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [p for p in {heavy!r} if p in sys.modules]}}))
+"""
+
+SCRIPT_SNIPPET = """
+import json, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=60)
+start = time.perf_counter()
+app.run()
+first = time.perf_counter() - start
+reruns = []
+for _ in range({reruns}):
+    start = time.perf_counter()
+    app.run()
+    reruns.append(time.perf_counter() - start)
+print(json.dumps({{"first": first, "reruns": reruns}}))
+"""
+
+MODEL_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import analyzer
+imported = time.perf_counter() - start
+start = time.perf_counter()
+analyzer.get_model("startup-benchmark-key")
+first = time.perf_counter() - start
+start = time.perf_counter()
+analyzer.get_model("startup-benchmark-key")
+cached = time.perf_counter() - start
+print(json.dumps({"import": imported, "first": first, "cached": cached}))
+"""
+
+
+def run_snippet(code):
+    """Runs code in a fresh interpreter from the repo root and returns its JSON output."""
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_imports(repeat):
+    runs = [run_snippet(IMPORT_SNIPPET.format(modules=APP_MODULES, heavy=HEAVY_PACKAGES)) for _ in range(repeat)]
+    return {"median_s": statistics.median(r["seconds"] for r in runs),
+            "min_s": min(r["seconds"] for r in runs),
+            "heavy_packages_loaded": runs[-1]["loaded"]}
+
+
+def measure_script(repeat, reruns):
+    runs = [run_snippet(SCRIPT_SNIPPET.format(reruns=reruns)) for _ in range(repeat)]
+    all_reruns = [t for r in runs for t in r["reruns"]]
+    return {"first_run_median_s": statistics.median(r["first"] for r in runs),
+            "rerun_median_s": statistics.median(all_reruns) if all_reruns else None}
+
+
+def measure_model(repeat):
+    runs = [run_snippet(MODEL_SNIPPET) for _ in range(repeat)]
+    return {key + "_median_s": statistics.median(r[key] for r in runs) for key in ("import", "first", "cached")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement.")
+    parser.add_argument("--reruns", type=int, default=5, help="Script reruns per interpreter.")
+    parser.add_argument("--json", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, measure in [("import", lambda: measure_imports(args.repeat)),
+                          ("script", lambda: measure_script(args.repeat, args.reruns)),
+                          ("model", lambda: measure_model(args.repeat))]:
+        try:
+            results[name] = measure()
+        except Exception as e:
+            print(f"{name} measurement failed: {e}", file=sys.stderr)
+            results[name] = {"error": str(e)}
+
+    imports = results["import"]
+    if "error" not in imports:
+        print(f"App module imports: {imports['median_s'] * 1000:.0f} ms median "
+              f"(min {imports['min_s'] * 1000:.0f} ms)")
+        print(f"Heavy packages loaded at startup: {', '.join(imports['heavy_packages_loaded']) or 'none'}")
+    script = results["script"]
+    if "error" not in script:
+        print(f"First script run: {script['first_run_median_s'] * 1000:.0f} ms median")
+        if script["rerun_median_s"] is not None:
+            print(f"Rerun: {script['rerun_median_s'] * 1000:.0f} ms median")
+    model = results["model"]
+    if "error" not in model:
+        print(f"Gemini model for a key: first {model['first_median_s'] * 1000:.0f} ms "
+              f"(incl. lazy import), cached {model['cached_median_s'] * 1000:.3f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+from array import array
+
+from cache import DEFAULT_CACHE_DIR
+
+DEDUP_INDEX_PATH = os.environ.get("NEWS_DEDUP_INDEX_PATH", os.path.join(DEFAULT_CACHE_DIR, "dedup.sqlite3"))
+# Documents whose word-shingle sets have at least this Jaccard similarity count as the same story.
+DEDUP_MIN_SIMILARITY = float(os.environ.get("NEWS_DEDUP_MIN_SIMILARITY", 0.7))
+# A reused analysis must be no older than a cached one, so the index follows the analysis cache limits.
+DEDUP_TTL = float(os.environ.get("NEWS_ANALYSIS_CACHE_TTL", 7 * 24 * 3600))
+DEDUP_MAX_DOCUMENTS = int(os.environ.get("NEWS_ANALYSIS_CACHE_MAX_ENTRIES", 10000))
+# Over max_documents, the oldest documents are evicted in batches of this share of the
+# limit, so an insert does not have to scan the whole table.
+DEDUP_EVICT_BATCH = 0.01
+# Texts shorter than this many words are never matched; their shingle sets are too small.
+DEDUP_MIN_WORDS = 80
+
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+# Chance a pair exactly at the similarity threshold never shares a band (see choose_bands).
+MAX_MISS_RATE = 0.001
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed: signatures must be comparable across processes and restarts.
+_rng = random.Random(20240304)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Returns the set of lowercase word n-grams of the text."""
+    words = re.findall(r"\w+", text.lower())
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def minhash(text, num_perm=NUM_PERM):
+    """
+    Computes a MinHash signature of the text's word shingles.
+
+    The share of positions where two signatures agree estimates the Jaccard
+    similarity of the shingle sets, so a copy with an added byline, dateline
+    or a few edited sentences stays close to the original.
+    """
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big")
+              for s in shingles(text)]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH for a, b in _PERMUTATIONS[:num_perm]]
+
+
+def estimate_similarity(a, b):
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def choose_bands(threshold, num_perm=NUM_PERM, max_miss_rate=MAX_MISS_RATE):
+    """
+    Picks (bands, rows) for LSH banding of num_perm-value signatures.
+
+    Two documents with similarity s share at least one band with probability
+    1 - (1 - s**rows)**bands. This returns the most selective split (fewest
+    candidates to verify) that still misses a pair at the threshold with
+    probability at most max_miss_rate.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 - threshold ** rows) ** bands <= max_miss_rate:
+            best = (bands, rows)
+    return best
+
+
+def _pack(signature):
+    return array("I", signature).tobytes()
+
+
+def _unpack(data):
+    return array("I", data).tolist()
+
+
+class DedupIndex:
+    """
+    Persistent MinHash index that finds near-duplicate documents with LSH banding.
+
+    Each signature is split into bands whose hashes are stored in an indexed
+    table, so a lookup only verifies documents sharing a band, not the whole
+    index. Documents are grouped by scope (e.g. the model and prompt that
+    produced the stored value) and expire after ttl seconds.
+    """
+
+    def __init__(self, path=DEDUP_INDEX_PATH, min_similarity=DEDUP_MIN_SIMILARITY, ttl=DEDUP_TTL,
+                 max_documents=DEDUP_MAX_DOCUMENTS):
+        """
+        Args:
+            path (str): Path of the SQLite database file.
+            min_similarity (float): Smallest estimated Jaccard similarity treated as a match.
+            ttl (float): Seconds a document stays matchable, or None to never expire.
+            max_documents (int): Maximum number of documents kept, or None for no limit.
+                Up to DEDUP_EVICT_BATCH more may be kept until the next batch is evicted.
+        """
+        self.min_similarity = min_similarity
+        self.ttl = ttl
+        self.max_documents = max_documents
+        self.bands, self.rows = choose_bands(min_similarity)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Signatures from the earlier SimHash index are not comparable; start over.
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(documents)")]
+        if columns and "signature" not in columns:
+            self._conn.execute("DROP TABLE documents")
+            self._conn.execute("DROP TABLE IF EXISTS bands")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " id INTEGER PRIMARY KEY,"
+            " scope TEXT NOT NULL,"
+            " signature BLOB NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bands ("
+            " band INTEGER NOT NULL,"
+            " bucket INTEGER NOT NULL,"
+            " doc_id INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, bucket)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bands_doc ON bands (doc_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_created ON documents (created_at)")
+        self._conn.commit()
+        self._documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _band_keys(self, signature):
+        """Band number and a signed 64-bit hash of that band's rows, for each band."""
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(_pack(rows), digest_size=8).digest()
+            keys.append((band, struct.unpack(">q", digest)[0]))
+        return keys
+
+    def find(self, text, scope=""):
+        """
+        Returns (value, similarity) of the most similar unexpired document in scope, or (None, None).
+        """
+        if len(text.split()) < DEDUP_MIN_WORDS:
+            return None, None
+        signature = minhash(text)
+        min_created = time.time() - self.ttl if self.ttl is not None else 0
+        best_value, best_similarity = None, None
+        with self._lock:
+            where = " OR ".join(["(b.band = ? AND b.bucket = ?)"] * self.bands)
+            params = [x for pair in self._band_keys(signature) for x in pair]
+            rows = self._conn.execute(
+                "SELECT DISTINCT d.id, d.signature, d.value FROM bands b JOIN documents d ON d.id = b.doc_id"
+                f" WHERE ({where}) AND d.scope = ? AND d.created_at >= ?",
+                params + [scope, min_created],
+            ).fetchall()
+            for _, stored, value in rows:
+                similarity = estimate_similarity(signature, _unpack(stored))
+                if similarity >= self.min_similarity and (best_similarity is None or similarity > best_similarity):
+                    best_value, best_similarity = value, similarity
+            if best_value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return best_value, best_similarity
+
+    def add(self, text, value, scope=""):
+        """Indexes text with the value (e.g. its analysis) to return for future near-duplicates in scope."""
+        if len(text.split()) < DEDUP_MIN_WORDS:
+            return
+        signature = minhash(text)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO documents (scope, signature, value, created_at) VALUES (?, ?, ?, ?)",
+                (scope, _pack(signature), value, time.time()),
+            )
+            doc_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO bands (band, bucket, doc_id) VALUES (?, ?, ?)",
+                [(band, bucket, doc_id) for band, bucket in self._band_keys(signature)],
+            )
+            self._documents += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Deletes expired documents and, once the count is a batch over max_documents,
+        the oldest ones down to max_documents, with their bands.
+        """
+        if self.ttl is not None:
+            self._delete([row[0] for row in self._conn.execute(
+                "SELECT id FROM documents WHERE created_at < ?", (time.time() - self.ttl,))])
+        if self.max_documents is None:
+            return
+        if self._documents <= self.max_documents + int(self.max_documents * DEDUP_EVICT_BATCH):
+            return
+        # Other processes may share the file, so recount before trimming.
+        self._documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        excess = self._documents - self.max_documents
+        if excess > 0:
+            self._delete([row[0] for row in self._conn.execute(
+                "SELECT id FROM documents ORDER BY created_at ASC LIMIT ?", (excess,))])
+
+    def _delete(self, doc_ids):
+        if doc_ids:
+            ids = [(doc_id,) for doc_id in doc_ids]
+            self._conn.executemany("DELETE FROM bands WHERE doc_id = ?", ids)
+            self._conn.executemany("DELETE FROM documents WHERE id = ?", ids)
+            self._documents -= len(doc_ids)
+
+    def stats(self):
+        with self._lock:
+            documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "documents": documents}
+
+
+_dedup_index = None
+_dedup_index_lock = threading.Lock()
+
+
+def get_dedup_index():
+    """Returns the process-wide near-duplicate index, opening it on first use."""
+    global _dedup_index
+    with _dedup_index_lock:
+        if _dedup_index is None:
+            _dedup_index = DedupIndex()
+        return _dedup_index
@@ -0,0 +1,449 @@
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from batch import analyze_text, fetch_text, new_record, read_urls
+from cache import DEFAULT_CACHE_DIR, content_hash
+from fetcher import fetch_url
+from metrics import count, span
+
+FEED_STATE_PATH = os.environ.get("NEWS_FEED_STATE_PATH", os.path.join(DEFAULT_CACHE_DIR, "feeds.sqlite3"))
+# Entries processed from a feed polled for the first time; older ones are only marked as seen.
+FIRST_POLL_LIMIT = int(os.environ.get("NEWS_FEED_FIRST_POLL_LIMIT", 10))
+
+DEFAULT_FEED_CONCURRENCY = 8
+DEFAULT_FETCH_WORKERS = 8
+DEFAULT_ANALYZE_WORKERS = 4
+# Items buffered between pipeline stages; a full buffer blocks the stage before it.
+DEFAULT_QUEUE_SIZE = 16
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _child_text(element, *names):
+    for child in element:
+        if _local_name(child.tag) in names and child.text and child.text.strip():
+            return child.text.strip()
+    return None
+
+
+def _entry_link(entry):
+    # RSS: <link>url</link>; Atom: <link rel="alternate" href="url"/> (rel defaults to alternate)
+    for child in entry:
+        if _local_name(child.tag) != "link":
+            continue
+        href = child.get("href")
+        if href and child.get("rel", "alternate") == "alternate":
+            return href.strip()
+        if not href and child.text and child.text.strip():
+            return child.text.strip()
+    return None
+
+
+def parse_feed(content):
+    """
+    Extracts the entries of an RSS 0.9x/2.0, RSS 1.0 (RDF) or Atom feed.
+
+    Args:
+        content (bytes): The feed document.
+
+    Returns:
+        list: Dicts with id, url, title and published, in document order (usually newest first).
+    """
+    root = ET.fromstring(content)
+    entries = []
+    for element in root.iter():
+        if _local_name(element.tag) not in ("item", "entry"):
+            continue
+        url = _entry_link(element)
+        title = _child_text(element, "title")
+        if not url:
+            continue
+        entry_id = _child_text(element, "guid", "id") or url
+        entries.append({
+            "id": entry_id,
+            "url": url,
+            "title": title,
+            "published": _child_text(element, "pubDate", "published", "updated", "date"),
+        })
+    return entries
+
+
+class FeedState:
+    """
+    Persistent record of the feeds polled and every entry seen, in SQLite.
+
+    An entry is stored as pending as soon as it is discovered and marked done
+    or failed once processed, so a restarted poller resumes the pending ones
+    and never processes an entry twice. The hash of each feed's last document
+    lets an unchanged feed skip parsing entirely.
+    """
+
+    def __init__(self, path=FEED_STATE_PATH):
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS feeds ("
+            " url TEXT PRIMARY KEY,"
+            " content_hash TEXT,"
+            " polled_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " feed_url TEXT NOT NULL,"
+            " entry_id TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " title TEXT,"
+            " published TEXT,"
+            " status TEXT NOT NULL,"
+            " discovered_at REAL NOT NULL,"
+            " processed_at REAL,"
+            " PRIMARY KEY (feed_url, entry_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_status ON entries (status)")
+        self._conn.commit()
+
+    def feed_hash(self, feed_url):
+        """Returns the content hash of the feed's last processed document, or None if never polled."""
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM feeds WHERE url = ?", (feed_url,)).fetchone()
+        return row[0] if row else None
+
+    def is_known(self, feed_url):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM feeds WHERE url = ?", (feed_url,)).fetchone() is not None
+
+    def add_entries(self, feed_url, entries, content_hash_value, skip=()):
+        """
+        Records a feed document's entries, returning those not seen before (now pending).
+
+        Args:
+            feed_url (str): The feed.
+            entries (list): Entries from parse_feed.
+            content_hash_value (str): Hash of the document, stored for the unchanged-feed check.
+            skip (iterable): IDs of new entries to record as done without processing.
+
+        Returns:
+            list: The newly pending entries.
+        """
+        skip = set(skip)
+        now = time.time()
+        new_entries = []
+        with self._lock:
+            for entry in entries:
+                status = DONE if entry["id"] in skip else PENDING
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO entries (feed_url, entry_id, url, title, published, status, discovered_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (feed_url, entry["id"], entry["url"], entry["title"], entry["published"], status, now),
+                )
+                if cursor.rowcount and status == PENDING:
+                    new_entries.append(dict(entry, feed=feed_url))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds (url, content_hash, polled_at) VALUES (?, ?, ?)",
+                (feed_url, content_hash_value, now),
+            )
+            self._conn.commit()
+        return new_entries
+
+    def touch(self, feed_url):
+        with self._lock:
+            self._conn.execute("UPDATE feeds SET polled_at = ? WHERE url = ?", (time.time(), feed_url))
+            self._conn.commit()
+
+    def pending_entries(self, feed_urls=None):
+        """Returns entries discovered but not processed, e.g. by a poller that was stopped."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT feed_url, entry_id, url, title, published FROM entries WHERE status = ?"
+                " ORDER BY discovered_at", (PENDING,),
+            ).fetchall()
+        wanted = set(feed_urls) if feed_urls is not None else None
+        return [{"feed": feed, "id": entry_id, "url": url, "title": title, "published": published}
+                for feed, entry_id, url, title, published in rows if wanted is None or feed in wanted]
+
+    def mark_processed(self, feed_url, entry_id, failed=False):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET status = ?, processed_at = ? WHERE feed_url = ? AND entry_id = ?",
+                (FAILED if failed else DONE, time.time(), feed_url, entry_id),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            feeds = self._conn.execute("SELECT COUNT(*) FROM feeds").fetchone()[0]
+            by_status = dict(self._conn.execute("SELECT status, COUNT(*) FROM entries GROUP BY status").fetchall())
+        return {"feeds": feeds, "pending": by_status.get(PENDING, 0), "done": by_status.get(DONE, 0),
+                "failed": by_status.get(FAILED, 0)}
+
+
+def poll_feed(feed_url, state, first_poll_limit=FIRST_POLL_LIMIT):
+    """
+    Fetches one feed with a conditional GET and returns its entries not seen before.
+
+    An unchanged document (a 304, a still-fresh cache entry or identical
+    bytes) is not parsed at all.
+
+    Returns:
+        list: New entries, marked pending in state.
+    """
+    with span("feed_poll"):
+        page = fetch_url(feed_url)
+        document_hash = content_hash(page.content)
+        if document_hash == state.feed_hash(feed_url):
+            count("feed_polls", result="unchanged")
+            state.touch(feed_url)
+            return []
+        entries = parse_feed(page.content)
+        skip = ()
+        if first_poll_limit is not None and not state.is_known(feed_url):
+            # Don't analyze a new feed's whole archive; start from its latest entries.
+            skip = [entry["id"] for entry in entries[first_poll_limit:]]
+        new_entries = state.add_entries(feed_url, entries, document_hash, skip=skip)
+        count("feed_polls", result="changed")
+        count("feed_entries_new", len(new_entries))
+        return new_entries
+
+
+def discover_entries(feed_urls, state, concurrency=DEFAULT_FEED_CONCURRENCY, first_poll_limit=FIRST_POLL_LIMIT):
+    """
+    Yields entries left pending by an earlier run, then new entries from every feed.
+
+    Feeds are fetched concurrently; each feed's new entries are yielded as
+    soon as that feed has been polled.
+    """
+    for entry in state.pending_entries(feed_urls):
+        yield entry
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(poll_feed, url, state, first_poll_limit): url for url in feed_urls}
+        for future in as_completed(futures):
+            try:
+                new_entries = future.result()
+            except Exception as e:
+                print(f"Failed to poll feed {futures[future]}: {e}", file=sys.stderr)
+                count("errors", stage="feed_poll")
+                continue
+            for entry in new_entries:
+                yield entry
+
+
+_END = object()
+# How often blocked pipeline threads check whether the consumer has gone away.
+_STOP_POLL_INTERVAL = 0.1
+
+
+def _put(q, item, stop):
+    """Puts item on q, waiting for space. Returns False instead if stop is set first."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_STOP_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    """Takes the next item from q, or returns _END once stop is set."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_STOP_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return _END
+
+
+def _run_stage(func, inbox, outbox, workers, stop):
+    """Starts workers that apply func to items from inbox and put the results on outbox, until stop is set."""
+    remaining = [workers]
+    lock = threading.Lock()
+
+    def work():
+        while True:
+            item = _get(inbox, stop)
+            if item is _END:
+                # Pass the end marker on to sibling workers; the last one out forwards it downstream.
+                _put(inbox, _END, stop)
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    _put(outbox, _END, stop)
+                return
+            if not _put(outbox, func(item), stop):
+                return
+
+    for _ in range(workers):
+        threading.Thread(target=work, name="stream_pipeline", daemon=True).start()
+
+
+def stream_pipeline(items, stages, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Streams items through stages of worker threads connected by bounded queues.
+
+    Items are pulled from the iterable only as fast as the slowest stage
+    drains its queue, so a flood of feed entries waits in the feeds rather
+    than in memory. Results are yielded as they complete, not in input order.
+    If the consumer stops early (closes or drops the generator), the worker
+    threads stop too, once any item they are processing is done.
+
+    Args:
+        items (iterable): Inputs to the first stage; consumed lazily.
+        stages (list): (func, workers) pairs, applied in order.
+        queue_size (int): Capacity of each queue between stages.
+
+    Yields:
+        The outputs of the last stage.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    stop = threading.Event()
+
+    def feed():
+        try:
+            for item in items:
+                if not _put(queues[0], item, stop):
+                    break
+        finally:
+            _put(queues[0], _END, stop)
+            # Closes a generator source (e.g. discover_entries and its feed pollers) left unfinished.
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    threading.Thread(target=feed, name="stream_pipeline", daemon=True).start()
+    for i, (func, workers) in enumerate(stages):
+        _run_stage(func, queues[i], queues[i + 1], workers, stop)
+    try:
+        while True:
+            result = queues[-1].get()
+            if result is _END:
+                return
+            yield result
+    finally:
+        stop.set()
+
+
+def _fetch_stage(entry):
+    record = new_record(entry["url"])
+    record.update(feed=entry["feed"], entry_id=entry["id"], title=entry["title"], published=entry["published"])
+    try:
+        return record, fetch_text(record)
+    except Exception as e:
+        record["error"] = str(e)
+        return record, None
+
+
+def _analyze_stage(api_key):
+    def analyze(item):
+        record, text = item
+        if text is not None:
+            try:
+                analyze_text(record, text, api_key)
+            except Exception as e:
+                record["error"] = str(e)
+        return record
+    return analyze
+
+
+def process_feeds(feed_urls, api_key, state=None, feed_concurrency=DEFAULT_FEED_CONCURRENCY,
+                  fetch_workers=DEFAULT_FETCH_WORKERS, analyze_workers=DEFAULT_ANALYZE_WORKERS,
+                  queue_size=DEFAULT_QUEUE_SIZE, first_poll_limit=FIRST_POLL_LIMIT):
+    """
+    Polls the feeds once and scrapes and analyzes every entry not processed before.
+
+    Each entry is marked done (or failed) in the feed state as its record is
+    yielded, so stopping and restarting resumes with the entries still pending.
+
+    Args:
+        feed_urls (list): RSS/Atom feed URLs.
+        api_key (str): The Google Gemini API key.
+        state (FeedState): Where seen entries are recorded; defaults to FEED_STATE_PATH.
+        feed_concurrency (int): Feeds fetched at once.
+        fetch_workers (int): Articles/transcripts fetched at once.
+        analyze_workers (int): Analyses run at once.
+        queue_size (int): Items buffered between stages.
+        first_poll_limit (int): Entries processed from a feed seen for the first time, or None for all.
+
+    Yields:
+        dict: A batch.process_url style record per entry, plus feed, entry_id, title and published.
+    """
+    state = state or FeedState()
+    feed_urls = list(dict.fromkeys(feed_urls))
+    entries = discover_entries(feed_urls, state, feed_concurrency, first_poll_limit)
+    stages = [(_fetch_stage, fetch_workers), (_analyze_stage(api_key), analyze_workers)]
+    for record in stream_pipeline(entries, stages, queue_size):
+        # A fetch failure may be temporary, but retrying it forever would stall the feed.
+        state.mark_processed(record["feed"], record["entry_id"], failed=bool(record["error"]))
+        yield record
+
+
+def watch_feeds(feed_urls, api_key, interval=300, state=None, **kwargs):
+    """Runs process_feeds every `interval` seconds, forever, yielding records as they are produced."""
+    state = state or FeedState()
+    while True:
+        started = time.monotonic()
+        yield from process_feeds(feed_urls, api_key, state=state, **kwargs)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch RSS/Atom feeds and summarize and rate every new story.")
+    parser.add_argument("input", help="File with one feed URL per line, or '-' for stdin.")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file to append to (default: stdout).")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"),
+                        help="Google Gemini API key (default: $GEMINI_API_KEY).")
+    parser.add_argument("--interval", type=float, default=300, help="Seconds between polls (default: 300).")
+    parser.add_argument("--once", action="store_true", help="Poll once and exit instead of watching.")
+    parser.add_argument("--state", default=FEED_STATE_PATH, help="SQLite file recording seen entries.")
+    parser.add_argument("--feed-concurrency", type=int, default=DEFAULT_FEED_CONCURRENCY)
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_FETCH_WORKERS)
+    parser.add_argument("--analyze-workers", type=int, default=DEFAULT_ANALYZE_WORKERS)
+    parser.add_argument("--first-poll-limit", type=int, default=FIRST_POLL_LIMIT,
+                        help="Entries processed from a feed polled for the first time (default: %(default)s).")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("a Gemini API key is required (--api-key or $GEMINI_API_KEY)")
+
+    feed_urls = read_urls(args.input)
+    state = FeedState(args.state)
+    options = dict(feed_concurrency=args.feed_concurrency, fetch_workers=args.fetch_workers,
+                   analyze_workers=args.analyze_workers, first_poll_limit=args.first_poll_limit)
+    records = (process_feeds(feed_urls, args.api_key, state=state, **options) if args.once
+               else watch_feeds(feed_urls, args.api_key, interval=args.interval, state=state, **options))
+    out = sys.stdout if args.output == "-" else open(args.output, "a", encoding="utf-8")
+    try:
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    stats = state.stats()
+    print(f"Feeds: {stats['feeds']}; entries done {stats['done']}, failed {stats['failed']}, "
+          f"pending {stats['pending']}.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
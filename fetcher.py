@@ -0,0 +1,186 @@
+import email.utils
+import json
+import os
+import threading
+import time
+
+import urllib3
+
+import http_client
+
+from cache import DEFAULT_CACHE_DIR, DiskCache, content_hash
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Suppress SSL warnings
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+HTTP_CACHE_PATH = os.environ.get("NEWS_HTTP_CACHE_PATH", os.path.join(DEFAULT_CACHE_DIR, "http.sqlite3"))
+# Entries past this age are dropped even if they could still be revalidated.
+HTTP_CACHE_TTL = float(os.environ.get("NEWS_HTTP_CACHE_TTL", 7 * 24 * 3600))
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("NEWS_HTTP_CACHE_MAX_MB", 200)) * 1024 * 1024
+
+
+class FetchedPage:
+    """The body of a fetched URL plus what the cache layer knows about it."""
+
+    def __init__(self, url, content, encoding=None, status="fetched"):
+        self.url = url
+        self.content = content
+        self.encoding = encoding
+        # One of "fetched" (full download), "revalidated" (304) or "fresh" (served without a request).
+        self.status = status
+
+    @property
+    def from_cache(self):
+        return self.status != "fetched"
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+def _parse_cache_control(value):
+    directives = {}
+    for part in (value or "").split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, _, arg = part.partition("=")
+        directives[name.strip()] = arg.strip().strip('"')
+    return directives
+
+
+def _freshness_lifetime(headers):
+    """Seconds a response stays fresh per Cache-Control/Expires, or 0 if it must be revalidated."""
+    directives = _parse_cache_control(headers.get("Cache-Control"))
+    if "no-cache" in directives:
+        return 0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(0, int(directives[name]))
+            except ValueError:
+                return 0
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            expires_at = email.utils.parsedate_to_datetime(expires).timestamp()
+            date = headers.get("Date")
+            now = email.utils.parsedate_to_datetime(date).timestamp() if date else time.time()
+            return max(0, int(expires_at - now))
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+class HTTPCache:
+    """
+    On-disk cache of HTTP responses that honors ETag/Last-Modified and Cache-Control.
+
+    Fresh entries are served without touching the network; stale ones are
+    revalidated with a conditional GET, so an unchanged page costs a 304.
+    Entries live in a DiskCache, so they expire after ttl seconds and the
+    least recently used ones are evicted beyond max_bytes.
+    """
+
+    def __init__(self, path=HTTP_CACHE_PATH, ttl=HTTP_CACHE_TTL, max_bytes=HTTP_CACHE_MAX_BYTES):
+        """
+        Args:
+            path (str): Path of the SQLite database file.
+            ttl (float): Seconds an entry is kept after it was last stored or revalidated.
+            max_bytes (int): Maximum total size of the stored responses.
+        """
+        self._cache = DiskCache(path, ttl=ttl, max_bytes=max_bytes)
+
+    def load(self, url):
+        """Returns (meta, body) for a cached URL, or (None, None)."""
+        data = self._cache.get(content_hash(url))
+        if data is None:
+            return None, None
+        # JSON never contains a raw NUL byte, so the first one separates meta from body.
+        meta, _, body = data.partition(b"\0")
+        try:
+            return json.loads(meta.decode("utf-8")), body
+        except ValueError:
+            return None, None
+
+    def store(self, url, meta, body):
+        """Stores meta and body together, so one is never evicted without the other."""
+        self._cache.set(content_hash(url), json.dumps(meta).encode("utf-8") + b"\0" + body)
+
+    def delete(self, url):
+        self._cache.delete(content_hash(url))
+
+    def stats(self):
+        return self._cache.stats()
+
+
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Returns the process-wide HTTP cache, opening it on first use."""
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HTTPCache()
+        return _http_cache
+
+
+def fetch_url(url, timeout=10, use_cache=True):
+    """
+    Downloads a URL once, going through the on-disk HTTP cache.
+
+    Args:
+        url (str): The URL to fetch.
+        timeout (float): Request timeout in seconds.
+        use_cache (bool): Whether to serve from and store into the HTTP cache.
+
+    Returns:
+        FetchedPage: The page body. Raises an HTTP error on failure.
+    """
+    cache = get_http_cache() if use_cache else None
+    meta, body = cache.load(url) if cache else (None, None)
+
+    headers = {'User-Agent': USER_AGENT}
+    if meta is not None:
+        if time.time() < meta.get("fresh_until", 0):
+            return FetchedPage(meta.get("url", url), body, meta.get("encoding"), status="fresh")
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    # SSL verification stays disabled, as many news sites have broken chains.
+    response = http_client.get(url, headers=headers, timeout=timeout, verify=False)
+
+    if response.status_code == 304 and meta is not None:
+        meta["fresh_until"] = time.time() + _freshness_lifetime(response.headers)
+        meta["etag"] = response.headers.get("ETag", meta.get("etag"))
+        meta["last_modified"] = response.headers.get("Last-Modified", meta.get("last_modified"))
+        cache.store(url, meta, body)
+        return FetchedPage(meta.get("url", url), body, meta.get("encoding"), status="revalidated")
+
+    response.raise_for_status()
+    encoding = response.encoding
+    if not encoding or (encoding.lower() == "iso-8859-1" and "charset" not in response.headers.get("Content-Type", "").lower()):
+        # requests falls back to ISO-8859-1 when the server names no charset; sniff instead.
+        encoding = response.apparent_encoding
+    page = FetchedPage(response.url, response.content, encoding)
+
+    if cache is not None:
+        directives = _parse_cache_control(response.headers.get("Cache-Control"))
+        if "no-store" in directives:
+            cache.delete(url)
+        else:
+            cache.store(url, {
+                "url": response.url,
+                "encoding": encoding,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fresh_until": time.time() + _freshness_lifetime(response.headers),
+                "stored_at": time.time(),
+            }, response.content)
+    return page
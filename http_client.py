@@ -0,0 +1,193 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connect and read timeouts applied to every call that doesn't pass its own.
+DEFAULT_TIMEOUT = (
+    float(os.environ.get("NEWS_HTTP_CONNECT_TIMEOUT", 5)),
+    float(os.environ.get("NEWS_HTTP_READ_TIMEOUT", 10)),
+)
+# Keep-alive connections kept open per host.
+POOL_MAXSIZE = int(os.environ.get("NEWS_HTTP_POOL_MAXSIZE", 16))
+# Number of distinct hosts whose pools are kept around.
+POOL_CONNECTIONS = int(os.environ.get("NEWS_HTTP_POOL_CONNECTIONS", 32))
+# Use HTTP/2 through httpx when it is installed (pip install "httpx[http2]").
+HTTP2 = os.environ.get("NEWS_HTTP2", "").lower() in ("1", "true", "yes")
+
+_lock = threading.Lock()
+_sessions = {}
+_httpx_clients = {}
+_settings = {
+    "timeout": DEFAULT_TIMEOUT,
+    "pool_maxsize": POOL_MAXSIZE,
+    "pool_connections": POOL_CONNECTIONS,
+    "http2": HTTP2,
+}
+
+
+def configure(timeout=None, pool_maxsize=None, pool_connections=None, http2=None):
+    """
+    Changes the shared client settings. Existing pooled connections are closed.
+
+    Args:
+        timeout (float or tuple): Default timeout, or a (connect, read) pair.
+        pool_maxsize (int): Keep-alive connections kept per host.
+        pool_connections (int): Number of hosts whose pools are kept.
+        http2 (bool): Whether to use HTTP/2 via httpx when available.
+    """
+    with _lock:
+        if timeout is not None:
+            _settings["timeout"] = timeout
+        if pool_maxsize is not None:
+            _settings["pool_maxsize"] = pool_maxsize
+        if pool_connections is not None:
+            _settings["pool_connections"] = pool_connections
+        if http2 is not None:
+            _settings["http2"] = http2
+        _close_locked()
+
+
+def close():
+    """Closes all pooled connections."""
+    with _lock:
+        _close_locked()
+
+
+def _close_locked():
+    for client in list(_sessions.values()) + list(_httpx_clients.values()):
+        try:
+            client.close()
+        except Exception:
+            pass
+    _sessions.clear()
+    _httpx_clients.clear()
+
+
+def get_session(verify=True):
+    """Returns the shared requests.Session for the given SSL verification mode."""
+    with _lock:
+        session = _sessions.get(verify)
+        if session is None:
+            session = requests.Session()
+            session.verify = verify
+            adapter = HTTPAdapter(
+                pool_connections=_settings["pool_connections"],
+                pool_maxsize=_settings["pool_maxsize"],
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[verify] = session
+        return session
+
+
+def _get_httpx_client(verify):
+    with _lock:
+        client = _httpx_clients.get(verify)
+        if client is None:
+            import httpx
+
+            timeout = _settings["timeout"]
+            if isinstance(timeout, tuple):
+                timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+            client = httpx.Client(
+                http2=True,
+                verify=verify,
+                timeout=timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=_settings["pool_maxsize"] * _settings["pool_connections"],
+                    max_keepalive_connections=_settings["pool_maxsize"],
+                ),
+            )
+            _httpx_clients[verify] = client
+        return client
+
+
+def _http2_available():
+    if not _settings["http2"]:
+        return False
+    try:
+        import h2  # noqa: F401
+        import httpx  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class _HTTPXResponse:
+    """Gives an httpx response the parts of the requests.Response interface this app uses."""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    @property
+    def content(self):
+        return self._response.read()
+
+    @property
+    def text(self):
+        self._response.read()
+        return self._response.text
+
+    @property
+    def encoding(self):
+        return self._response.charset_encoding
+
+    @property
+    def apparent_encoding(self):
+        self._response.read()
+        return self._response.encoding
+
+    def json(self):
+        self._response.read()
+        return self._response.json()
+
+    def iter_content(self, chunk_size=8192):
+        return self._response.iter_bytes(chunk_size)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        self._response.close()
+
+
+def request(method, url, timeout=None, verify=True, stream=False, **kwargs):
+    """
+    Sends a request through the shared, pooled client.
+
+    Takes the same arguments as requests.request. Connections are kept alive
+    and reused per host, and every call gets the configured default timeout.
+
+    Returns:
+        requests.Response, or an equivalent wrapper when HTTP/2 is enabled.
+    """
+    if timeout is None:
+        timeout = _settings["timeout"]
+    if _http2_available():
+        client = _get_httpx_client(verify)
+        if isinstance(kwargs.get("data"), (bytes, str)):
+            kwargs["content"] = kwargs.pop("data")
+        if isinstance(timeout, tuple):
+            import httpx
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        req = client.build_request(method, url, timeout=timeout, **kwargs)
+        response = client.send(req, stream=True)
+        if not stream:
+            response.read()
+        return _HTTPXResponse(response)
+    return get_session(verify).request(method, url, timeout=timeout, verify=verify, stream=stream, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
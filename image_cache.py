@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image
+
+from cache import DEFAULT_CACHE_DIR, DiskCache, content_hash
+
+IMAGE_CACHE_PATH = os.environ.get("NEWS_IMAGE_CACHE_PATH", os.path.join(DEFAULT_CACHE_DIR, "images.sqlite3"))
+IMAGE_CACHE_TTL = float(os.environ.get("NEWS_IMAGE_CACHE_TTL", 7 * 24 * 3600))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("NEWS_IMAGE_CACHE_MAX_MB", 200)) * 1024 * 1024
+# Decoded images kept in memory; a 1280x720 RGB image takes about 2.7 MB.
+IMAGE_MEMORY_CACHE_MAX_BYTES = int(os.environ.get("NEWS_IMAGE_MEMORY_CACHE_MB", 32)) * 1024 * 1024
+IMAGE_CACHE_QUALITY = 90
+
+
+class ImageCache:
+    """
+    Two-level cache of resized images keyed by source URL and target size.
+
+    Recently used images stay decoded in a byte-bounded in-memory LRU; all
+    of them are kept as JPEGs in a size-bounded DiskCache, so a later job
+    (or a restarted process) skips both the download and the full-size decode.
+    Returned images are shared and must not be modified in place.
+    """
+
+    def __init__(self, path=IMAGE_CACHE_PATH, ttl=IMAGE_CACHE_TTL, max_bytes=IMAGE_CACHE_MAX_BYTES,
+                 memory_max_bytes=IMAGE_MEMORY_CACHE_MAX_BYTES):
+        """
+        Args:
+            path (str): Path of the SQLite database file, or None for a memory-only cache.
+            ttl (float): Seconds an on-disk entry stays valid.
+            max_bytes (int): Maximum total size of the stored JPEGs.
+            memory_max_bytes (int): Maximum decoded size of the images kept in memory.
+        """
+        self.memory_max_bytes = memory_max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk = DiskCache(path, ttl=ttl, max_bytes=max_bytes) if path else None
+
+    @staticmethod
+    def key(url, size):
+        return content_hash("image", url, size[0], size[1])
+
+    @staticmethod
+    def _image_bytes(img):
+        return img.width * img.height * len(img.getbands())
+
+    def _remember(self, key, img):
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= self._image_bytes(self._memory.pop(key))
+            self._memory[key] = img
+            self._memory_bytes += self._image_bytes(img)
+            while self._memory_bytes > self.memory_max_bytes and self._memory:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= self._image_bytes(evicted)
+
+    def get(self, url, size):
+        """Returns the cached resized image for url, or None."""
+        key = self.key(url, size)
+        with self._lock:
+            img = self._memory.get(key)
+            if img is not None:
+                self._memory.move_to_end(key)
+                return img
+        if self._disk is None:
+            return None
+        data = self._disk.get(key)
+        if data is None:
+            return None
+        img = Image.open(BytesIO(data))
+        img.load()
+        self._remember(key, img)
+        return img
+
+    def set(self, url, size, img):
+        """
+        Stores a resized image for url.
+
+        Returns:
+            PIL.Image.Image: The image as stored. With a disk cache this is the
+            decoded JPEG, so every process gets the same pixels for url and
+            slides built from it hash the same (see segment_renderer).
+        """
+        key = self.key(url, size)
+        if self._disk is not None:
+            buffer = BytesIO()
+            img.convert("RGB").save(buffer, format="JPEG", quality=IMAGE_CACHE_QUALITY)
+            data = buffer.getvalue()
+            self._disk.set(key, data)
+            img = Image.open(BytesIO(data))
+            img.load()
+        self._remember(key, img)
+        return img
+
+    def stats(self):
+        with self._lock:
+            memory = {"memory_entries": len(self._memory), "memory_bytes": self._memory_bytes}
+        if self._disk is not None:
+            memory.update(self._disk.stats())
+        return memory
+
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    """Returns the process-wide resized-image cache, falling back to memory only if the disk cache can't open."""
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            try:
+                _image_cache = ImageCache()
+            except Exception as e:
+                print(f"Image disk cache unavailable: {e}")
+                _image_cache = ImageCache(path=None)
+        return _image_cache
@@ -0,0 +1,231 @@
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+JOBS_DIR = os.environ.get("NEWS_VIDEO_JOBS_DIR", os.path.join(tempfile.gettempdir(), "news_video_jobs"))
+# Videos rendered at the same time on this node; each render runs in its own process.
+JOB_WORKERS = int(os.environ.get("NEWS_VIDEO_JOB_WORKERS", 2))
+# Jobs waiting or running before submit_video_job refuses new ones.
+JOB_QUEUE_LIMIT = int(os.environ.get("NEWS_VIDEO_JOB_QUEUE", 20))
+# Seconds a finished job's directory (and video) is kept.
+JOB_RETENTION = float(os.environ.get("NEWS_VIDEO_JOB_RETENTION", 3600))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class QueueFullError(Exception):
+    """Raised by submit_video_job when JOB_QUEUE_LIMIT jobs are already waiting or running."""
+
+
+def job_dir(job_id, jobs_dir=JOBS_DIR):
+    """Returns the directory of a job, refusing IDs that are not ours (no path tricks)."""
+    if not _JOB_ID_PATTERN.fullmatch(job_id or ""):
+        raise ValueError(f"invalid job ID: {job_id!r}")
+    return os.path.join(jobs_dir, job_id)
+
+
+def _write_status(directory, **fields):
+    """Merges fields into the job's status.json, replacing the file atomically."""
+    path = os.path.join(directory, "status.json")
+    status = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        pass
+    status.update(fields)
+    status["updated_at"] = time.time()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(status, f)
+    os.replace(tmp_path, path)
+    return status
+
+
+def _run_job(directory, summary_text, api_key, article_images, encode_settings, story_id=None):
+    """Renders one video inside a worker process, recording progress in the job's status.json."""
+    from metrics import trace
+    from video_generator import generate_video
+
+    _write_status(directory, state=RUNNING, stage="starting", progress=0.0, started_at=time.time())
+
+    def report(stage, fraction):
+        _write_status(directory, stage=stage, progress=fraction)
+
+    with trace() as job_trace:
+        output_path = generate_video(summary_text, api_key=api_key, article_images=article_images,
+                                     output_path=os.path.join(directory, "video.mp4"),
+                                     encode_settings=encode_settings, progress_callback=report,
+                                     story_id=story_id)
+    timings = job_trace.breakdown()
+    if output_path is None:
+        _write_status(directory, state=FAILED, error="Video generation failed.", timings=timings)
+    else:
+        _write_status(directory, state=DONE, stage="done", progress=1.0, output_path=output_path, timings=timings)
+    return output_path
+
+
+class JobManager:
+    """
+    Runs video renders in a bounded process pool, one directory per job.
+
+    Each job directory holds status.json (state, current stage, progress,
+    per-stage timings, error) and the finished video.mp4, so any process
+    or session can poll a job by ID. Finished jobs are removed once they
+    are older than the retention period.
+    """
+
+    def __init__(self, jobs_dir=JOBS_DIR, max_workers=JOB_WORKERS, queue_limit=JOB_QUEUE_LIMIT,
+                 retention=JOB_RETENTION):
+        """
+        Args:
+            jobs_dir (str): Directory that holds one subdirectory per job.
+            max_workers (int): Maximum concurrent renders (worker processes).
+            queue_limit (int): Maximum jobs queued or running at once.
+            retention (float): Seconds a finished job is kept before cleanup.
+        """
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._active = {}
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._executor = self._new_executor()
+
+    def _new_executor(self):
+        # spawn, not fork: the app process runs threads (Streamlit, notifier, metrics server).
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _restart_executor(self):
+        """
+        Replaces a pool broken by a dead worker (e.g. an OOM-killed render).
+
+        Every job still queued or running on the old pool is lost with it and
+        marked failed. Must be called with self._lock held.
+        """
+        print("Video worker pool is broken (a render process died); restarting it.")
+        for job_id in list(self._active):
+            self._active.pop(job_id)
+            _write_status(job_dir(job_id, self.jobs_dir), state=FAILED,
+                          error="The render process stopped unexpectedly.")
+        self._executor.shutdown(wait=False)
+        self._executor = self._new_executor()
+
+    def submit(self, summary_text, api_key, article_images=None, encode_settings=None, story_id=None):
+        """
+        Queues a video render.
+
+        story_id (e.g. the article URL) is passed on to generate_video, which
+        keys the story's AI illustration on it.
+
+        Returns:
+            str: The job ID to poll with status().
+
+        Raises:
+            QueueFullError: If queue_limit jobs are already queued or running.
+        """
+        self.cleanup()
+        with self._lock:
+            if len(self._active) >= self.queue_limit:
+                raise QueueFullError(f"{len(self._active)} video jobs are already queued; try again later.")
+            job_id = uuid.uuid4().hex
+            directory = job_dir(job_id, self.jobs_dir)
+            os.makedirs(directory)
+            _write_status(directory, id=job_id, state=QUEUED, stage="queued", progress=0.0, created_at=time.time())
+            args = (_run_job, directory, summary_text, api_key, article_images, encode_settings, story_id)
+            try:
+                future = self._executor.submit(*args)
+            except BrokenProcessPool:
+                self._restart_executor()
+                future = self._executor.submit(*args)
+            self._active[job_id] = future
+        future.add_done_callback(lambda f: self._finished(job_id, directory, f))
+        return job_id
+
+    def _finished(self, job_id, directory, future):
+        with self._lock:
+            self._active.pop(job_id, None)
+        error = future.exception()
+        if error is not None:
+            # The worker crashed or raised before it could record the failure itself.
+            print(f"Video job {job_id} failed: {error}")
+            _write_status(directory, state=FAILED, error=str(error))
+
+    def status(self, job_id):
+        """
+        Returns the job's status dict (id, state, stage, progress, output_path,
+        error, timings), or None if the job is unknown or was cleaned up.
+        """
+        try:
+            with open(os.path.join(job_dir(job_id, self.jobs_dir), "status.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # ValueError covers both malformed JSON and invalid job IDs.
+            return None
+
+    def queue_depth(self):
+        with self._lock:
+            return len(self._active)
+
+    def cleanup(self, retention=None):
+        """Deletes jobs whose status was last updated over retention seconds ago. Returns how many were removed."""
+        retention = self.retention if retention is None else retention
+        cutoff = time.time() - retention
+        removed = 0
+        with self._lock:
+            active = set(self._active)
+        for job_id in os.listdir(self.jobs_dir):
+            if job_id in active or not _JOB_ID_PATTERN.fullmatch(job_id):
+                continue
+            directory = job_dir(job_id, self.jobs_dir)
+            status = self.status(job_id)
+            # Jobs not active here but never finished were cut off by a restart; a running
+            # job updates its status at every stage, so an old timestamp means it is dead.
+            updated_at = status.get("updated_at", 0) if status else os.path.getmtime(directory)
+            if updated_at < cutoff:
+                shutil.rmtree(directory, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor = self._executor
+        executor.shutdown(wait=wait)
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Returns the job manager shared by every session in this process."""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
+
+
+def submit_video_job(summary_text, api_key, article_images=None, encode_settings=None, story_id=None):
+    """Queues a video render on the shared job manager and returns its job ID."""
+    return get_job_manager().submit(summary_text, api_key, article_images=article_images,
+                                    encode_settings=encode_settings, story_id=story_id)
+
+
+def get_job_status(job_id):
+    """Returns the status dict of a job, or None if it is unknown."""
+    return get_job_manager().status(job_id)
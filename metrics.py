@@ -0,0 +1,235 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the stage duration histogram buckets.
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+METRIC_PREFIX = "news_"
+
+
+class Metrics:
+    """
+    Process-wide stage timings and event counters.
+
+    Stage durations are kept as histograms (count, sum, max and cumulative
+    buckets); counters are keyed by name and labels, e.g.
+    ("cache_hits", {"cache": "scrape"}).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+
+    def observe(self, stage, seconds):
+        """Records one duration for a stage."""
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = {"count": 0, "sum": 0.0, "max": 0.0,
+                                               "buckets": [0] * len(DURATION_BUCKETS)}
+            entry["count"] += 1
+            entry["sum"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+
+    def increment(self, name, amount=1, **labels):
+        """Adds amount to the counter with this name and labels."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        """
+        Returns the current values as plain data.
+
+        Returns:
+            dict: {"stages": {stage: {count, sum, mean, max}},
+            "counters": [{"name", "labels", "value"}]}.
+        """
+        with self._lock:
+            stages = {stage: {"count": entry["count"], "sum": entry["sum"],
+                              "mean": entry["sum"] / entry["count"], "max": entry["max"]}
+                      for stage, entry in self._stages.items()}
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+        return {"stages": stages, "counters": counters}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Renders the metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            if self._stages:
+                name = f"{METRIC_PREFIX}stage_duration_seconds"
+                lines.append(f"# HELP {name} Time spent in each pipeline stage.")
+                lines.append(f"# TYPE {name} histogram")
+                for stage, entry in sorted(self._stages.items()):
+                    label = _format_labels({"stage": stage})
+                    for bound, n in zip(DURATION_BUCKETS, entry["buckets"]):
+                        lines.append(f'{name}_bucket{_format_labels({"stage": stage, "le": f"{bound:g}"})} {n}')
+                    lines.append(f'{name}_bucket{_format_labels({"stage": stage, "le": "+Inf"})} {entry["count"]}')
+                    lines.append(f"{name}_sum{label} {entry['sum']:.6f}")
+                    lines.append(f"{name}_count{label} {entry['count']}")
+            typed = set()
+            for (counter, labels), value in sorted(self._counters.items()):
+                name = f"{METRIC_PREFIX}{counter}_total"
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name}{_format_labels(dict(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+class Trace:
+    """The spans recorded while handling one request, for a per-request timing breakdown."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans = []
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.spans.append((stage, seconds))
+
+    def breakdown(self):
+        """
+        Returns the time per stage, in the order the stages were first entered.
+
+        Stages nest (e.g. "fetch" runs inside "scrape") and media stages run
+        concurrently, so the durations do not add up to the wall time.
+
+        Returns:
+            list: Dicts with stage, seconds and calls.
+        """
+        totals = {}
+        with self._lock:
+            for stage, seconds in self.spans:
+                entry = totals.setdefault(stage, {"stage": stage, "seconds": 0.0, "calls": 0})
+                entry["seconds"] += seconds
+                entry["calls"] += 1
+        return list(totals.values())
+
+
+_metrics = Metrics()
+_current_trace = contextvars.ContextVar("news_current_trace", default=None)
+
+
+def get_metrics():
+    """Returns the process-wide metrics registry."""
+    return _metrics
+
+
+def record(stage, seconds):
+    """Records a duration measured elsewhere (e.g. time to first token) as a stage."""
+    _metrics.observe(stage, seconds)
+    current = _current_trace.get()
+    if current is not None:
+        current.add(stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    """Times the enclosed block as one occurrence of stage, including when it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def count(name, amount=1, **labels):
+    """Increments a counter, e.g. count("fallbacks", kind="newspaper_to_lxml")."""
+    _metrics.increment(name, amount, **labels)
+
+
+@contextmanager
+def trace():
+    """
+    Collects every span recorded in this context (and in work started with
+    in_current_context) into a Trace for a per-request breakdown.
+    """
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+def in_current_context(func):
+    """
+    Wraps func to run in a copy of the caller's context, so spans recorded in
+    a worker thread still land in the caller's trace. Wrap once per submit.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+    return run
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, content_type = _metrics.to_json(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = _metrics.to_prometheus(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """
+    Serves /metrics (Prometheus text format) and /metrics.json from a daemon thread.
+
+    Safe to call repeatedly (Streamlit reruns the script); only the first call starts a server.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            print(f"Serving metrics on http://{host}:{_server.server_address[1]}/metrics")
+        return _server
@@ -0,0 +1,182 @@
+import os
+import re
+import unicodedata
+from collections import Counter
+
+# Default token budget for preprocess_text; unset means no truncation.
+TOKEN_BUDGET = int(os.environ["NEWS_TOKEN_BUDGET"]) if os.environ.get("NEWS_TOKEN_BUDGET") else None
+# Paragraphs whose word shingles overlap at least this much with an earlier one are dropped.
+NEAR_DUPLICATE_THRESHOLD = 0.7
+
+# A paragraph is page furniture, not article content, only if one of these matches it
+# whole: a bare leading keyword ("Related", "Share", "Copyright") is not enough.
+_PLATFORMS = r"(facebook|twitter|x|linkedin|whatsapp|email|e-mail|instagram|reddit|copy link|print)"
+BOILERPLATE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in [
+    r"(we|this (site|website)) uses? cookies\b.{0,250}",
+    r"((accept|manage|reject) (all )?cookies|cookie (settings|preferences|policy))[.!]?",
+    r"(read|see|show) (more|less|the full story)[.!\u2026]*",
+    r"(read more|related|more on this( story)?|recommended|most read|trending|top stories)\s*:\s*[^.!?]{0,120}",
+    r"(sign up|subscribe)\b[^.!?]{0,80}\b(newsletter|updates|inbox)\b[^.!?]{0,60}[.!]?",
+    r"(advertisement|sponsored( content)?|ad)",
+    r"(share( this( article| story)?)?( on)?|follow us( on)?)[\s:]*(" + _PLATFORMS + r"[\s,|/]*)+",
+    r"(image|photo|video|picture)( caption| credit| source)?\s*[:|]\s*[^.!?]{0,100}",
+    r"(image|photo|video|picture) (caption|credit|source)\s*,\s*[^.!?]{0,100}",
+    r"(click|tap) here\b[^.!?]{0,80}[.!]?",
+    r"this (article|story) (was|has been) (updated|corrected)\b.{0,150}",
+    r"(\u00a9|\(c\)|copyright( \u00a9)?)\s*\d{4}\b.{0,100}",
+    r"[^.!?]{0,80}[.]?\s*all rights reserved\.?",
+    r"(please )?(enable javascript|your browser (does not|doesn't) support)\b.{0,120}",
+]]
+BOILERPLATE_MAX_CHARS = 300
+
+
+def estimate_tokens(text):
+    """Rough token count for Gemini models (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def normalize_whitespace(text):
+    """Normalizes Unicode spacing, collapses runs of spaces and limits blank lines to one."""
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"[ \t\f\v\u00a0\u200b]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def is_boilerplate(paragraph):
+    """True for short paragraphs that look like cookie banners, share bars, "read more" links and the like."""
+    if len(paragraph) > BOILERPLATE_MAX_CHARS:
+        return False
+    paragraph = paragraph.strip()
+    return any(pattern.fullmatch(paragraph) for pattern in BOILERPLATE_PATTERNS)
+
+
+def _shingles(text, size=2):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _is_near_duplicate(shingles, kept_shingles, shingle_index):
+    """Checks Jaccard similarity only against kept paragraphs that share a shingle."""
+    overlap = Counter()
+    for shingle in shingles:
+        for j in shingle_index.get(shingle, ()):
+            overlap[j] += 1
+    for j, shared in overlap.items():
+        if shared / (len(shingles) + len(kept_shingles[j]) - shared) >= NEAR_DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+
+def _split_units(text):
+    """
+    Splits into paragraphs, into lines when there are no blank lines (as in
+    caption transcripts), or into sentences when the text is one block.
+    """
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    if len(paragraphs) > 1:
+        return paragraphs, "\n\n"
+    lines = [line.strip() for line in text.split("\n") if line.strip()]
+    if len(lines) > 1:
+        return lines, "\n"
+    return [s for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()], " "
+
+
+def _truncate(units, joiner, token_budget):
+    """
+    Keeps leading units up to the budget, cutting the last one at a sentence boundary if possible.
+
+    The budget is checked on the length of the joined text, joiners included,
+    so estimate_tokens of the result never exceeds it. If even the first unit
+    does not fit, a prefix of it is kept, so the result is never empty.
+    """
+    # estimate_tokens(text) <= token_budget exactly when len(text) <= max_chars.
+    max_chars = token_budget * 4 - 1
+    kept = []
+    used = 0
+    for unit in units:
+        separator = len(joiner) if kept else 0
+        if used + separator + len(unit) <= max_chars:
+            kept.append(unit)
+            used += separator + len(unit)
+            continue
+        remaining_chars = max(0, max_chars - used - separator)
+        if remaining_chars > 200 or not kept:
+            partial = unit[:remaining_chars]
+            cut = max(partial.rfind(". "), partial.rfind("! "), partial.rfind("? "))
+            if cut > 0:
+                kept.append(partial[:cut + 1])
+            else:
+                kept.append(partial.rsplit(" ", 1)[0])
+        break
+    return kept
+
+
+def preprocess_text(text, token_budget=TOKEN_BUDGET):
+    """
+    Cleans scraped article or transcript text before it is sent to the model.
+
+    Normalizes whitespace, drops boilerplate paragraphs and exact or
+    near-duplicate paragraphs (repeated captions, duplicated transcript
+    lines), then truncates to the token budget, keeping the lead of the story.
+
+    Args:
+        text (str): Raw article text or transcript.
+        token_budget (int): Maximum estimated tokens to keep, or None for no limit.
+
+    Returns:
+        tuple: (cleaned_text, stats) where stats has tokens_before, tokens_after,
+        tokens_saved, boilerplate_removed, duplicates_removed and truncated.
+    """
+    tokens_before = estimate_tokens(text)
+    units, joiner = _split_units(normalize_whitespace(text))
+
+    kept = []
+    kept_shingles = []
+    shingle_index = {}
+    seen_exact = set()
+    boilerplate_removed = 0
+    duplicates_removed = 0
+    for unit in units:
+        if is_boilerplate(unit):
+            boilerplate_removed += 1
+            continue
+        key = re.sub(r"\W+", " ", unit.lower()).strip()
+        if key in seen_exact:
+            duplicates_removed += 1
+            continue
+        shingles = _shingles(unit)
+        if len(shingles) >= 5 and _is_near_duplicate(shingles, kept_shingles, shingle_index):
+            duplicates_removed += 1
+            continue
+        seen_exact.add(key)
+        for shingle in shingles:
+            shingle_index.setdefault(shingle, []).append(len(kept_shingles))
+        kept_shingles.append(shingles)
+        kept.append(unit)
+
+    # Never hand the model an empty text because everything looked like boilerplate.
+    if not kept:
+        kept = units
+        boilerplate_removed = duplicates_removed = 0
+
+    truncated = False
+    if token_budget is not None and estimate_tokens(joiner.join(kept)) > token_budget:
+        kept = _truncate(kept, joiner, token_budget)
+        truncated = True
+
+    cleaned = joiner.join(kept)
+    tokens_after = estimate_tokens(cleaned)
+    stats = {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": max(0, tokens_before - tokens_after),
+        "boilerplate_removed": boilerplate_removed,
+        "duplicates_removed": duplicates_removed,
+        "truncated": truncated,
+    }
+    return cleaned, stats
@@ -0,0 +1,235 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+from metrics import count, record
+
+# Priority lanes: lower values are served first.
+INTERACTIVE = 0
+BATCH = 1
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class RetryableError(Exception):
+    """Raised by a scheduled call for a failure worth retrying (429/5xx)."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Returns the seconds to wait from a Retry-After header value, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        import email.utils
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_info(exc):
+    """Returns (retryable, retry_after) for an exception raised by a scheduled call."""
+    if isinstance(exc, RetryableError):
+        return True, exc.retry_after
+    # google.api_core exceptions carry the HTTP status in .code
+    code = getattr(exc, "code", None)
+    if callable(code):
+        return False, None
+    if code in RETRYABLE_STATUS_CODES:
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        return True, parse_retry_after(headers.get("Retry-After"))
+    return False, None
+
+
+class TokenBucket:
+    """Refills `capacity` units evenly over `period` seconds."""
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill(now)
+        # A request larger than the bucket would never fit; let it through once full.
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount):
+        self.available -= min(amount, self.capacity)
+
+
+class Scheduler:
+    """
+    Process-wide rate limiter and retry scheduler for model API calls.
+
+    Each model gets token buckets for requests and tokens per minute and its
+    own wait queue. Callers waiting for the same model are served strictly by
+    priority lane, then arrival order, so interactive requests overtake
+    queued batch work; a throttled model never holds up calls to another. Failed calls are
+    retried with exponential backoff and full jitter, honoring Retry-After,
+    and a 429 pauses the whole model so other callers don't pile on.
+    """
+
+    def __init__(self, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._limits = {}
+        self._paused_until = {}
+        # Per model: heap of (priority, arrival) of the callers waiting for it.
+        self._waiters = {}
+        self._counter = itertools.count()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "throttled_seconds": 0.0}
+
+    def configure(self, model, requests_per_minute=None, tokens_per_minute=None):
+        """Sets the per-minute limits for a model. None means unlimited."""
+        with self._cond:
+            self._limits[model] = (
+                TokenBucket(requests_per_minute) if requests_per_minute else None,
+                TokenBucket(tokens_per_minute) if tokens_per_minute else None,
+            )
+            self._cond.notify_all()
+
+    def _wait_time(self, model, tokens, now):
+        wait = max(0.0, self._paused_until.get(model, 0.0) - now)
+        request_bucket, token_bucket = self._limits.get(model, (None, None))
+        if request_bucket is not None:
+            wait = max(wait, request_bucket.wait_time(1, now))
+        if token_bucket is not None:
+            wait = max(wait, token_bucket.wait_time(tokens, now))
+        return wait
+
+    def acquire(self, model, tokens=1, priority=INTERACTIVE):
+        """Blocks until the call may proceed under the model's limits and the caller's priority."""
+        entry = (priority, next(self._counter))
+        start = time.monotonic()
+        with self._cond:
+            waiters = self._waiters.setdefault(model, [])
+            heapq.heappush(waiters, entry)
+            try:
+                while True:
+                    if waiters[0] == entry:
+                        now = time.monotonic()
+                        wait = self._wait_time(model, tokens, now)
+                        if wait <= 0:
+                            request_bucket, token_bucket = self._limits.get(model, (None, None))
+                            if request_bucket is not None:
+                                request_bucket.take(1)
+                            if token_bucket is not None:
+                                token_bucket.take(tokens)
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+            finally:
+                waiters.remove(entry)
+                heapq.heapify(waiters)
+                if not waiters:
+                    del self._waiters[model]
+                self._cond.notify_all()
+            waited = time.monotonic() - start
+            self.stats["throttled_seconds"] += waited
+        record("rate_limit_wait", waited)
+
+    def pause(self, model, seconds):
+        """Holds back all calls to a model for the given number of seconds."""
+        with self._cond:
+            until = time.monotonic() + seconds
+            self._paused_until[model] = max(self._paused_until.get(model, 0.0), until)
+            self._cond.notify_all()
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, never shorter than Retry-After."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def call(self, model, func, *args, tokens=1, priority=INTERACTIVE, **kwargs):
+        """
+        Runs func(*args, **kwargs) under the model's limits, retrying 429/5xx failures.
+
+        Args:
+            model (str): Name whose limits apply.
+            func (callable): The API call.
+            tokens (int): Estimated tokens the call consumes.
+            priority (int): INTERACTIVE or BATCH.
+
+        Returns:
+            Whatever func returns. The last exception is raised once retries run out.
+        """
+        attempt = 0
+        while True:
+            self.acquire(model, tokens=tokens, priority=priority)
+            with self._cond:
+                self.stats["calls"] += 1
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                retryable, retry_after = _retry_info(e)
+                if not retryable or attempt >= self.max_retries:
+                    with self._cond:
+                        self.stats["failures"] += 1
+                    count("api_failures", model=model)
+                    raise
+                delay = self.backoff_delay(attempt, retry_after)
+                if getattr(e, "status_code", None) == 429 or getattr(e, "code", None) == 429:
+                    self.pause(model, delay)
+                with self._cond:
+                    self.stats["retries"] += 1
+                count("api_retries", model=model)
+                print(f"{model} call failed ({e}); retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                attempt += 1
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+# Per-minute limits by model name, declared by the modules that call each model.
+_model_limits = {}
+
+
+def register_model(model, requests_per_minute=None, tokens_per_minute=None):
+    """
+    Declares a model's per-minute limits on the shared scheduler.
+
+    Called at import time by the module that owns the model name, so the
+    limits follow the name the calls are actually made with.
+    """
+    with _scheduler_lock:
+        _model_limits[model] = (requests_per_minute, tokens_per_minute)
+        if _scheduler is not None:
+            _scheduler.configure(model, requests_per_minute, tokens_per_minute)
+
+
+def get_scheduler():
+    """Returns the scheduler shared by every session and worker in this process."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(max_retries=int(os.environ.get("NEWS_API_MAX_RETRIES", 5)))
+            for model, (requests_per_minute, tokens_per_minute) in _model_limits.items():
+                _scheduler.configure(model, requests_per_minute, tokens_per_minute)
+        return _scheduler
@@ -1,73 +1,240 @@
-from newspaper import Article
+import json
+import os
+import threading
+from urllib.parse import urljoin
+
+from cache import DEFAULT_CACHE_DIR, DiskCache, content_hash
+from fetcher import USER_AGENT, fetch_url
+from metrics import count, span
+
+SCRAPE_CACHE_PATH = os.environ.get(
+    "NEWS_SCRAPE_CACHE_PATH", os.path.join(DEFAULT_CACHE_DIR, "scrape.sqlite3")
+)
+
+# The lxml extractor stops reading a page once it has this much paragraph text.
+MAX_ARTICLE_CHARS = int(os.environ.get("NEWS_SCRAPE_MAX_CHARS", 200000))
+# Paragraphs this short (bylines, buttons, captions) are skipped by the fallback extractors.
+MIN_PARAGRAPH_CHARS = 20
+
+_scrape_cache = None
+_scrape_cache_lock = threading.Lock()
+
+
+def get_scrape_cache():
+    """Returns the cache of parsed pages, keyed by URL and downloaded bytes."""
+    global _scrape_cache
+    with _scrape_cache_lock:
+        if _scrape_cache is None:
+            _scrape_cache = DiskCache(SCRAPE_CACHE_PATH, max_entries=5000)
+        return _scrape_cache
+
 
 def scrape_article(url):
     """
     Scrapes the article content from the given URL.
     
+    The page is downloaded once through the HTTP cache and the same bytes are
+    handed to newspaper3k and, if that fails, to the lxml extractor, with
+    BeautifulSoup as the last resort.
+    When the page has not changed since it was last parsed, the stored parse
+    result is returned.
+    
     Args:
         url (str): The URL of the news article.
         
     Returns:
-        str: The text content of the article, or None if an error occurs.
+        tuple: (text, top_image, images), or None if an error occurs.
     """
+    with span("scrape"):
+        return _scrape_article(url)
+
+def _scrape_article(url):
+    try:
+        with span("fetch"):
+            page = fetch_url(url, timeout=10)
+    except Exception as e:
+        print(f"Failed to download {url}: {e}")
+        count("errors", stage="fetch")
+        return None
+    count("http_cache", status=page.status)
 
+    key = content_hash(url, content_hash(page.content))
+    cache = None
     try:
-        from newspaper import Config
+        cache = get_scrape_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            count("cache_hits", cache="scrape")
+            text, top_image, images = json.loads(cached)
+            return text, top_image, images
+        count("cache_misses", cache="scrape")
+    except Exception as e:
+        print(f"Scrape cache unavailable: {e}")
+        cache = None
+
+    with span("parse_newspaper"):
+        result = parse_with_newspaper(url, page.text)
+    if result is None:
+        count("fallbacks", kind="newspaper_to_lxml")
+        with span("parse_lxml"):
+            result = scrape_with_lxml(page.url, page.content, encoding=page.encoding)
+    if result is None:
+        count("fallbacks", kind="lxml_to_bs4")
+        with span("parse_bs4"):
+            result = scrape_with_bs4(page.url, html=page.content)
+    if result is None:
+        count("errors", stage="parse")
+
+    if result is not None and cache is not None:
+        try:
+            cache.set(key, json.dumps(list(result)))
+        except Exception as e:
+            print(f"Failed to cache scrape result: {e}")
+    return result
+
+def parse_with_newspaper(url, html):
+    """Extracts the article from already downloaded HTML with newspaper3k."""
+    try:
+        # newspaper3k is slow to import; load it on the first scrape, not at app start.
+        from newspaper import Article, Config
         
-        user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         config = Config()
-        config.browser_user_agent = user_agent
+        config.browser_user_agent = USER_AGENT
         config.request_timeout = 10
         
         article = Article(url, config=config)
-        article.download()
+        article.download(input_html=html)
         article.parse()
+        if not article.text:
+            raise ValueError("no article text found")
         return article.text, article.top_image, list(article.images)
     except Exception as e:
         print(f"Newspaper3k failed: {e}. Trying fallback...")
-        return scrape_with_bs4(url)
+        return None
 
-def scrape_with_bs4(url):
-    """Fallback scraper using BeautifulSoup."""
+def resolve_image_url(src, base_url):
+    """
+    Resolves an img src or og:image value against the page's base URL.
+    
+    Returns:
+        str: The absolute http(s) URL, or None for empty, data: and other non-web sources.
+    """
+    if not src:
+        return None
+    src = src.strip()
+    if not src or src.startswith('data:'):
+        return None
+    absolute = urljoin(base_url, src)
+    return absolute if absolute.startswith(('http://', 'https://')) else None
+
+def scrape_with_lxml(url, html, encoding=None, max_chars=MAX_ARTICLE_CHARS, chunk_size=65536):
+    """
+    Fast fallback extractor built on lxml's incremental HTML parser.
+    
+    Paragraph text, og:image and <img> sources (including lazy-load data-src)
+    are collected as elements close. Relative image URLs are resolved against
+    the <base href> if the page has one, otherwise against the page URL.
+    Parsing stops once max_chars of paragraph text is collected, so huge pages
+    (endless comment threads, "more stories" lists) are not read to the end.
+    
+    Args:
+        url (str): The URL the page was served from.
+        html (bytes): The page body.
+        encoding (str): The body's encoding if known; otherwise lxml detects it.
+        max_chars (int): Paragraph text after which the rest of the page is skipped.
+        
+    Returns:
+        tuple: (text, top_image, images), or None if no text was found or lxml failed.
+    """
+    try:
+        from lxml import etree
+        
+        parser = etree.HTMLPullParser(events=('end',), tag=('p', 'img', 'meta', 'base'), encoding=encoding)
+        base_url = url
+        top_image = None
+        paragraphs = []
+        images = []
+        seen_images = set()
+        collected = 0
+        
+        def handle_events():
+            nonlocal base_url, top_image, collected
+            for _, element in parser.read_events():
+                tag = element.tag
+                if tag == 'p':
+                    text = ''.join(element.itertext()).strip()
+                    if len(text) > MIN_PARAGRAPH_CHARS:
+                        paragraphs.append(text)
+                        collected += len(text)
+                    # Free the paragraph's subtree; its text is all we need.
+                    element.clear(keep_tail=True)
+                elif tag == 'img':
+                    src = resolve_image_url(element.get('src') or element.get('data-src'), base_url)
+                    if src and src not in seen_images:
+                        seen_images.add(src)
+                        images.append(src)
+                elif tag == 'meta':
+                    if top_image is None and element.get('property') == 'og:image':
+                        top_image = resolve_image_url(element.get('content'), base_url)
+                elif tag == 'base' and element.get('href'):
+                    base_url = urljoin(url, element.get('href').strip())
+        
+        for start in range(0, len(html), chunk_size):
+            parser.feed(html[start:start + chunk_size])
+            handle_events()
+            if collected >= max_chars:
+                break
+        else:
+            # libxml2 holds back the trailing text until the input ends, so an
+            # unterminated last paragraph only closes here.
+            parser.close()
+            handle_events()
+        
+        if not paragraphs:
+            return None
+        return "\n\n".join(paragraphs), top_image, images
+    except Exception as e:
+        print(f"lxml extraction failed: {e}")
+        return None
+
+def scrape_with_bs4(url, html=None):
+    """
+    Fallback scraper using BeautifulSoup.
+    
+    Args:
+        url (str): The URL of the page.
+        html (bytes): The page body if already downloaded; fetched otherwise.
+    """
     try:
-        import requests
         from bs4 import BeautifulSoup
-        import urllib3
         
-        # Suppress SSL warnings
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        if html is None:
+            html = fetch_url(url, timeout=10).content
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        # Disable SSL verification
-        response = requests.get(url, headers=headers, timeout=10, verify=False)
-        response.raise_for_status()
+        soup = BeautifulSoup(html, 'html.parser')
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        # Relative URLs resolve against <base href>, else the page URL
+        base_url = url
+        base = soup.find('base', href=True)
+        if base:
+            base_url = urljoin(url, base['href'].strip())
         
         # Extract Text
-        paragraphs = soup.find_all('p')
-        text = "\n\n".join([p.get_text().strip() for p in paragraphs if len(p.get_text().strip()) > 20])
+        paragraphs = (p.get_text().strip() for p in soup.find_all('p'))
+        text = "\n\n".join([p for p in paragraphs if len(p) > MIN_PARAGRAPH_CHARS])
         
         # Extract Top Image (OG Image)
         top_image = None
         og_image = soup.find('meta', property='og:image')
         if og_image:
-            top_image = og_image.get('content')
+            top_image = resolve_image_url(og_image.get('content'), base_url)
             
         # Extract All Images
         images = []
         for img in soup.find_all('img'):
-            src = img.get('src')
-            if src:
-                if src.startswith('//'):
-                    src = 'https:' + src
-                elif src.startswith('/'):
-                    # Need base URL, simple hack for now or ignore relative
-                    pass 
-                elif src.startswith('http'):
-                    images.append(src)
+            src = resolve_image_url(img.get('src'), base_url)
+            if src and src not in images:
+                images.append(src)
         
         if not text:
             return None
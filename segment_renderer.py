@@ -0,0 +1,246 @@
+import hashlib
+import json
+import math
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import DEFAULT_CACHE_DIR, DiskCache, content_hash
+from metrics import count, in_current_context, span
+from video_encoding import get_ffmpeg_exe, resolve_encode_settings
+
+SEGMENT_CACHE_PATH = os.environ.get("NEWS_SEGMENT_CACHE_PATH", os.path.join(DEFAULT_CACHE_DIR, "segments.sqlite3"))
+SEGMENT_CACHE_TTL = float(os.environ.get("NEWS_SEGMENT_CACHE_TTL", 7 * 24 * 3600))
+SEGMENT_CACHE_MAX_BYTES = int(os.environ.get("NEWS_SEGMENT_CACHE_MAX_MB", 500)) * 1024 * 1024
+# Sentences synthesized or encoded at the same time within one render.
+SEGMENT_WORKERS = int(os.environ.get("NEWS_SEGMENT_WORKERS", 4))
+TTS_LANG = "en"
+# Bump when the slide layout or segment encoding changes, so old segments are not reused.
+SEGMENT_FORMAT = 1
+# Encode settings that change a segment's bytes. threads is left out: it only affects speed.
+SEGMENT_SETTING_KEYS = ("preset", "crf", "fps", "resolution")
+
+_DURATION_PATTERN = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def split_sentences(summary_text):
+    """Splits a summary into slide sentences, or one slide for the whole text if it has fewer than two."""
+    sentences = [s.strip() for s in summary_text.split('.') if s.strip()]
+    if len(sentences) < 2:
+        sentences = [summary_text]
+    return sentences
+
+
+def image_digest(img):
+    """Returns a SHA-256 hex digest of an image's pixels, mode and size."""
+    h = hashlib.sha256(f"{img.mode}:{img.size[0]}x{img.size[1]}".encode("utf-8"))
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def tts_key(sentence, lang=TTS_LANG):
+    return content_hash("tts", lang, sentence)
+
+
+def segment_key(sentence, image_hash, settings=None):
+    """Cache key of an encoded segment: sentence text, slide image and the settings that affect the output."""
+    settings = resolve_encode_settings(settings)
+    encode = json.dumps({name: settings[name] for name in SEGMENT_SETTING_KEYS}, sort_keys=True)
+    return content_hash("segment", SEGMENT_FORMAT, TTS_LANG, sentence, image_hash, encode)
+
+
+_segment_cache = None
+_segment_cache_lock = threading.Lock()
+
+
+def get_segment_cache():
+    """Returns the cache of narration clips and encoded segments, or None if it can't be opened."""
+    global _segment_cache
+    with _segment_cache_lock:
+        if _segment_cache is None:
+            try:
+                _segment_cache = DiskCache(SEGMENT_CACHE_PATH, ttl=SEGMENT_CACHE_TTL,
+                                           max_bytes=SEGMENT_CACHE_MAX_BYTES)
+            except Exception as e:
+                print(f"Segment cache unavailable: {e}")
+                return None
+        return _segment_cache
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def synthesize_sentence(sentence, audio_path, synthesize, cache=None):
+    """
+    Writes the narration of one sentence to audio_path, reusing a cached clip if there is one.
+
+    Args:
+        sentence (str): The sentence to narrate.
+        audio_path (str): Where to write the MP3.
+        synthesize (callable): Called as synthesize(text, audio_path) on a cache miss.
+        cache (DiskCache): Cache of clips by sentence, or None to always synthesize.
+    """
+    key = tts_key(sentence)
+    data = cache.get(key) if cache is not None else None
+    if data is not None:
+        count("cache_hits", cache="tts")
+        _write_bytes(audio_path, data)
+        return audio_path
+    count("cache_misses", cache="tts")
+    synthesize(sentence, audio_path)
+    if cache is not None:
+        cache.set(key, _read_bytes(audio_path))
+    return audio_path
+
+
+def synthesize_sentences(sentences, workdir, synthesize, cache=None, max_workers=SEGMENT_WORKERS):
+    """
+    Narrates each sentence into its own clip, several at a time.
+
+    Returns:
+        list: The MP3 paths, in sentence order.
+    """
+    paths = [os.path.join(workdir, f"narration_{i}.mp3") for i in range(len(sentences))]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(in_current_context(synthesize_sentence), sentence, path, synthesize, cache)
+                   for sentence, path in zip(sentences, paths)]
+        for future in futures:
+            future.result()
+    return paths
+
+
+def audio_duration(audio_path):
+    """Returns the duration in seconds ffmpeg reports for an audio file."""
+    result = subprocess.run([get_ffmpeg_exe(), "-hide_banner", "-i", audio_path], capture_output=True, text=True)
+    match = _DURATION_PATTERN.search(result.stderr)
+    if match is None:
+        raise RuntimeError(f"could not read the duration of {audio_path}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def encode_segment(slide, audio_path, output_path, workdir, settings=None):
+    """
+    Encodes one slide with its narration as a standalone MP4.
+
+    The slide stays on screen for the whole clip, rounded up to a whole frame,
+    so the narration is never cut and each segment starts in sync.
+
+    Args:
+        slide (PIL.Image.Image): The slide with its text overlay.
+        audio_path (str): The sentence's narration.
+        output_path (str): Where to write the segment.
+        workdir (str): Private directory for the slide image.
+        settings (dict): Encode settings, see video_encoding.DEFAULT_ENCODE_SETTINGS.
+    """
+    settings = resolve_encode_settings(settings)
+    fps = settings["fps"]
+    duration = math.ceil(audio_duration(audio_path) * fps) / fps
+    slide_path = os.path.splitext(output_path)[0] + ".png"
+    slide.save(slide_path, compress_level=1)
+
+    filters = []
+    if settings["resolution"]:
+        width, height = settings["resolution"]
+        filters.append(f"scale={width}:{height}")
+    filters.append("format=yuv420p")
+    cmd = [
+        get_ffmpeg_exe(), "-y", "-loglevel", "error",
+        "-loop", "1", "-framerate", str(fps), "-i", slide_path,
+        "-i", audio_path,
+        "-t", f"{duration:.3f}",
+        "-vf", ",".join(filters),
+        "-r", str(fps),
+        "-c:v", "libx264",
+        "-preset", settings["preset"],
+        "-crf", str(settings["crf"]),
+        "-tune", "stillimage",
+        "-threads", str(settings["threads"]),
+        "-c:a", "aac",
+        output_path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()}")
+    return output_path
+
+
+def concat_segments(segment_paths, output_path, workdir):
+    """Joins encoded segments into one MP4 without re-encoding them."""
+    list_path = os.path.join(workdir, "segments.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            f.write(f"file '{path}'\n")
+    cmd = [get_ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+           "-c", "copy", "-movflags", "+faststart", output_path]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat failed: {result.stderr.strip()}")
+    return output_path
+
+
+def render_segments(sentences, images, audio_paths, output_path, workdir, compose, settings=None, cache=None,
+                    max_workers=SEGMENT_WORKERS):
+    """
+    Renders a video as one segment per sentence, re-encoding only segments that are not cached.
+
+    A segment is cached under its sentence, the hash of its slide image and the
+    encode settings, so after an edit to the summary only the changed sentences
+    are encoded again; the rest are copied from the cache and all of them are
+    concatenated without re-encoding.
+
+    Args:
+        sentences (list): The slide sentences, in order.
+        images (list): The background image of each sentence's slide.
+        audio_paths (list): The narration clip of each sentence.
+        output_path (str): Where to write the MP4.
+        workdir (str): Private directory for segment files.
+        compose (callable): Called as compose(sentence, image) to build a slide.
+        settings (dict): Encode settings, see video_encoding.DEFAULT_ENCODE_SETTINGS.
+        cache (DiskCache): Cache of encoded segments, or None to encode every segment.
+
+    Returns:
+        dict: Number of segments, and how many were encoded and reused.
+    """
+    settings = resolve_encode_settings(settings)
+    segment_paths = [os.path.join(workdir, f"segment_{i}.mp4") for i in range(len(sentences))]
+    digests = {}
+    missing = []
+    for i, (sentence, img) in enumerate(zip(sentences, images)):
+        # Slides often share a background image; hash each one once.
+        if id(img) not in digests:
+            digests[id(img)] = image_digest(img)
+        key = segment_key(sentence, digests[id(img)], settings)
+        data = cache.get(key) if cache is not None else None
+        if data is not None:
+            count("cache_hits", cache="segment")
+            _write_bytes(segment_paths[i], data)
+        else:
+            count("cache_misses", cache="segment")
+            missing.append((i, key))
+
+    def render(i, key):
+        slide = compose(sentences[i], images[i])
+        encode_segment(slide, audio_paths[i], segment_paths[i], workdir, settings)
+        if cache is not None:
+            cache.set(key, _read_bytes(segment_paths[i]))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(in_current_context(render), i, key) for i, key in missing]
+        for future in futures:
+            future.result()
+
+    with span("concat"):
+        concat_segments(segment_paths, output_path, workdir)
+    stats = {"segments": len(sentences), "encoded": len(missing), "reused": len(sentences) - len(missing)}
+    print(f"Video segments: {stats['encoded']} encoded, {stats['reused']} reused from cache.")
+    return stats
@@ -0,0 +1,205 @@
+import os
+import re
+import sys
+import types
+
+import pytest
+
+import analyzer
+import cache
+import dedup_index
+from cache import DiskCache
+from dedup_index import DedupIndex
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, f"{name}.txt"), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    monkeypatch.setattr(dedup_index.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def gemini_calls(tmp_path, monkeypatch):
+    """Points the analysis cache and near-duplicate index at fresh files with a 60 s TTL and counts model calls."""
+    analysis_cache = DiskCache(str(tmp_path / "analysis.sqlite3"), ttl=60)
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"), ttl=60)
+    monkeypatch.setattr(analyzer, "get_analysis_cache", lambda: analysis_cache)
+    monkeypatch.setattr(analyzer, "get_dedup_index", lambda: index)
+    monkeypatch.setattr(analyzer, "REUSE_NEAR_DUPLICATES", True)
+    calls = []
+
+    def generate(prompt, api_key, priority):
+        calls.append(prompt)
+        return f"Summary: analysis {len(calls)}\n\nBias Rating: Center"
+    monkeypatch.setattr(analyzer, "_generate", generate)
+    return calls
+
+
+def test_syndicated_copy_reuses_the_analysis(clock, gemini_calls):
+    first = analyzer.analyze_article(load("syndicated_wire"), "key")
+    assert analyzer.analyze_article(load("syndicated_republished"), "key") == first
+    assert len(gemini_calls) == 1
+
+
+def test_near_duplicates_expire_with_the_analysis_cache(clock, gemini_calls):
+    text = load("syndicated_wire")
+    analyzer.analyze_article(text, "key")
+    clock[0] += 30
+    analyzer.analyze_article(load("syndicated_republished"), "key")
+    clock[0] += 31
+    # Both the exact entry and the indexed document are past the TTL now.
+    analyzer.analyze_article(text, "key")
+    analyzer.analyze_article(load("syndicated_republished"), "key")
+    assert len(gemini_calls) == 2
+
+
+def test_prompt_change_does_not_reuse_old_analyses(clock, gemini_calls, monkeypatch):
+    analyzer.analyze_article(load("syndicated_wire"), "key")
+    monkeypatch.setattr(analyzer, "PROMPT_TEMPLATE", analyzer.PROMPT_TEMPLATE + "\nBe brief.")
+    analyzer.analyze_article(load("syndicated_republished"), "key")
+    assert len(gemini_calls) == 2
+
+
+def test_empty_stream_is_not_cached(clock, gemini_calls, monkeypatch):
+    monkeypatch.setattr(analyzer, "_generate_stream", lambda prompt, api_key, priority: iter(()))
+    pieces = list(analyzer.analyze_article_stream(load("syndicated_wire"), "key"))
+    assert pieces[-1].startswith("Error analyzing article")
+    assert analyzer.get_analysis_cache().stats()["entries"] == 0
+    assert analyzer.get_dedup_index().stats()["documents"] == 0
+
+
+def long_story(sentences=120):
+    return " ".join(f"Sentence {i} of the long report names official {i} and cites figure {i * 7}."
+                    for i in range(sentences))
+
+
+def test_split_into_chunks_keeps_every_word():
+    text = long_story()
+    chunks = analyzer.split_into_chunks(text, max_tokens=200)
+    assert len(chunks) > 1
+    assert all(analyzer.estimate_tokens(chunk) <= 200 for chunk in chunks)
+    # Chunks break between sentences, so joining them restores the text.
+    assert " ".join(chunks) == text
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_split_into_chunks_splits_unpunctuated_text_on_words():
+    text = " ".join(f"word{i}" for i in range(3000))
+    chunks = analyzer.split_into_chunks(text, max_tokens=100)
+    assert all(analyzer.estimate_tokens(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+@pytest.fixture
+def map_reduce_calls(monkeypatch):
+    """Stubs the model so each chunk prompt returns a summary naming its part, and records every prompt."""
+    calls = []
+
+    def generate(prompt, api_key, priority):
+        calls.append(prompt)
+        part = re.search(r"part (\d+) of (\d+)", prompt)
+        if part:
+            return f"Summary: partial {part.group(1)}\n\nBias Notes: None"
+        return "Summary: combined\n\nBias Rating: 2"
+    monkeypatch.setattr(analyzer, "_generate", generate)
+    return calls
+
+
+def test_short_text_is_analyzed_in_one_call(map_reduce_calls):
+    analyzer.analyze_article(long_story(10), "key", use_cache=False, long_threshold=1000)
+    assert len(map_reduce_calls) == 1
+    assert map_reduce_calls[0].startswith(analyzer.PROMPT_TEMPLATE.split("{text}")[0])
+
+
+def test_long_text_is_mapped_then_reduced(map_reduce_calls):
+    text = long_story()
+    chunks = analyzer.split_into_chunks(text, max_tokens=300)
+    assert len(chunks) > 2
+    result = analyzer.analyze_article(text, "key", use_cache=False, long_threshold=1000, chunk_tokens=300)
+    assert result == "Summary: combined\n\nBias Rating: 2"
+    assert len(map_reduce_calls) == len(chunks) + 1
+    chunk_prompts, reduce_prompt = map_reduce_calls[:-1], map_reduce_calls[-1]
+    # Every chunk was sent, each exactly once.
+    assert sorted(chunk_prompts) == sorted(
+        analyzer.CHUNK_PROMPT_TEMPLATE.format(index=i + 1, count=len(chunks), text=chunk)
+        for i, chunk in enumerate(chunks))
+    # The reduce call gets every partial result, in order.
+    parts = [f"Part {i + 1}:\nSummary: partial {i + 1}\n\nBias Notes: None" for i in range(len(chunks))]
+    assert reduce_prompt == analyzer.REDUCE_PROMPT_TEMPLATE.format(text="\n\n".join(parts))
+
+
+def test_long_text_stream_streams_only_the_reduce_call(map_reduce_calls, monkeypatch):
+    streamed = []
+
+    def generate_stream(prompt, api_key, priority):
+        streamed.append(prompt)
+        yield "Summary: combined"
+    monkeypatch.setattr(analyzer, "_generate_stream", generate_stream)
+    pieces = list(analyzer.analyze_article_stream(long_story(), "key", use_cache=False, long_threshold=1000,
+                                                  chunk_tokens=300))
+    assert pieces == ["Summary: combined"]
+    assert len(streamed) == 1
+    assert all(f"Part {i + 1}:\nSummary: partial {i + 1}" in streamed[0] for i in range(len(map_reduce_calls)))
+
+
+@pytest.fixture
+def fake_genai(monkeypatch):
+    """Installs a stand-in google.generativeai whose configure swaps a process-global default client."""
+    genai = types.ModuleType("google.generativeai")
+    client = types.ModuleType("google.generativeai.client")
+    default = {}
+
+    def configure(api_key, **kwargs):
+        default["client"] = types.SimpleNamespace(api_key=api_key)
+
+    class GenerativeModel:
+        def __init__(self, model_name):
+            self.model_name = model_name
+            # Like the SDK, the client is only looked up on the first request.
+            self._client = None
+
+    genai.configure = configure
+    genai.GenerativeModel = GenerativeModel
+    genai.client = client
+    client.get_default_generative_client = lambda: default["client"]
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    monkeypatch.setitem(sys.modules, "google.generativeai.client", client)
+    monkeypatch.setattr(analyzer, "GEMINI_API_ENDPOINT", None)
+    analyzer.get_model.cache_clear()
+    yield genai
+    analyzer.get_model.cache_clear()
+
+
+def test_each_model_keeps_its_own_api_key(fake_genai):
+    model_a = analyzer.get_model("KEY_A")
+    model_b = analyzer.get_model("KEY_B")
+    # Configuring KEY_B must not move model A over to KEY_B's client.
+    assert model_a._client.api_key == "KEY_A"
+    assert model_b._client.api_key == "KEY_B"
+    assert analyzer.get_model("KEY_A") is model_a
+
+
+def test_real_sdk_models_keep_their_own_clients(monkeypatch):
+    pytest.importorskip("google.generativeai")
+    monkeypatch.setattr(analyzer, "GEMINI_API_ENDPOINT", None)
+    analyzer.get_model.cache_clear()
+    try:
+        model_a = analyzer.get_model("KEY_A")
+        model_b = analyzer.get_model("KEY_B")
+        # The binding must reach the attribute the installed SDK actually sends requests through.
+        assert model_a._client is not None
+        assert model_a._client is not model_b._client
+    finally:
+        analyzer.get_model.cache_clear()
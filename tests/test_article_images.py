@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import video_generator
+from image_cache import ImageCache
+
+
+def encode(size, color=(0, 0, 0), noise=False, format="JPEG"):
+    if noise:
+        img = Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3))
+    else:
+        img = Image.new("RGB", size, color)
+    buffer = BytesIO()
+    img.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+class FakeResponse:
+    """A streaming response that records how much of the body was read and whether it was closed."""
+
+    def __init__(self, body, status_code=200, delay=0.0, endless=False):
+        self.body = body
+        self.status_code = status_code
+        self.delay = delay
+        self.endless = endless
+        self.chunks_read = 0
+        self.closed = threading.Event()
+
+    def iter_content(self, chunk_size):
+        time.sleep(self.delay)
+        offset = 0
+        while offset < len(self.body) or self.endless:
+            self.chunks_read += 1
+            yield self.body[offset:offset + chunk_size] or b"\0" * chunk_size
+            offset += chunk_size
+            if self.endless:
+                time.sleep(0.01)
+
+    def close(self):
+        self.closed.set()
+
+
+@pytest.fixture
+def served(monkeypatch):
+    """Serves FakeResponses by URL through http_client.get, with a fresh memory-only image cache."""
+    responses = {}
+    image_cache = ImageCache(path=None)
+    monkeypatch.setattr(video_generator, "get_image_cache", lambda: image_cache)
+    monkeypatch.setattr(video_generator.http_client, "get", lambda url, **kwargs: responses[url])
+    return responses
+
+
+def shade(img):
+    return img.getpixel((640, 360))[0]
+
+
+def test_images_keep_priority_order_when_results_arrive_out_of_order(served):
+    # The top image is the slowest to download.
+    for i, delay in enumerate([0.3, 0.1, 0.0]):
+        served[f"https://news.example.com/photo{i}.jpg"] = FakeResponse(encode((800, 600), (i * 100, 0, 0)),
+                                                                        delay=delay)
+    images = video_generator.select_article_images(list(served))
+    assert [shade(img) for img in images] == pytest.approx([0, 100, 200], abs=4)
+
+
+def test_selection_stops_at_the_limit_and_cancels_the_rest(served):
+    for i in range(2):
+        served[f"https://news.example.com/photo{i}.jpg"] = FakeResponse(encode((800, 600), (i * 100, 0, 0)))
+    slow = FakeResponse(encode((800, 600)), endless=True)
+    served["https://news.example.com/slow.jpg"] = slow
+
+    images = video_generator.select_article_images(list(served), limit=2)
+    assert [shade(img) for img in images] == pytest.approx([0, 100], abs=4)
+    # The remaining download sees the stop event and is abandoned.
+    assert slow.closed.wait(2)
+
+
+def test_probe_is_cancelled_by_the_stop_event(served):
+    served["https://news.example.com/photo.jpg"] = FakeResponse(encode((800, 600)), endless=True)
+    stop_event = threading.Event()
+    stop_event.set()
+    img, reason = video_generator.probe_article_image("https://news.example.com/photo.jpg", stop_event)
+    assert img is None
+    assert reason == "cancelled"
+
+
+@pytest.mark.parametrize("size, reason", [((3000, 200), "odd aspect ratio"), ((250, 150), "small image")])
+def test_unusable_images_are_rejected_from_the_header_alone(served, size, reason):
+    response = FakeResponse(encode(size, noise=True) + b"\0" * 200_000)
+    served["https://news.example.com/photo.jpg"] = response
+    img, skipped = video_generator.probe_article_image("https://news.example.com/photo.jpg")
+    assert img is None
+    assert skipped.startswith(reason)
+    assert response.chunks_read == 1
+    assert response.closed.is_set()
+
+
+def test_failed_downloads_are_skipped(served):
+    served["https://news.example.com/missing.jpg"] = FakeResponse(b"", status_code=404)
+    served["https://news.example.com/photo.jpg"] = FakeResponse(encode((800, 600)))
+    assert len(video_generator.select_article_images(list(served))) == 1
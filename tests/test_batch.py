@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+import batch
+from batch import expand_playlists, read_urls, run_batch
+
+ARTICLE_TEXT = "The council approved the budget on Monday after a long debate about housing costs."
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Stubs scraping, transcripts and analysis; URLs containing 'broken' fail at the matching stage."""
+    active = {"scrape": 0, "analyze": 0}
+    peak = {"scrape": 0, "analyze": 0}
+    lock = threading.Lock()
+
+    def track(stage, delay=0.05):
+        with lock:
+            active[stage] += 1
+            peak[stage] = max(peak[stage], active[stage])
+        time.sleep(delay)
+        with lock:
+            active[stage] -= 1
+
+    def scrape_article(url):
+        track("scrape")
+        if "broken-page" in url:
+            return None
+        if "crash" in url:
+            raise RuntimeError("connection reset")
+        return ARTICLE_TEXT + f" Source {url}.", "https://img.example.com/top.jpg", ["https://img.example.com/a.jpg"]
+
+    def get_video_transcript(video_id):
+        return "Error: Transcripts are disabled for this video." if video_id == "brokenvideo" else ARTICLE_TEXT
+
+    def analyze_article(text, api_key, use_cache=True, priority=None):
+        track("analyze")
+        if "broken-analysis" in text:
+            return "Error analyzing article: 503 Service Unavailable"
+        return "Summary:\nThe budget passed.\n\nBias Rating: 2"
+
+    monkeypatch.setattr(batch, "scrape_article", scrape_article)
+    monkeypatch.setattr(batch, "get_video_transcript", get_video_transcript)
+    monkeypatch.setattr(batch, "analyze_article", analyze_article)
+    return peak
+
+
+def test_failures_are_reported_per_url_without_stopping_the_batch(pipeline):
+    urls = [
+        "https://news.example.com/ok-1",
+        "https://news.example.com/broken-page",
+        "https://news.example.com/crash",
+        "https://news.example.com/broken-analysis",
+        "https://www.youtube.com/watch?v=brokenvideo",
+        "https://news.example.com/ok-2",
+    ]
+    records = {record["url"]: record for record in run_batch(urls, "key")}
+    assert set(records) == set(urls)
+    assert records["https://news.example.com/broken-page"]["error"] == "Failed to scrape the article."
+    assert records["https://news.example.com/crash"]["error"] == "connection reset"
+    assert records["https://news.example.com/broken-analysis"]["error"].startswith("Error analyzing article")
+    assert records["https://www.youtube.com/watch?v=brokenvideo"]["error"].startswith("Error: Transcripts")
+    assert records["https://www.youtube.com/watch?v=brokenvideo"]["source"] == "youtube"
+    for url in ("https://news.example.com/ok-1", "https://news.example.com/ok-2"):
+        assert records[url]["error"] is None
+        assert records[url]["summary"] == "The budget passed."
+        assert records[url]["bias_rating"] == 2
+        assert records[url]["images"] == ["https://img.example.com/top.jpg", "https://img.example.com/a.jpg"]
+
+
+def test_each_stage_keeps_to_its_concurrency_limit(pipeline):
+    urls = [f"https://news.example.com/story-{i}" for i in range(12)]
+    records = list(run_batch(urls, "key", scrape_concurrency=3, analyze_concurrency=2))
+    assert len(records) == 12
+    assert pipeline["scrape"] == 3
+    assert pipeline["analyze"] == 2
+
+
+def test_read_urls_skips_blank_lines_and_comments(tmp_path):
+    path = tmp_path / "urls.txt"
+    path.write_text("# morning run\nhttps://news.example.com/a\n\n  https://news.example.com/b  \n", encoding="utf-8")
+    assert read_urls(str(path)) == ["https://news.example.com/a", "https://news.example.com/b"]
+
+
+def test_expand_playlists(monkeypatch):
+    def get_playlist_video_ids(url):
+        if "PLbroken" in url:
+            raise RuntimeError("playlist not found")
+        return ["vid00000001", "vid00000002"]
+    monkeypatch.setattr(batch, "get_playlist_video_ids", get_playlist_video_ids)
+    assert expand_playlists([
+        "https://news.example.com/a",
+        "https://www.youtube.com/playlist?list=PLaaaaaaaaaaaa",
+        "https://www.youtube.com/playlist?list=PLbroken",
+    ]) == [
+        "https://news.example.com/a",
+        "https://www.youtube.com/watch?v=vid00000001",
+        "https://www.youtube.com/watch?v=vid00000002",
+        "https://www.youtube.com/playlist?list=PLbroken",
+    ]
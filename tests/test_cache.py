@@ -0,0 +1,59 @@
+import pytest
+
+import cache
+from cache import DiskCache, content_hash, normalize_text
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_values_round_trip_as_text_or_bytes(tmp_path):
+    disk = DiskCache(str(tmp_path / "c.sqlite3"))
+    disk.set("text", "héllo")
+    disk.set("bytes", b"\x00\xff")
+    assert disk.get("text") == "héllo"
+    assert disk.get("bytes") == b"\x00\xff"
+    assert disk.get("missing") is None
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    disk = DiskCache(str(tmp_path / "c.sqlite3"), ttl=60)
+    disk.set("key", "value")
+    clock[0] += 59
+    assert disk.get("key") == "value"
+    clock[0] += 2
+    assert disk.get("key") is None
+
+
+def test_least_recently_used_entries_are_evicted_over_max_entries(tmp_path, clock):
+    disk = DiskCache(str(tmp_path / "c.sqlite3"), max_entries=2)
+    disk.set("a", "1")
+    clock[0] += 1
+    disk.set("b", "2")
+    clock[0] += 1
+    disk.get("a")
+    clock[0] += 1
+    disk.set("c", "3")
+    assert disk.get("b") is None
+    assert disk.get("a") == "1"
+    assert disk.get("c") == "3"
+
+
+def test_total_size_is_bounded(tmp_path, clock):
+    disk = DiskCache(str(tmp_path / "c.sqlite3"), max_bytes=100)
+    for i in range(10):
+        clock[0] += 1
+        disk.set(str(i), b"x" * 30)
+    stats = disk.stats()
+    assert stats["bytes"] <= 100
+    assert stats["entries"] == 3
+    assert disk.get("9") is not None
+
+
+def test_cache_keys_ignore_whitespace_differences_only():
+    assert content_hash("m", normalize_text("a  b\n c")) == content_hash("m", normalize_text("a b c"))
+    assert content_hash("a", "bc") != content_hash("ab", "c")
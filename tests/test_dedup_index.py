@@ -0,0 +1,109 @@
+import os
+import random
+
+import pytest
+
+import dedup_index
+from dedup_index import DedupIndex, choose_bands
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, f"{name}.txt"), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def index(tmp_path):
+    return DedupIndex(str(tmp_path / "dedup.sqlite3"))
+
+
+def test_syndicated_copy_matches(index):
+    # The republished copy has a new headline, byline, timestamp, credits and reworded sentences.
+    index.add(load("syndicated_wire"), "wire analysis")
+    value, similarity = index.find(load("syndicated_republished"))
+    assert value == "wire analysis"
+    assert similarity >= index.min_similarity
+
+
+def test_follow_up_story_does_not_match(index):
+    index.add(load("syndicated_wire"), "wire analysis")
+    assert index.find(load("syndicated_followup")) == (None, None)
+
+
+def test_copies_with_many_single_word_edits_match(index):
+    wire = load("syndicated_wire")
+    index.add(wire, "wire analysis")
+    rng = random.Random(7)
+    matched = 0
+    for _ in range(20):
+        words = wire.split()
+        for _ in range(20):
+            words[rng.randrange(len(words))] = "edited"
+        matched += index.find(" ".join(words))[0] == "wire analysis"
+    assert matched >= 19
+
+
+def test_short_texts_are_never_matched(index):
+    text = "A short brief about the port strike."
+    index.add(text, "brief")
+    assert index.find(text) == (None, None)
+
+
+def test_documents_only_match_in_their_scope(index):
+    index.add(load("syndicated_wire"), "old prompt analysis", scope="model-a/prompt-1")
+    assert index.find(load("syndicated_wire"), scope="model-a/prompt-2") == (None, None)
+    assert index.find(load("syndicated_wire"), scope="model-a/prompt-1")[0] == "old prompt analysis"
+
+
+def test_expired_documents_are_not_returned_and_are_evicted(tmp_path, monkeypatch):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"), ttl=60)
+    now = 1_000_000.0
+    monkeypatch.setattr(dedup_index.time, "time", lambda: now)
+    index.add(load("syndicated_wire"), "wire analysis")
+    now += 61
+    assert index.find(load("syndicated_wire")) == (None, None)
+    index.add(load("syndicated_followup"), "follow-up analysis")
+    assert index.stats()["documents"] == 1
+    assert index._conn.execute("SELECT COUNT(DISTINCT doc_id) FROM bands").fetchone()[0] == 1
+
+
+def test_oldest_documents_are_evicted_over_the_limit(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"), max_documents=1)
+    index.add(load("syndicated_wire"), "wire analysis")
+    index.add(load("syndicated_followup"), "follow-up analysis")
+    assert index.find(load("syndicated_wire")) == (None, None)
+    assert index.find(load("syndicated_followup"))[0] == "follow-up analysis"
+    assert index._conn.execute("SELECT COUNT(DISTINCT doc_id) FROM bands").fetchone()[0] == 1
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.7, 0.8, 0.9])
+def test_bands_keep_misses_at_the_threshold_rare(threshold):
+    bands, rows = choose_bands(threshold)
+    assert bands * rows == dedup_index.NUM_PERM
+    assert (1 - threshold ** rows) ** bands <= dedup_index.MAX_MISS_RATE
+
+
+def test_documents_over_the_limit_are_evicted_in_batches(tmp_path, monkeypatch):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"), ttl=None, max_documents=200)
+    now = [1_000_000.0]
+    monkeypatch.setattr(dedup_index.time, "time", lambda: now[0])
+    rng = random.Random(7)
+    words = load("syndicated_wire").split()
+    texts = [" ".join(rng.choice(words) for _ in range(90)) for _ in range(203)]
+    statements = []
+    index._conn.set_trace_callback(statements.append)
+    for i, text in enumerate(texts[:202]):
+        now[0] += 1
+        index.add(text, f"analysis {i}")
+    # Up to 1% over the limit is kept without counting or scanning the table.
+    assert not any("COUNT" in sql or "OFFSET" in sql for sql in statements)
+    assert index.stats()["documents"] == 202
+
+    now[0] += 1
+    index.add(texts[202], "analysis 202")
+    assert index.stats()["documents"] == 200
+    values = {row[0] for row in index._conn.execute("SELECT value FROM documents")}
+    assert values == {f"analysis {i}" for i in range(3, 203)}
+    assert index._conn.execute("SELECT COUNT(DISTINCT doc_id) FROM bands").fetchone()[0] == 200
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+
+import pytest
+
+import feeds
+from feeds import DONE, FAILED, FeedState, parse_feed, poll_feed, process_feeds, stream_pipeline
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FEED_URL = "https://news.example.com/feed.xml"
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+class FakePage:
+    def __init__(self, content):
+        self.content = content
+
+
+@pytest.fixture
+def served(monkeypatch):
+    """Serves feed documents by URL and stubs the article fetch and analysis stages."""
+    documents = {}
+    monkeypatch.setattr(feeds, "fetch_url", lambda url: FakePage(documents[url]))
+
+    def fetch_text(record):
+        if "fail" in record["url"]:
+            record["error"] = "Failed to scrape the article."
+            return None
+        return f"text of {record['url']}"
+
+    def analyze_text(record, text, api_key):
+        record["summary"] = f"summary of {text}"
+    monkeypatch.setattr(feeds, "fetch_text", fetch_text)
+    monkeypatch.setattr(feeds, "analyze_text", analyze_text)
+    return documents
+
+
+@pytest.fixture
+def state(tmp_path):
+    return FeedState(str(tmp_path / "feeds.sqlite3"))
+
+
+def test_parse_rss():
+    entries = parse_feed(load("feed_rss.xml"))
+    assert [entry["url"] for entry in entries] == [
+        "https://news.example.com/port-strike",
+        "https://news.example.com/budget",
+        "https://news.example.com/rail",
+    ]
+    assert entries[0] == {"id": "https://news.example.com/?p=3", "url": "https://news.example.com/port-strike",
+                          "title": "Port workers strike", "published": "Mon, 04 Mar 2024 09:00:00 GMT"}
+    # Without a guid the link is the ID.
+    assert entries[1]["id"] == "https://news.example.com/budget"
+
+
+def test_parse_atom():
+    entries = parse_feed(load("feed_atom.xml"))
+    assert [(entry["id"], entry["url"]) for entry in entries] == [
+        ("tag:video.example.com,2024:budget", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+        ("tag:video.example.com,2024:strike", "https://news.example.com/strike-video"),
+    ]
+    assert entries[0]["published"] == "2024-03-04T10:00:00Z"
+
+
+def test_unchanged_feed_queues_nothing(served, state):
+    served[FEED_URL] = load("feed_rss.xml")
+    assert len(poll_feed(FEED_URL, state)) == 3
+    assert poll_feed(FEED_URL, state) == []
+    # A changed document only yields the entries not seen before.
+    served[FEED_URL] = served[FEED_URL].replace(b"<item>", b"<item><title>New</title>"
+                                                b"<link>https://news.example.com/new</link></item><item>", 1)
+    assert [entry["url"] for entry in poll_feed(FEED_URL, state)] == ["https://news.example.com/new"]
+
+
+def test_first_poll_only_processes_the_latest_entries(served, state):
+    served[FEED_URL] = load("feed_rss.xml")
+    assert [entry["title"] for entry in poll_feed(FEED_URL, state, first_poll_limit=2)] == [
+        "Port workers strike", "Council approves budget"]
+    assert state.stats() == {"feeds": 1, "pending": 2, "done": 1, "failed": 0}
+
+
+def test_pending_entries_are_resumed_after_reopening(served, tmp_path):
+    path = str(tmp_path / "feeds.sqlite3")
+    served[FEED_URL] = load("feed_rss.xml")
+    # A poller that found the entries but stopped before processing them.
+    poll_feed(FEED_URL, FeedState(path))
+
+    state = FeedState(path)
+    assert len(state.pending_entries()) == 3
+    records = list(process_feeds([FEED_URL], "key", state=state))
+    assert sorted(record["url"] for record in records) == [
+        "https://news.example.com/budget", "https://news.example.com/port-strike", "https://news.example.com/rail"]
+    assert state.stats() == {"feeds": 1, "pending": 0, "done": 3, "failed": 0}
+    assert list(process_feeds([FEED_URL], "key", state=state)) == []
+
+
+def test_failed_entries_are_not_retried(served, state):
+    served[FEED_URL] = load("feed_rss.xml").replace(b"/budget", b"/fail")
+    records = list(process_feeds([FEED_URL], "key", state=state))
+    assert [record["error"] for record in records if record["error"]] == ["Failed to scrape the article."]
+    assert state.stats()[FAILED] == 1
+    assert state.stats()[DONE] == 2
+
+
+def pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "stream_pipeline"]
+
+
+def test_stream_pipeline_runs_every_stage():
+    results = stream_pipeline(range(50), [(lambda x: x + 1, 3), (lambda x: x * 2, 2)], queue_size=4)
+    assert sorted(results) == [(x + 1) * 2 for x in range(50)]
+
+
+def test_stream_pipeline_threads_stop_when_the_consumer_stops():
+    pulled = []
+
+    def items():
+        for i in range(10000):
+            pulled.append(i)
+            yield i
+    results = stream_pipeline(items(), [(lambda x: x, 2), (lambda x: x, 2)], queue_size=2)
+    assert next(results) is not None
+    results.close()
+    deadline = time.monotonic() + 2
+    while pipeline_threads():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    # The source was only read as far as the bounded queues allowed.
+    assert len(pulled) < 20
@@ -0,0 +1,84 @@
+import pytest
+
+import cache
+import fetcher
+from fetcher import HTTPCache, fetch_url
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b"", headers=None, url="https://example.com/story"):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.url = url
+        self.encoding = "utf-8"
+        self.apparent_encoding = "utf-8"
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """Serves queued FakeResponses and records the request headers sent."""
+    http_cache = HTTPCache(str(tmp_path / "http.sqlite3"))
+    monkeypatch.setattr(fetcher, "get_http_cache", lambda: http_cache)
+    responses = []
+    requests = []
+
+    def get(url, headers=None, **kwargs):
+        requests.append(headers or {})
+        return responses.pop(0)
+    monkeypatch.setattr(fetcher.http_client, "get", get)
+    return responses, requests
+
+
+def test_fresh_pages_are_served_without_a_request(server):
+    responses, requests = server
+    responses.append(FakeResponse(content=b"<p>story</p>", headers={"Cache-Control": "max-age=300"}))
+    assert fetch_url("https://example.com/story").status == "fetched"
+    page = fetch_url("https://example.com/story")
+    assert page.status == "fresh"
+    assert page.content == b"<p>story</p>"
+    assert len(requests) == 1
+
+
+def test_stale_pages_are_revalidated(server):
+    responses, requests = server
+    responses.append(FakeResponse(content=b"<p>story</p>", headers={"ETag": '"v1"'}))
+    responses.append(FakeResponse(status_code=304))
+    fetch_url("https://example.com/story")
+    page = fetch_url("https://example.com/story")
+    assert requests[1]["If-None-Match"] == '"v1"'
+    assert page.status == "revalidated"
+    assert page.content == b"<p>story</p>"
+
+
+def test_no_store_responses_are_not_cached(server):
+    responses, requests = server
+    responses.append(FakeResponse(content=b"a", headers={"Cache-Control": "no-store"}))
+    responses.append(FakeResponse(content=b"b", headers={"Cache-Control": "no-store"}))
+    fetch_url("https://example.com/story")
+    assert fetch_url("https://example.com/story").status == "fetched"
+    assert "If-None-Match" not in requests[1]
+
+
+def test_cache_size_is_bounded(tmp_path):
+    http_cache = HTTPCache(str(tmp_path / "http.sqlite3"), max_bytes=10_000)
+    for i in range(20):
+        http_cache.store(f"https://example.com/{i}", {"url": f"https://example.com/{i}"}, b"x" * 2000)
+    assert http_cache.stats()["bytes"] <= 10_000
+    assert http_cache.load("https://example.com/0") == (None, None)
+    meta, body = http_cache.load("https://example.com/19")
+    assert meta["url"] == "https://example.com/19"
+    assert body == b"x" * 2000
+
+
+def test_entries_expire(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    http_cache = HTTPCache(str(tmp_path / "http.sqlite3"), ttl=60)
+    http_cache.store("https://example.com/story", {}, b"body")
+    now[0] += 61
+    assert http_cache.load("https://example.com/story") == (None, None)
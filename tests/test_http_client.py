@@ -0,0 +1,111 @@
+import pytest
+import requests
+
+import http_client
+
+
+class RecordingSession(requests.Session):
+    """A requests.Session that records each request instead of sending it."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    """Makes the shared client build RecordingSessions, starting and ending with no pooled clients."""
+    monkeypatch.setattr(http_client.requests, "Session", RecordingSession)
+    monkeypatch.setitem(http_client._settings, "timeout", (5.0, 10.0))
+    http_client.close()
+    yield
+    http_client.close()
+
+
+def test_session_is_shared_per_verify_mode(sessions):
+    verified = http_client.get_session()
+    assert http_client.get_session(verify=True) is verified
+    unverified = http_client.get_session(verify=False)
+    assert unverified is not verified
+    assert unverified.verify is False
+    assert http_client.get_session(verify=False) is unverified
+
+
+def test_calls_share_the_pooled_session(sessions):
+    http_client.get("https://news.example.com/a")
+    http_client.post("https://news.example.com/b", json={"x": 1})
+    assert [(method, url) for method, url, _ in http_client.get_session().calls] == [
+        ("GET", "https://news.example.com/a"), ("POST", "https://news.example.com/b")]
+
+
+def test_default_timeout_is_applied_unless_given(sessions):
+    http_client.get("https://news.example.com/a")
+    http_client.get("https://news.example.com/b", timeout=30)
+    calls = http_client.get_session().calls
+    assert calls[0][2]["timeout"] == (5.0, 10.0)
+    assert calls[1][2]["timeout"] == 30
+
+
+def test_configure_replaces_the_pooled_sessions(sessions):
+    before = http_client.get_session()
+    http_client.configure(timeout=2)
+    assert http_client.get_session() is not before
+    http_client.get("https://news.example.com/a")
+    assert http_client.get_session().calls[0][2]["timeout"] == 2
+
+
+@pytest.fixture
+def httpx_requests(monkeypatch, sessions):
+    """Routes the HTTP/2 path through an httpx.MockTransport and records the requests it sees."""
+    httpx = pytest.importorskip("httpx")
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        if request.url.path == "/missing":
+            return httpx.Response(404, text="not here")
+        return httpx.Response(200, content="héllo".encode("utf-8"),
+                              headers={"Content-Type": "text/plain; charset=utf-8"})
+
+    client = httpx.Client
+
+    def mock_client(**kwargs):
+        kwargs.pop("http2", None)
+        return client(transport=httpx.MockTransport(handler), **kwargs)
+    monkeypatch.setattr(httpx, "Client", mock_client)
+    monkeypatch.setattr(http_client, "_http2_available", lambda: True)
+    return seen
+
+
+def test_httpx_response_translates_data_and_reads_the_body(httpx_requests):
+    response = http_client.post("https://news.example.com/echo", data=b"payload")
+    assert httpx_requests[0].content == b"payload"
+    assert response.status_code == 200
+    assert response.content == "héllo".encode("utf-8")
+    assert response.text == "héllo"
+    assert response.url == "https://news.example.com/echo"
+    response.raise_for_status()
+
+
+def test_httpx_response_applies_the_default_timeout(httpx_requests):
+    http_client.get("https://news.example.com/a")
+    timeout = httpx_requests[0].extensions["timeout"]
+    assert timeout["connect"] == 5.0
+    assert timeout["read"] == 10.0
+
+
+def test_httpx_response_streams_and_raises_requests_errors(httpx_requests):
+    response = http_client.get("https://news.example.com/a", stream=True)
+    assert b"".join(response.iter_content(2)) == "héllo".encode("utf-8")
+    response.close()
+
+    missing = http_client.get("https://news.example.com/missing")
+    with pytest.raises(requests.HTTPError) as excinfo:
+        missing.raise_for_status()
+    assert excinfo.value.response is missing
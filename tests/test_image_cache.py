@@ -0,0 +1,68 @@
+from PIL import Image
+
+from image_cache import ImageCache
+
+SIZE = (10, 10)
+# One 10x10 RGB image takes 300 bytes in memory.
+IMAGE_BYTES = 300
+
+
+def image(shade):
+    return Image.new("RGB", SIZE, (shade, shade, shade))
+
+
+def test_memory_only_cache_round_trips_the_same_image():
+    images = ImageCache(path=None)
+    img = image(10)
+    assert images.set("https://news.example.com/a.jpg", SIZE, img) is img
+    assert images.get("https://news.example.com/a.jpg", SIZE) is img
+    assert images.get("https://news.example.com/a.jpg", (20, 20)) is None
+    assert images.get("https://news.example.com/b.jpg", SIZE) is None
+    assert images.stats() == {"memory_entries": 1, "memory_bytes": IMAGE_BYTES}
+
+
+def test_least_recently_used_images_are_evicted_over_memory_max_bytes():
+    images = ImageCache(path=None, memory_max_bytes=2 * IMAGE_BYTES)
+    images.set("a", SIZE, image(1))
+    images.set("b", SIZE, image(2))
+    images.get("a", SIZE)
+    images.set("c", SIZE, image(3))
+    assert images.get("b", SIZE) is None
+    assert images.get("a", SIZE) is not None
+    assert images.get("c", SIZE) is not None
+    assert images.stats()["memory_bytes"] == 2 * IMAGE_BYTES
+
+
+def test_storing_a_url_again_replaces_its_bytes():
+    images = ImageCache(path=None, memory_max_bytes=2 * IMAGE_BYTES)
+    images.set("a", SIZE, image(1))
+    images.set("a", SIZE, image(2))
+    images.set("b", SIZE, image(3))
+    # The first copy of "a" is no longer counted, so both entries still fit.
+    assert images.stats() == {"memory_entries": 2, "memory_bytes": 2 * IMAGE_BYTES}
+    assert images.get("a", SIZE).getpixel((0, 0)) == (2, 2, 2)
+
+
+def test_image_larger_than_the_memory_budget_is_not_kept():
+    images = ImageCache(path=None, memory_max_bytes=IMAGE_BYTES - 1)
+    images.set("a", SIZE, image(1))
+    assert images.get("a", SIZE) is None
+    assert images.stats()["memory_bytes"] == 0
+
+
+def test_disk_cache_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "images.sqlite3")
+    stored = ImageCache(path).set("a", SIZE, image(200))
+    reopened = ImageCache(path).get("a", SIZE)
+    assert reopened is not None
+    assert reopened.size == SIZE
+    assert reopened.tobytes() == stored.tobytes()
+
+
+def test_images_evicted_from_memory_are_reloaded_from_disk(tmp_path):
+    images = ImageCache(str(tmp_path / "images.sqlite3"), memory_max_bytes=IMAGE_BYTES)
+    images.set("a", SIZE, image(1))
+    images.set("b", SIZE, image(2))
+    assert images.stats()["memory_entries"] == 1
+    assert images.get("a", SIZE) is not None
+    assert images.stats()["memory_entries"] == 1
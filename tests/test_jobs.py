@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from jobs import FAILED, JobManager, job_dir
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = JobManager(jobs_dir=str(tmp_path), max_workers=1, queue_limit=5)
+    yield manager
+    manager.shutdown(wait=False)
+
+
+def wait_for(predicate, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_job_ids_cannot_escape_the_jobs_directory(tmp_path):
+    with pytest.raises(ValueError):
+        job_dir("../../etc", str(tmp_path))
+    assert job_dir("a" * 32, str(tmp_path)).startswith(str(tmp_path))
+
+
+def test_unknown_jobs_have_no_status(manager):
+    assert manager.status("0" * 32) is None
+    assert manager.status("not-a-job") is None
+
+
+def test_pool_is_restarted_after_a_worker_dies(manager):
+    first = manager.submit("First story. It has two sentences.", api_key=None)
+    wait_for(lambda: manager._executor._processes)
+    for process in list(manager._executor._processes.values()):
+        process.kill()
+    wait_for(lambda: manager.status(first)["state"] == FAILED)
+
+    # The broken pool is replaced instead of failing every later submit.
+    second = manager.submit("Second story. It has two sentences.", api_key=None)
+    assert manager.status(second) is not None
+    assert manager.queue_depth() == 1
+
+
+def test_finished_jobs_are_cleaned_up(manager):
+    job_id = manager.submit("A story. It has two sentences.", api_key=None)
+    wait_for(lambda: manager.queue_depth() == 0, timeout=120)
+    assert manager.cleanup(retention=3600) == 0
+    assert manager.cleanup(retention=-1) == 1
+    assert manager.status(job_id) is None
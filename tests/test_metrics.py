@@ -0,0 +1,85 @@
+import json
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from metrics import Metrics, in_current_context, span, trace
+
+
+def test_prometheus_export_formats_buckets_and_escapes_labels():
+    registry = Metrics()
+    registry.observe("scrape", 0.2)
+    registry.observe("scrape", 3.0)
+    registry.increment("fallbacks", kind='say "hi"\\\nbye')
+    lines = registry.to_prometheus().splitlines()
+
+    assert "# TYPE news_stage_duration_seconds histogram" in lines
+    # Buckets are cumulative, with bounds printed in their shortest form.
+    assert 'news_stage_duration_seconds_bucket{stage="scrape",le="0.1"} 0' in lines
+    assert 'news_stage_duration_seconds_bucket{stage="scrape",le="0.25"} 1' in lines
+    assert 'news_stage_duration_seconds_bucket{stage="scrape",le="5"} 2' in lines
+    assert 'news_stage_duration_seconds_bucket{stage="scrape",le="+Inf"} 2' in lines
+    assert 'news_stage_duration_seconds_sum{stage="scrape"} 3.200000' in lines
+    assert 'news_stage_duration_seconds_count{stage="scrape"} 2' in lines
+    assert "# TYPE news_fallbacks_total counter" in lines
+    assert 'news_fallbacks_total{kind="say \\"hi\\"\\\\\\nbye"} 1' in lines
+
+
+def test_json_export_matches_the_snapshot():
+    registry = Metrics()
+    registry.observe("gemini", 1.0)
+    registry.observe("gemini", 3.0)
+    registry.increment("cache_hits", 2, cache="scrape")
+    assert json.loads(registry.to_json()) == {
+        "stages": {"gemini": {"count": 2, "sum": 4.0, "mean": 2.0, "max": 3.0}},
+        "counters": [{"name": "cache_hits", "labels": {"cache": "scrape"}, "value": 2}],
+    }
+
+
+def test_spans_in_worker_threads_keep_the_callers_trace():
+    def work():
+        with span("worker_stage"):
+            pass
+
+    with trace() as current:
+        with span("outer"):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                executor.submit(in_current_context(work)).result()
+            thread = threading.Thread(target=in_current_context(work))
+            thread.start()
+            thread.join()
+        # A thread started without the context records only to the global metrics.
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+
+    assert [(entry["stage"], entry["calls"]) for entry in current.breakdown()] == [
+        ("worker_stage", 2), ("outer", 1)]
+
+
+def test_counters_increment_under_concurrency():
+    registry = Metrics()
+
+    def work():
+        for _ in range(1000):
+            registry.increment("events", kind="a")
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.snapshot()["counters"] == [{"name": "events", "labels": {"kind": "a"}, "value": 8000}]
+
+
+def test_metrics_server_serves_both_formats(monkeypatch):
+    registry = Metrics()
+    registry.increment("errors", stage="scrape")
+    monkeypatch.setattr(metrics, "_metrics", registry)
+    server = metrics.start_metrics_server(0, host="127.0.0.1")
+    assert metrics.start_metrics_server(0, host="127.0.0.1") is server
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    with urllib.request.urlopen(f"{base}/metrics", timeout=5) as response:
+        assert 'news_errors_total{stage="scrape"} 1' in response.read().decode("utf-8")
+    with urllib.request.urlopen(f"{base}/metrics.json", timeout=5) as response:
+        assert json.loads(response.read())["counters"][0]["value"] == 1
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+import metrics
+import utils
+from utils import NotificationDispatcher
+
+
+@pytest.fixture
+def posts(monkeypatch):
+    """Records what would be posted to ntfy.sh; set posts.gate to hold the worker, posts.error to fail."""
+    class Posts(list):
+        gate = None
+        error = None
+
+    sent = Posts()
+
+    def post_notification(topic, message, title="News Scraper Visit", timeout=5):
+        if sent.gate is not None:
+            sent.gate.wait(5)
+        sent.append((topic, title, message))
+        if sent.error is not None:
+            raise sent.error
+    monkeypatch.setattr(utils, "post_notification", post_notification)
+    # No backoff between retries.
+    monkeypatch.setattr(utils.random, "uniform", lambda a, b: 0)
+    return sent
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_messages_are_dropped_when_the_queue_is_full(posts):
+    posts.gate = threading.Event()
+    dispatcher = NotificationDispatcher(max_queue=2, batch_window=0)
+    assert dispatcher.submit("first", "topic")
+    # The worker takes the first message and is held in post_notification.
+    wait_for(lambda: dispatcher.queue_depth() == 0)
+    assert dispatcher.submit("second", "topic")
+    assert dispatcher.submit("third", "topic")
+    assert not dispatcher.submit("fourth", "topic")
+    assert dispatcher.stats()["dropped"] == 1
+
+    posts.gate.set()
+    wait_for(lambda: dispatcher.stats()["sent"] == 3)
+    assert "fourth" not in "".join(message for _, _, message in posts)
+
+
+def test_messages_for_a_topic_within_one_window_are_sent_together(posts):
+    dispatcher = NotificationDispatcher(batch_window=0.5)
+    dispatcher.submit("New Analysis: port strike", "news")
+    dispatcher.submit("New Analysis: budget", "news")
+    dispatcher.submit("New Analysis: port strike", "news")
+    dispatcher.submit("New Analysis: rail", "other")
+    wait_for(lambda: dispatcher.stats()["sent"] == 3)
+    assert sorted(posts) == [
+        ("news", "News Scraper Visits (2)", "New Analysis: port strike\n\n---\n\nNew Analysis: budget"),
+        ("other", "News Scraper Visit", "New Analysis: rail"),
+    ]
+    assert dispatcher.stats()["coalesced"] == 1
+
+
+def test_failed_count_after_retries_are_exhausted(posts):
+    posts.error = RuntimeError("HTTP 503")
+    dispatcher = NotificationDispatcher(batch_window=0.2, max_retries=2)
+    dispatcher.submit("one", "news")
+    dispatcher.submit("two", "news")
+    wait_for(lambda: dispatcher.stats()["failed"] == 2)
+    # One batched post, tried once and retried twice.
+    assert len(posts) == 3
+    assert dispatcher.stats()["sent"] == 0
+
+
+def test_stats_are_reported_to_metrics(posts, monkeypatch):
+    registry = metrics.Metrics()
+    monkeypatch.setattr(metrics, "_metrics", registry)
+    posts.error = RuntimeError("HTTP 503")
+    dispatcher = NotificationDispatcher(batch_window=0.2, max_retries=1)
+    dispatcher.submit("one", "news")
+    dispatcher.submit("one", "news")
+    wait_for(lambda: dispatcher.stats()["failed"] == 1)
+    counters = {counter["labels"]["event"]: counter["value"] for counter in registry.snapshot()["counters"]
+                if counter["name"] == "notifications"}
+    assert counters == {"queued": 2, "coalesced": 1, "retries": 1, "failed": 1}
+    assert {key: dispatcher.stats()[key] for key in counters} == counters
+    assert 'news_notifications_total{event="retries"} 1' in registry.to_prometheus()
@@ -0,0 +1,107 @@
+import pytest
+
+from preprocess import estimate_tokens, is_boilerplate, preprocess_text
+
+BOILERPLATE = [
+    "We use cookies to improve your experience. By continuing you accept our cookie policy.",
+    "Accept all cookies",
+    "Read more",
+    "Related: Council approves new housing budget",
+    "Most read: The ten best beaches in Europe",
+    "Sign up for our free newsletter",
+    "Subscribe to get the latest updates in your inbox!",
+    "Advertisement",
+    "Share this article: Facebook Twitter Email",
+    "Share on X, LinkedIn, WhatsApp",
+    "Follow us on Instagram",
+    "Image caption, Protesters gathered outside parliament on Monday",
+    "Photo: Reuters",
+    "Click here to listen to the full interview",
+    "© 2024 Reuters. All rights reserved.",
+    "Copyright 2023 The Associated Press",
+    "Please enable JavaScript to view the comments.",
+]
+
+CONTENT = [
+    "Related charges were filed against two other executives, prosecutors said.",
+    "Trending downward for a third quarter, the company said revenue fell 8%.",
+    "Google said it would delay plans to phase out third-party cookies, citing a policy review by regulators.",
+    "Share prices fell after Musk posted on X that the deal was on hold.",
+    "Copyright lawsuits against AI firms have multiplied since last year.",
+    "Recommended dosage guidelines were changed by the FDA on Tuesday.",
+    "Photo agencies said the image was taken in March.",
+    "Read the full statement, the minister told reporters, and you will see why.",
+]
+
+
+@pytest.mark.parametrize("paragraph", BOILERPLATE)
+def test_boilerplate_is_detected(paragraph):
+    assert is_boilerplate(paragraph)
+
+
+@pytest.mark.parametrize("paragraph", CONTENT)
+def test_news_sentences_are_kept(paragraph):
+    assert not is_boilerplate(paragraph)
+
+
+def test_one_sentence_paragraphs_survive_preprocessing():
+    text = "\n\n".join(CONTENT + ["Advertisement", "Read more"])
+    cleaned, stats = preprocess_text(text)
+    assert cleaned.split("\n\n") == CONTENT
+    assert stats["boilerplate_removed"] == 2
+
+
+def test_duplicate_caption_lines_are_removed():
+    lines = [
+        "so today we are looking at the new budget",
+        "and what it means for renters in the city",
+        "so today we are looking at the new budget",
+        "the council voted on it last night",
+    ]
+    cleaned, stats = preprocess_text("\n".join(lines))
+    assert cleaned.split("\n") == [lines[0], lines[1], lines[3]]
+    assert stats["duplicates_removed"] == 1
+
+
+def test_near_duplicate_paragraphs_are_removed():
+    first = "The council approved the budget on Monday after a long debate about housing costs."
+    repeat = "The council approved the budget on Monday after a long debate about housing costs, officials said."
+    cleaned, stats = preprocess_text(f"{first}\n\n{repeat}\n\nResidents will see higher fees next year.")
+    assert repeat not in cleaned
+    assert stats["duplicates_removed"] == 1
+
+
+def test_truncation_keeps_the_lead():
+    paragraphs = [f"Paragraph {i} of the story has some words in it to count." for i in range(50)]
+    cleaned, stats = preprocess_text("\n\n".join(paragraphs), token_budget=60)
+    assert stats["truncated"]
+    assert cleaned.startswith("Paragraph 0 ")
+    assert stats["tokens_after"] <= 60
+
+
+@pytest.mark.parametrize("token_budget", [10, 40, 300])
+def test_truncation_cuts_a_first_paragraph_larger_than_the_budget(token_budget):
+    first = " ".join(f"word{i}" for i in range(2000))
+    cleaned, stats = preprocess_text(f"{first}\n\nA second paragraph.", token_budget=token_budget)
+    assert stats["truncated"]
+    assert cleaned and first.startswith(cleaned)
+    assert stats["tokens_after"] <= token_budget
+
+
+@pytest.mark.parametrize("joiner", ["\n\n", "\n"])
+@pytest.mark.parametrize("token_budget", range(5, 40))
+def test_truncation_counts_the_joiners_against_the_budget(joiner, token_budget):
+    # Many short units: per-unit estimates alone would let the joiners push the text over budget.
+    units = [f"Fact {a}{b}" for a in "ABCDEFGH" for b in "ABCDEFGH"]
+    cleaned, stats = preprocess_text(joiner.join(units), token_budget=token_budget)
+    assert stats["truncated"]
+    assert stats["tokens_after"] == estimate_tokens(cleaned) <= token_budget
+
+
+def test_all_boilerplate_text_is_kept_and_still_truncated():
+    text = "\n\n".join(["Advertisement", "Read more"] * 20)
+    cleaned, stats = preprocess_text(text, token_budget=10)
+    assert cleaned.startswith("Advertisement")
+    assert stats["truncated"]
+    assert stats["tokens_after"] <= 10
+    assert stats["boilerplate_removed"] == 0
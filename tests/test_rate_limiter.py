@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+import rate_limiter
+from rate_limiter import (BATCH, INTERACTIVE, RetryableError, Scheduler, TokenBucket, get_scheduler, parse_retry_after,
+                          register_model)
+
+
+def drain(scheduler, model):
+    """Uses up the model's request bucket so the next call has to wait."""
+    request_bucket, _ = scheduler._limits[model]
+    request_bucket.take(request_bucket.capacity)
+
+
+def start_waiting(scheduler, model, priority=INTERACTIVE, done=None):
+    def run():
+        scheduler.acquire(model, priority=priority)
+        if done is not None:
+            done.append(priority)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for_waiters(scheduler, model, n):
+    deadline = time.monotonic() + 2
+    while len(scheduler._waiters.get(model, [])) < n:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(6, period=60)
+    assert bucket.wait_time(1, bucket.updated) == 0
+    bucket.take(6)
+    assert bucket.wait_time(1, bucket.updated) == pytest.approx(10.0)
+    # Larger than the bucket: allowed once it is full rather than never.
+    # (updated + 60) - updated is not exactly 60 in floating point.
+    assert bucket.wait_time(100, bucket.updated + 60) == pytest.approx(0, abs=1e-9)
+
+
+def test_throttled_model_does_not_block_other_models():
+    scheduler = Scheduler()
+    scheduler.configure("gemini", requests_per_minute=6)
+    scheduler.configure("imagen", requests_per_minute=10)
+    drain(scheduler, "gemini")
+    start_waiting(scheduler, "gemini")
+    wait_for_waiters(scheduler, "gemini", 1)
+
+    start = time.monotonic()
+    scheduler.acquire("imagen")
+    assert time.monotonic() - start < 0.5
+
+
+def test_interactive_callers_overtake_queued_batch_work():
+    scheduler = Scheduler()
+    scheduler.configure("gemini", requests_per_minute=600)
+    drain(scheduler, "gemini")
+    done = []
+    batch = start_waiting(scheduler, "gemini", BATCH, done)
+    wait_for_waiters(scheduler, "gemini", 1)
+    interactive = start_waiting(scheduler, "gemini", INTERACTIVE, done)
+    batch.join(2)
+    interactive.join(2)
+    assert done == [INTERACTIVE, BATCH]
+
+
+def test_retryable_failures_are_retried():
+    scheduler = Scheduler(base_delay=0.001, max_delay=0.01)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RetryableError("503", status_code=503)
+        return "ok"
+
+    assert scheduler.call("gemini", flaky) == "ok"
+    assert scheduler.stats["retries"] == 2
+
+
+def test_retries_give_up_after_max_retries():
+    scheduler = Scheduler(max_retries=2, base_delay=0.001, max_delay=0.01)
+
+    def always_busy():
+        raise RetryableError("429", status_code=429)
+
+    with pytest.raises(RetryableError):
+        scheduler.call("gemini", always_busy)
+    assert scheduler.stats["calls"] == 3
+    assert scheduler.stats["failures"] == 1
+
+
+def test_other_errors_are_not_retried():
+    scheduler = Scheduler(base_delay=0.001)
+
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        scheduler.call("gemini", broken)
+    assert scheduler.stats["calls"] == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_limits_are_registered_under_the_callers_model_names(monkeypatch):
+    import analyzer
+    import video_generator
+
+    monkeypatch.setattr(rate_limiter, "_scheduler", None)
+    scheduler = get_scheduler()
+    request_bucket, token_bucket = scheduler._limits[analyzer.MODEL_NAME]
+    assert request_bucket.capacity == 15 and token_bucket.capacity == 1000000
+    request_bucket, token_bucket = scheduler._limits[video_generator.IMAGEN_MODEL]
+    assert request_bucket.capacity == 10 and token_bucket is None
+
+
+def test_models_registered_later_are_applied_to_the_running_scheduler(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_scheduler", None)
+    monkeypatch.setattr(rate_limiter, "_model_limits", {})
+    scheduler = get_scheduler()
+    register_model("test-model", requests_per_minute=30)
+    assert scheduler._limits["test-model"][0].capacity == 30
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from scraper import resolve_image_url, scrape_with_bs4, scrape_with_lxml
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+PAGE_URL = "https://news.example.com/world/2024/story.html"
+
+PAGE = b"""<html><head>
+<meta property="og:image" content="/images/hero.jpg">
+</head><body>
+<img src="photos/one.jpg"><img src="//cdn.example.com/two.jpg"><img src="photos/one.jpg">
+<img src="data:image/gif;base64,R0lGOD">
+<p>The first paragraph of the story is long enough to keep.</p>
+<p>Short</p>
+<p>An unterminated last paragraph that only closes at the end of the input"""
+
+
+@pytest.mark.parametrize("extract", [scrape_with_lxml, scrape_with_bs4])
+def test_extractors_resolve_relative_images_and_keep_the_last_paragraph(extract):
+    text, top_image, images = extract(PAGE_URL, PAGE)
+    assert text.split("\n\n") == [
+        "The first paragraph of the story is long enough to keep.",
+        "An unterminated last paragraph that only closes at the end of the input",
+    ]
+    assert top_image == "https://news.example.com/images/hero.jpg"
+    assert images == ["https://news.example.com/world/2024/photos/one.jpg", "https://cdn.example.com/two.jpg"]
+
+
+def test_lxml_honours_base_href():
+    html = (b'<html><head><base href="https://static.example.org/assets/"></head><body>'
+            b'<img src="a.jpg"><p>A paragraph that is long enough to be kept.</p></body></html>')
+    _, _, images = scrape_with_lxml(PAGE_URL, html)
+    assert images == ["https://static.example.org/assets/a.jpg"]
+
+
+def test_lxml_reads_lazy_loaded_images():
+    html = (b'<html><body><img data-src="/lazy.jpg"><p>A paragraph that is long enough to be kept.</p>'
+            b'</body></html>')
+    _, _, images = scrape_with_lxml(PAGE_URL, html)
+    assert images == ["https://news.example.com/lazy.jpg"]
+
+
+def test_lxml_stops_reading_after_max_chars():
+    paragraphs = b"".join(b"<p>Paragraph %d of a very long comment thread.</p>" % i for i in range(5000))
+    text, _, _ = scrape_with_lxml(PAGE_URL, b"<html><body>" + paragraphs + b"</body></html>",
+                                  max_chars=1000, chunk_size=1024)
+    assert 1000 <= len(text) < 3000
+
+
+@pytest.mark.parametrize("name", ["article_short", "article_syndicated", "article_long"])
+def test_lxml_matches_bs4_on_fixture_pages(name):
+    with open(os.path.join(FIXTURES, f"{name}.html"), encoding="utf-8") as f:
+        html = f.read().replace("{{BASE}}", "").encode("utf-8")
+    assert scrape_with_lxml(PAGE_URL, html) == scrape_with_bs4(PAGE_URL, html)
+
+
+def test_resolve_image_url():
+    assert resolve_image_url(" /a.png ", PAGE_URL) == "https://news.example.com/a.png"
+    assert resolve_image_url("data:image/png;base64,xx", PAGE_URL) is None
+    assert resolve_image_url("", PAGE_URL) is None
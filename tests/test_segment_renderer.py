@@ -0,0 +1,95 @@
+import subprocess
+
+import pytest
+from PIL import Image
+
+import segment_renderer
+import video_generator
+from cache import DiskCache, content_hash
+from image_cache import ImageCache
+from segment_renderer import segment_key, split_sentences
+from video_encoding import get_ffmpeg_exe
+
+SUMMARY = ("Port workers began a strike on Monday. Ships are queuing outside the harbour. "
+           "Union leaders want a new pay deal. Talks resume on Thursday.")
+SETTINGS = {"mode": "fast", "segments": True, "resolution": (320, 180)}
+
+
+def fake_speech(text, audio_path):
+    subprocess.run([get_ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=duration=0.3",
+                    audio_path], check=True)
+    return audio_path
+
+
+def fake_imagen(prompt, api_key):
+    # A different prompt gives a different picture, as the real model would.
+    shade = int(content_hash(prompt)[:2], 16)
+    return Image.new("RGB", (640, 360), (shade, 80, 120))
+
+
+@pytest.fixture
+def render(tmp_path, monkeypatch):
+    """Renders with fake TTS and Imagen and fresh caches; returns the number of segments each render encoded."""
+    segment_cache = DiskCache(str(tmp_path / "segments.sqlite3"))
+    image_cache = ImageCache(path=None)
+    monkeypatch.setattr(video_generator, "synthesize_speech", fake_speech)
+    monkeypatch.setattr(video_generator, "fetch_google_image", fake_imagen)
+    monkeypatch.setattr(video_generator, "get_segment_cache", lambda: segment_cache)
+    monkeypatch.setattr(video_generator, "get_image_cache", lambda: image_cache)
+    encoded = []
+    encode_segment = segment_renderer.encode_segment
+
+    def counting_encode(slide, audio_path, output_path, workdir, settings=None):
+        encoded.append(output_path)
+        return encode_segment(slide, audio_path, output_path, workdir, settings)
+    monkeypatch.setattr(segment_renderer, "encode_segment", counting_encode)
+
+    def run(summary, story_id="https://news.example.com/port-strike"):
+        encoded.clear()
+        output_path = video_generator.generate_video(summary, api_key="key", output_path=str(tmp_path / "out.mp4"),
+                                                     encode_settings=SETTINGS, story_id=story_id)
+        assert output_path is not None
+        return len(encoded)
+    return run
+
+
+def test_editing_one_sentence_re_encodes_only_that_segment(render):
+    assert render(SUMMARY) == 4
+    assert render(SUMMARY) == 0
+    # The first sentence changes the image prompt, but the illustration is keyed on the story.
+    assert render(SUMMARY.replace("Monday", "Tuesday")) == 1
+
+
+def test_inserting_a_sentence_keeps_the_other_segments(render):
+    render(SUMMARY)
+    assert render(SUMMARY.replace("harbour. ", "harbour. Exporters warn of shortages. ")) == 1
+
+
+def test_slide_backgrounds_follow_the_sentence_not_its_position():
+    pool = [Image.new("RGB", (8, 8), (i, i, i)) for i in range(6)]
+    sentences = split_sentences(SUMMARY)
+    before = dict(zip(sentences, video_generator.slide_images(sentences, pool)))
+    assert len({id(img) for img in before.values()}) == len(sentences)
+
+    reordered = sentences[::-1]
+    after = dict(zip(reordered, video_generator.slide_images(reordered, pool)))
+    assert all(after[sentence] is before[sentence] for sentence in sentences)
+
+    shifted = ["A new opening sentence"] + sentences
+    after = dict(zip(shifted, video_generator.slide_images(shifted, pool)))
+    assert len({id(img) for img in after.values()}) == len(shifted)
+    # Here the new sentence displaces at most one slide; a run of colliders could shift more.
+    assert sum(after[sentence] is not before[sentence] for sentence in sentences) <= 1
+
+
+def test_slides_reuse_images_only_once_the_pool_is_used_up():
+    pool = [Image.new("RGB", (8, 8), (i, i, i)) for i in range(3)]
+    images = video_generator.slide_images(split_sentences(SUMMARY), pool)
+    assert {id(img) for img in images} == {id(img) for img in pool}
+
+
+def test_segment_key_ignores_thread_count():
+    base = segment_key("A sentence", "abc", {"threads": 0})
+    assert segment_key("A sentence", "abc", {"threads": 8}) == base
+    assert segment_key("A sentence", "abc", {"crf": 18}) != base
+    assert segment_key("A sentence", "def") != base
@@ -0,0 +1,95 @@
+import subprocess
+
+import pytest
+from PIL import Image
+
+import metrics
+import video_encoding
+from video_encoding import DEFAULT_ENCODE_SETTINGS, encode_slideshow, encode_slideshow_ffmpeg, resolve_encode_settings
+
+FRAMES = [Image.new("RGB", (32, 18), (i * 60, 0, 0)) for i in range(3)]
+DURATIONS = [1.5, 2.25, 3.0]
+
+
+@pytest.fixture
+def ffmpeg_runs(monkeypatch):
+    """Records each ffmpeg command line instead of running it; set runs.returncode to make it fail."""
+    class Runs(list):
+        returncode = 0
+    runs = Runs()
+
+    def run(cmd, **kwargs):
+        runs.append(cmd)
+        return subprocess.CompletedProcess(cmd, runs.returncode, stdout="", stderr="boom")
+    monkeypatch.setattr(video_encoding, "get_ffmpeg_exe", lambda: "ffmpeg")
+    monkeypatch.setattr(video_encoding.subprocess, "run", run)
+    return runs
+
+
+@pytest.fixture
+def moviepy_calls(monkeypatch):
+    calls = []
+
+    def encode(frames, durations, audio_path, output_path, workdir, settings=None):
+        calls.append(settings)
+        return output_path
+    monkeypatch.setattr(video_encoding, "encode_slideshow_moviepy", encode)
+    return calls
+
+
+def test_settings_override_the_defaults_without_changing_them():
+    settings = resolve_encode_settings({"crf": 18})
+    assert settings["crf"] == 18
+    assert settings["preset"] == DEFAULT_ENCODE_SETTINGS["preset"]
+    assert DEFAULT_ENCODE_SETTINGS["crf"] == 28
+
+
+def test_ffmpeg_command_concatenates_still_slides(tmp_path, ffmpeg_runs):
+    output = str(tmp_path / "out.mp4")
+    settings = {"resolution": (320, 180), "fps": 4, "preset": "veryfast", "crf": 28, "threads": 2}
+    assert encode_slideshow_ffmpeg(FRAMES, DURATIONS, "narration.mp3", output, str(tmp_path), settings) == output
+
+    cmd, = ffmpeg_runs
+    list_path = str(tmp_path / "slides.txt")
+    assert cmd[:10] == ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+    assert cmd[10:12] == ["-i", "narration.mp3"]
+    for flag, value in [("-vf", "scale=320:180,format=yuv420p"), ("-r", "4"), ("-c:v", "libx264"),
+                        ("-preset", "veryfast"), ("-crf", "28"), ("-tune", "stillimage"), ("-threads", "2"),
+                        ("-c:a", "aac")]:
+        assert cmd[cmd.index(flag) + 1] == value
+    assert "-shortest" in cmd
+    assert cmd[-1] == output
+
+    slides = [str(tmp_path / f"slide_{i}.png") for i in range(3)]
+    # The last slide is listed again so its duration is honoured.
+    assert (tmp_path / "slides.txt").read_text(encoding="utf-8").splitlines() == [
+        f"file '{slides[0]}'", "duration 1.500",
+        f"file '{slides[1]}'", "duration 2.250",
+        f"file '{slides[2]}'", "duration 3.000",
+        f"file '{slides[2]}'",
+    ]
+
+
+def test_silent_video_has_no_audio_input(tmp_path, ffmpeg_runs):
+    encode_slideshow_ffmpeg(FRAMES, DURATIONS, None, str(tmp_path / "out.mp4"), str(tmp_path))
+    cmd, = ffmpeg_runs
+    assert cmd.count("-i") == 1
+    assert "-c:a" not in cmd
+    assert cmd[cmd.index("-vf") + 1] == "format=yuv420p"
+
+
+def test_failed_ffmpeg_run_falls_back_to_moviepy(tmp_path, ffmpeg_runs, moviepy_calls, monkeypatch):
+    registry = metrics.Metrics()
+    monkeypatch.setattr(metrics, "_metrics", registry)
+    ffmpeg_runs.returncode = 1
+    output = str(tmp_path / "out.mp4")
+    assert encode_slideshow(FRAMES, DURATIONS, "narration.mp3", output, str(tmp_path), {"mode": "fast"}) == output
+    assert len(ffmpeg_runs) == 1
+    assert len(moviepy_calls) == 1
+    assert {"name": "fallbacks", "labels": {"kind": "ffmpeg_to_moviepy"}, "value": 1} in registry.snapshot()["counters"]
+
+
+def test_moviepy_mode_skips_ffmpeg(tmp_path, ffmpeg_runs, moviepy_calls):
+    encode_slideshow(FRAMES, DURATIONS, None, str(tmp_path / "out.mp4"), str(tmp_path), {"mode": "moviepy"})
+    assert ffmpeg_runs == []
+    assert moviepy_calls[0]["mode"] == "moviepy"
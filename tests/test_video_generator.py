@@ -0,0 +1,48 @@
+import pytest
+
+import video_generator
+from video_generator import report_stage_overlap
+
+# (start, end) of each media stage in seconds, as if they ran side by side from t=0.
+STAGES = {"tts": (0.0, 3.0), "imagen": (0.1, 2.1), "article_images": (0.2, 1.2)}
+
+
+def durations(stages):
+    return {name: end - start for name, (start, end) in stages.items()}
+
+
+def test_overlapped_stages_count_as_saved(capsys):
+    wall_time = max(end for _, end in STAGES.values())
+    saved = report_stage_overlap(durations(STAGES), wall_time)
+    # The longest stage sets the wall time; the others ran inside its window.
+    assert saved == pytest.approx({"tts": 0.0, "imagen": 2.0, "article_images": 1.0, "total": 3.0})
+    out = capsys.readouterr().out
+    assert "imagen 2.00s (saved 2.00s)" in out
+    assert "Wall time 3.00s, 3.00s saved vs. sequential." in out
+
+
+def test_partly_overlapped_stages_save_only_the_overlap():
+    stages = {"tts": (0.0, 3.0), "imagen": (2.0, 5.0)}
+    saved = report_stage_overlap(durations(stages), 5.0)
+    assert saved["total"] == pytest.approx(1.0)
+
+
+def test_sequential_stages_save_nothing():
+    stages = {"tts": (0.0, 3.0), "imagen": (3.0, 5.0), "article_images": (5.0, 6.0)}
+    # Scheduling overhead can make the wall time exceed the sum of the stages.
+    assert report_stage_overlap(durations(stages), 6.5)["total"] == 0.0
+
+
+def test_timed_records_each_stage_duration(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(video_generator.time, "perf_counter", lambda: clock[0])
+
+    def stage(seconds):
+        clock[0] += seconds
+        return seconds
+
+    timings = {}
+    assert video_generator._timed(timings, "imagen", stage, 2.0) == 2.0
+    with pytest.raises(ZeroDivisionError):
+        video_generator._timed(timings, "tts", lambda: 1 / 0)
+    assert timings == {"imagen": 2.0, "tts": 0.0}
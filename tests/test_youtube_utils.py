@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+
+import pytest
+from youtube_transcript_api import FetchedTranscript, FetchedTranscriptSnippet
+
+import youtube_utils
+from cache import DiskCache, content_hash
+from youtube_utils import extract_video_id, get_playlist_transcripts, get_video_transcript, get_video_transcripts
+
+
+class StubTranscript:
+    def __init__(self, api, video_id, language_code, translated_from=None):
+        self.api = api
+        self.video_id = video_id
+        self.language_code = language_code
+        self.translated_from = translated_from
+        self.is_translatable = True
+
+    def translate(self, language_code):
+        return StubTranscript(self.api, self.video_id, language_code, translated_from=self.language_code)
+
+    def fetch(self):
+        self.api.fetches.append(self.video_id)
+        time.sleep(self.api.delays.get(self.video_id, 0))
+        prefix = f"[{self.translated_from}->{self.language_code}]" if self.translated_from else f"[{self.language_code}]"
+        lines = [f"{prefix} line {i} of {self.video_id}" for i in range(3)]
+        if self.api.legacy:
+            return [{"text": line} for line in lines]
+        return FetchedTranscript(snippets=[FetchedTranscriptSnippet(text=line, start=i * 3.0, duration=3.0)
+                                           for i, line in enumerate(lines)],
+                                 video_id=self.video_id, language=self.language_code,
+                                 language_code=self.language_code, is_generated=False)
+
+
+class StubTranscriptList:
+    def __init__(self, api, video_id, languages):
+        self.api = api
+        self.transcripts = [StubTranscript(api, video_id, code) for code in languages]
+
+    def find_transcript(self, language_codes):
+        self.api.lookups.append(list(language_codes))
+        for transcript in self.transcripts:
+            if transcript.language_code in language_codes:
+                return transcript
+        raise LookupError(language_codes)
+
+    def __iter__(self):
+        return iter(self.transcripts)
+
+
+def make_api(languages_by_video, delays=None, legacy=False):
+    """
+    A local stand-in for YouTubeTranscriptApi that records what it was asked.
+
+    It has the 1.x instance API (YouTubeTranscriptApi().list(video_id), whose
+    transcripts fetch a FetchedTranscript), or with legacy=True the 0.x
+    list_transcripts classmethod returning lists of dicts.
+    """
+    class StubApi:
+        fetches = []
+        lookups = []
+        listed = []
+        _lock = threading.Lock()
+
+        @classmethod
+        def _list(cls, video_id):
+            with cls._lock:
+                cls.listed.append(video_id)
+            if video_id not in languages_by_video:
+                raise LookupError(f"no transcripts for {video_id}")
+            return StubTranscriptList(cls, video_id, languages_by_video[video_id])
+
+    if legacy:
+        StubApi.list_transcripts = classmethod(lambda cls, video_id: cls._list(video_id))
+    else:
+        StubApi.list = lambda self, video_id: type(self)._list(video_id)
+    StubApi.delays = delays or {}
+    StubApi.legacy = legacy
+    return StubApi
+
+
+@pytest.fixture
+def transcript_cache(tmp_path, monkeypatch):
+    disk = DiskCache(str(tmp_path / "transcripts.sqlite3"))
+    monkeypatch.setattr(youtube_utils, "get_transcript_cache", lambda: disk)
+    return disk
+
+
+def test_english_transcript_is_cached(transcript_cache):
+    api = make_api({"vid00000001": ["en"]})
+    text = get_video_transcript("vid00000001", api=api)
+    assert text.splitlines() == [f"[en] line {i} of vid00000001" for i in range(3)]
+    assert get_video_transcript("vid00000001", api=api) == text
+    assert api.listed == ["vid00000001"]
+
+
+def test_translated_route_is_recorded(transcript_cache):
+    api = make_api({"vid00000002": ["de"]})
+    text = get_video_transcript("vid00000002", api=api)
+    assert text.startswith("[de->en]")
+    route = json.loads(transcript_cache.get(content_hash("route", "vid00000002")))
+    assert route == {"path": "translated", "source_language": "de", "language": "en"}
+
+
+def test_recorded_route_is_reused_after_the_text_is_evicted(transcript_cache):
+    api = make_api({"vid00000003": ["de"]})
+    first = get_video_transcript("vid00000003", api=api)
+    transcript_cache.delete(content_hash("text", "vid00000003", "en"))
+    api.lookups.clear()
+
+    # A cache miss on the text fetches again, but goes straight to the recorded route.
+    assert get_video_transcript("vid00000003", api=api) == first
+    assert api.lookups == [["de"]]
+    assert api.fetches == ["vid00000003", "vid00000003"]
+
+
+@pytest.mark.parametrize("legacy", [False, True])
+def test_non_english_transcripts_are_translated_with_either_api(transcript_cache, legacy):
+    api = make_api({"vid00000005": ["fr"]}, legacy=legacy)
+    text = get_video_transcript("vid00000005", api=api)
+    assert text.splitlines() == [f"[fr->en] line {i} of vid00000005" for i in range(3)]
+    assert api.lookups == [["en"], ["en-US", "en-GB"]]
+
+
+def test_errors_are_not_cached(transcript_cache):
+    api = make_api({})
+    assert get_video_transcript("missing0001", api=api).startswith("Error")
+    assert get_video_transcript("missing0001", api=api).startswith("Error")
+    assert api.listed == ["missing0001", "missing0001"]
+
+
+def test_cache_can_be_bypassed(transcript_cache):
+    api = make_api({"vid00000004": ["en"]})
+    get_video_transcript("vid00000004", api=api)
+    get_video_transcript("vid00000004", use_cache=False, api=api)
+    assert api.fetches == ["vid00000004", "vid00000004"]
+
+
+def test_video_transcripts_are_fetched_once_per_id(transcript_cache):
+    api = make_api({"vid0000000a": ["en"], "vid0000000b": ["en"]})
+    results = list(get_video_transcripts(["vid0000000a", "vid0000000b", "vid0000000a"], api=api))
+    assert sorted(video_id for video_id, _ in results) == ["vid0000000a", "vid0000000b"]
+    assert sorted(api.fetches) == ["vid0000000a", "vid0000000b"]
+
+
+def test_playlist_transcripts_keep_page_order(transcript_cache, monkeypatch):
+    page_order = ["vid0000000a", "vid0000000b", "vid0000000c"]
+    monkeypatch.setattr(youtube_utils, "get_playlist_video_ids", lambda url: page_order)
+    # The first video finishes last.
+    api = make_api({video_id: ["en"] for video_id in page_order}, delays={"vid0000000a": 0.2})
+    results = get_playlist_transcripts("PLxxxxxxxxxxxx", api=api)
+    assert list(results) == page_order
+    assert all(text.startswith("[en]") for text in results.values())
+
+
+@pytest.mark.parametrize("url, video_id", [
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+    ("https://youtu.be/dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+    ("https://www.youtube.com/embed/dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+    ("https://example.com/watch?v=dQw4w9WgXcQ", None),
+])
+def test_extract_video_id(url, video_id):
+    assert extract_video_id(url) == video_id
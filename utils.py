@@ -1,11 +1,19 @@
-import requests
+import http_client
 import streamlit as st
+import functools
+import queue
 import random
 import string
+import threading
+import time
 
+from metrics import count
+
+@functools.lru_cache(maxsize=1)
 def get_notification_topic():
     """
     Gets the ntfy.sh topic from Streamlit secrets or generates a random one if not set.
+    The result is cached, since secrets don't change while the server runs.
     """
     if "NTFY_TOPIC" in st.secrets:
         return st.secrets["NTFY_TOPIC"]
@@ -14,18 +22,154 @@ def get_notification_topic():
     # Ideally, the user should configure this to receive notifications reliably.
     return "news-scraper-visits-default"
 
+def post_notification(topic, message, title="News Scraper Visit", timeout=5):
+    """
+    Posts a single notification to ntfy.sh and raises on failure.
+    """
+    response = http_client.post(f"https://ntfy.sh/{topic}", 
+                                data=message.encode(encoding='utf-8'),
+                                headers={
+                                    "Title": title,
+                                    "Priority": "default",
+                                    "Tags": "newspaper"
+                                },
+                                timeout=timeout)
+    response.raise_for_status()
+
+class NotificationDispatcher:
+    """
+    Sends notifications from a background thread so callers never wait on ntfy.sh.
+    
+    Messages go into a bounded queue. The worker collects whatever arrives
+    within a short window, drops exact duplicates and posts each topic's
+    messages as one notification, with a timeout and retries. When the queue
+    is full, new messages are dropped instead of blocking the caller.
+    
+    Its counters are also reported to metrics.py as "notifications" with an
+    event label (queued, sent, dropped, failed, coalesced, retries).
+    """
+
+    def __init__(self, max_queue=100, batch_window=2.0, max_batch=20, timeout=5, max_retries=3):
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.retries = 0
+
+    def _record(self, event, amount=1):
+        """Adds amount to the dispatcher counter named event and to the matching metrics counter."""
+        with self._lock:
+            setattr(self, event, getattr(self, event) + amount)
+        count("notifications", amount, event=event)
+
+    def submit(self, message, topic):
+        """
+        Queues a message without blocking.
+        
+        Returns:
+            bool: False if the message was dropped because the queue is full.
+        """
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((topic, message))
+        except queue.Full:
+            self._record("dropped")
+            return False
+        self._record("queued")
+        return True
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queued": self.queued,
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "coalesced": self.coalesced,
+                "retries": self.retries,
+            }
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+                self._thread.start()
+
+    def _collect_batch(self):
+        """Blocks for one message, then gathers more for up to batch_window seconds."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            by_topic = {}
+            for topic, message in batch:
+                messages = by_topic.setdefault(topic, [])
+                if message in messages:
+                    self._record("coalesced")
+                    continue
+                messages.append(message)
+            for topic, messages in by_topic.items():
+                self._send(topic, messages)
+
+    def _send(self, topic, messages):
+        if len(messages) == 1:
+            title, body = "News Scraper Visit", messages[0]
+        else:
+            title, body = f"News Scraper Visits ({len(messages)})", "\n\n---\n\n".join(messages)
+        for attempt in range(self.max_retries + 1):
+            try:
+                post_notification(topic, body, title=title, timeout=self.timeout)
+                self._record("sent", len(messages))
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Failed to send notification: {e}")
+                    self._record("failed", len(messages))
+                    return
+                self._record("retries")
+                time.sleep(random.uniform(0, 2 ** attempt))
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_notification_dispatcher():
+    """Returns the process-wide notification dispatcher."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher()
+        return _dispatcher
+
 def send_notification(message):
     """
-    Sends a notification to ntfy.sh.
+    Queues a notification to ntfy.sh. Returns immediately; delivery happens in the background.
     """
-    topic = get_notification_topic()
     try:
-        requests.post(f"https://ntfy.sh/{topic}", 
-                      data=message.encode(encoding='utf-8'),
-                      headers={
-                          "Title": "News Scraper Visit",
-                          "Priority": "default",
-                          "Tags": "newspaper"
-                      })
+        topic = get_notification_topic()
+        if not get_notification_dispatcher().submit(message, topic):
+            print("Notification queue full; dropped message.")
     except Exception as e:
         print(f"Failed to send notification: {e}")
@@ -0,0 +1,146 @@
+import os
+import shutil
+import subprocess
+
+from PIL import Image
+
+from metrics import count
+
+# "fast" concatenates the still slides with ffmpeg for their exact durations;
+# "moviepy" renders every frame at a fixed rate through moviepy.
+DEFAULT_ENCODE_SETTINGS = {
+    "mode": os.environ.get("NEWS_VIDEO_ENCODE_MODE", "fast"),
+    "preset": "veryfast",
+    "crf": 28,
+    "threads": 0,  # 0 lets ffmpeg pick
+    "resolution": None,  # (width, height) to scale to, or None to keep the slide size
+    "fps": 4,  # output frame rate in fast mode; slides don't move, so a low rate is enough
+    "moviepy_fps": 24,  # frame rate moviepy renders at in "moviepy" mode
+    # In "fast" mode, narrate and encode each sentence as its own cached segment (see segment_renderer).
+    "segments": os.environ.get("NEWS_VIDEO_SEGMENTS", "1") != "0",
+}
+
+# What generate_video used before the fast mode existed (x264 defaults at 24 fps).
+MOVIEPY_BASELINE_SETTINGS = {"mode": "moviepy", "preset": "medium", "crf": 23, "threads": 0, "moviepy_fps": 24}
+
+
+def resolve_encode_settings(settings=None):
+    """Returns DEFAULT_ENCODE_SETTINGS overridden by any keys in settings."""
+    resolved = dict(DEFAULT_ENCODE_SETTINGS)
+    if settings:
+        resolved.update(settings)
+    return resolved
+
+
+def get_ffmpeg_exe():
+    """Returns the ffmpeg binary moviepy uses, or the one on PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        exe = shutil.which("ffmpeg")
+        if exe is None:
+            raise RuntimeError("ffmpeg not found")
+        return exe
+
+
+def encode_slideshow_ffmpeg(frames, durations, audio_path, output_path, workdir, settings=None):
+    """
+    Encodes still slides with ffmpeg's concat demuxer, each shown for its exact duration.
+
+    Each slide is decoded once and the encoder is tuned for still images, so
+    the cost grows with the number of slides rather than with video length.
+
+    Args:
+        frames (list): Slide images as RGB numpy arrays or PIL images.
+        durations (list): Seconds each slide stays on screen.
+        audio_path (str): Narration audio file, or None for a silent video.
+        output_path (str): Where to write the MP4.
+        workdir (str): Private directory for the slide files and concat list.
+        settings (dict): Encode settings, see DEFAULT_ENCODE_SETTINGS.
+    """
+    settings = resolve_encode_settings(settings)
+    list_path = os.path.join(workdir, "slides.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for i, (frame, duration) in enumerate(zip(frames, durations)):
+            slide_path = os.path.join(workdir, f"slide_{i}.png")
+            img = frame if isinstance(frame, Image.Image) else Image.fromarray(frame)
+            # The PNG is read once by ffmpeg; favour speed over size.
+            img.save(slide_path, compress_level=1)
+            f.write(f"file '{slide_path}'\nduration {duration:.3f}\n")
+        # The concat demuxer ignores the last entry's duration unless the file is repeated.
+        f.write(f"file '{slide_path}'\n")
+
+    cmd = [get_ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_path:
+        cmd += ["-i", audio_path]
+    filters = []
+    if settings["resolution"]:
+        width, height = settings["resolution"]
+        filters.append(f"scale={width}:{height}")
+    filters.append("format=yuv420p")
+    cmd += [
+        "-vf", ",".join(filters),
+        "-r", str(settings["fps"]),
+        "-c:v", "libx264",
+        "-preset", settings["preset"],
+        "-crf", str(settings["crf"]),
+        "-tune", "stillimage",
+        "-threads", str(settings["threads"]),
+        "-movflags", "+faststart",
+    ]
+    if audio_path:
+        cmd += ["-c:a", "aac", "-shortest"]
+    cmd.append(output_path)
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()}")
+    return output_path
+
+
+def encode_slideshow_moviepy(frames, durations, audio_path, output_path, workdir, settings=None):
+    """
+    Encodes the slides through moviepy, rendering every frame at settings['moviepy_fps'].
+
+    audio_path may also be a list of clips, which are played one after another.
+    """
+    from moviepy.editor import AudioFileClip, ImageClip, concatenate_audioclips, concatenate_videoclips
+    import numpy as np
+
+    settings = resolve_encode_settings(settings)
+    clips = [ImageClip(np.asarray(frame)).set_duration(duration) for frame, duration in zip(frames, durations)]
+    final_video = concatenate_videoclips(clips)
+    audio_clips = [AudioFileClip(path) for path in ([audio_path] if isinstance(audio_path, str) else audio_path or [])]
+    if audio_clips:
+        final_video = final_video.set_audio(concatenate_audioclips(audio_clips))
+    if settings["resolution"]:
+        final_video = final_video.resize(newsize=tuple(settings["resolution"]))
+    try:
+        final_video.write_videofile(output_path, fps=settings["moviepy_fps"], codec='libx264', audio_codec='aac',
+                                    preset=settings["preset"],
+                                    threads=settings["threads"] or None,
+                                    ffmpeg_params=["-crf", str(settings["crf"])],
+                                    temp_audiofile=os.path.join(workdir, "encode_audio.m4a"),
+                                    logger=None)
+    finally:
+        final_video.close()
+        for audio_clip in audio_clips:
+            audio_clip.close()
+    return output_path
+
+
+def encode_slideshow(frames, durations, audio_path, output_path, workdir, settings=None):
+    """
+    Encodes a slideshow using the mode in settings, falling back to moviepy if ffmpeg fails.
+
+    Returns:
+        str: output_path.
+    """
+    settings = resolve_encode_settings(settings)
+    if settings["mode"] == "fast":
+        try:
+            return encode_slideshow_ffmpeg(frames, durations, audio_path, output_path, workdir, settings)
+        except Exception as e:
+            print(f"Fast encode failed: {e}. Falling back to moviepy...")
+            count("fallbacks", kind="ffmpeg_to_moviepy")
+    return encode_slideshow_moviepy(frames, durations, audio_path, output_path, workdir, settings)
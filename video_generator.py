@@ -1,13 +1,23 @@
 import os
-import requests
+import tempfile
+import uuid
+import http_client
 from io import BytesIO
-from gtts import gTTS
-from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFile, ImageFont
 import textwrap
 import urllib.parse
 import random
-import google.generativeai as genai
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cache import content_hash
+from image_cache import get_image_cache
+from metrics import count, in_current_context, span
+from rate_limiter import (INTERACTIVE, RETRYABLE_STATUS_CODES, RetryableError, get_scheduler, parse_retry_after,
+                          register_model)
+from segment_renderer import get_segment_cache, render_segments, split_sentences, synthesize_sentences
+from video_encoding import encode_slideshow, encode_slideshow_moviepy, resolve_encode_settings
 
 def generate_black_image(size=(1280, 720)):
     """Generates a plain black image."""
@@ -15,13 +25,27 @@ def generate_black_image(size=(1280, 720)):
 
 import base64
 
-def fetch_google_image(prompt, api_key):
-    """Fetches an image using Google Imagen via REST API."""
+IMAGEN_MODEL = "imagen-4.0-fast-generate-001"
+register_model(IMAGEN_MODEL, requests_per_minute=int(os.environ.get("NEWS_IMAGEN_RPM", 10)))
+# Base URL of the Imagen REST API; overridable for the offline benchmark server.
+IMAGEN_API_BASE = os.environ.get("IMAGEN_API_BASE", "https://generativelanguage.googleapis.com")
+
+def _post_imagen(url, headers, data):
+    """POSTs an Imagen request, raising RetryableError on 429/5xx so the scheduler retries it."""
+    response = http_client.post(url, headers=headers, json=data, timeout=30)
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        raise RetryableError(f"Google Imagen API Error: {response.status_code} - {response.text[:200]}",
+                             status_code=response.status_code,
+                             retry_after=parse_retry_after(response.headers.get("Retry-After")))
+    return response
+
+def fetch_google_image(prompt, api_key, priority=INTERACTIVE):
+    """Fetches an image using Google Imagen via REST API, through the shared rate limiter."""
     if not api_key:
         return None
         
     try:
-        url = "https://generativelanguage.googleapis.com/v1beta/models/imagen-4.0-fast-generate-001:predict"
+        url = f"{IMAGEN_API_BASE}/v1beta/models/{IMAGEN_MODEL}:predict"
         headers = {
             "Content-Type": "application/json",
             "x-goog-api-key": api_key
@@ -37,7 +61,7 @@ def fetch_google_image(prompt, api_key):
         }
         
         print(f"Generating Google Image (REST) for: {prompt[:30]}...")
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = get_scheduler().call(IMAGEN_MODEL, _post_imagen, url, headers, data, priority=priority)
         
         if response.status_code == 200:
             result = response.json()
@@ -59,34 +83,60 @@ def fetch_google_image(prompt, api_key):
         print(f"Google Imagen failed: {e}")
         return None
 
-def fetch_ai_image(prompt, size=(1280, 720), api_key=None):
-    """Fetches an AI generated image using Google Imagen."""
+def fetch_ai_image(prompt, size=(1280, 720), api_key=None, story_id=None):
+    """
+    Fetches an AI generated image using Google Imagen.
+    
+    The image is kept in the resized-image cache under the story's identity
+    (e.g. its URL), or under the prompt when there is none, so re-rendering
+    an edited summary of the same story reuses it (and its cached video segments).
+    """
     if not api_key:
         return None
 
+    cache = get_image_cache()
+    cache_url = f"imagen:{IMAGEN_MODEL}:{story_id or prompt}"
+    img = cache.get(cache_url, size)
+    if img is not None:
+        count("cache_hits", cache="imagen")
+        return img
+    count("cache_misses", cache="imagen")
     print(f"Generating AI image for summary: {prompt[:50]}...")
     img = fetch_google_image(prompt, api_key)
     if img:
-        return img.resize(size, Image.LANCZOS)
+        return cache.set(cache_url, size, img.convert('RGB').resize(size, Image.LANCZOS, reducing_gap=3.0))
             
     return None
 
+@lru_cache(maxsize=8)
+def load_font(size=40):
+    """Loads the slide font once per size instead of once per slide."""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except IOError:
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=4)
+def _black_layer(size):
+    """A black RGB image used to darken slides; built once per slide size and never modified."""
+    return Image.new('RGB', size, (0, 0, 0))
+
+# Opacity of the dark layer behind the slide text (the former RGBA overlay's alpha of 120).
+OVERLAY_OPACITY = 120 / 255
+
 def create_text_overlay(text, base_image, size=(1280, 720)):
     """Overlays text on an image."""
     if base_image.size != size:
         base_image = base_image.resize(size)
+    if base_image.mode != 'RGB':
+        base_image = base_image.convert('RGB')
     
-    overlay = Image.new('RGBA', size, (0, 0, 0, 120))
-    base_image = base_image.convert('RGBA')
-    base_image = Image.alpha_composite(base_image, overlay)
-    base_image = base_image.convert('RGB')
+    # Blending with black in RGB gives the same result as compositing a
+    # translucent black RGBA layer, without the RGBA round trip.
+    base_image = Image.blend(base_image, _black_layer(size), OVERLAY_OPACITY)
     
     d = ImageDraw.Draw(base_image)
-    
-    try:
-        font = ImageFont.truetype("arial.ttf", 40)
-    except IOError:
-        font = ImageFont.load_default()
+    font = load_font(40)
 
     lines = textwrap.wrap(text, width=50)
     line_height = 50
@@ -104,138 +154,373 @@ def create_text_overlay(text, base_image, size=(1280, 720)):
         
     return base_image
 
-def fetch_article_image(url, size=(1280, 720)):
-    """Fetches and resizes an image from a URL."""
+def decode_resized(source, size=(1280, 720)):
+    """
+    Decodes an image at reduced size and resizes it to `size`.
+    
+    JPEGs are decoded in draft mode at the smallest 1/2, 1/4 or 1/8 scale that
+    still covers `size`, so a 6000x4000 photo is never held at full
+    resolution. Other formats are shrunk by whole factors before the LANCZOS pass.
+    
+    Args:
+        source: A file path or file-like object with the encoded image.
+        size (tuple): Target (width, height).
+        
+    Returns:
+        PIL.Image.Image: The RGB image at exactly `size`.
+    """
+    img = Image.open(source)
+    img.draft('RGB', size)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+# Keywords to filter out irrelevant images
+IGNORE_IMAGE_TERMS = ["logo", "icon", "avatar", "profile", "ad-", "ads", "banner", "social", "footer", "header", "button", "tracker", "pixel", "share"]
+
+def check_image_dimensions(w, h):
+    """Returns a reason to skip an image of this size, or None if it is usable."""
+    # Filter out small images
+    if w < 300 or h < 200:
+        return f"small image ({w}x{h})"
+    # Filter out extreme aspect ratios (banners or skyscrapers)
+    aspect_ratio = w / h
+    if aspect_ratio > 3.0 or aspect_ratio < 0.3:
+        return f"odd aspect ratio ({aspect_ratio:.2f})"
+    return None
+
+def probe_article_image(url, stop_event=None, size=(1280, 720), chunk_size=16384):
+    """
+    Streams an image and rejects it as soon as its header shows unusable dimensions.
+    
+    Only the first few kilobytes are downloaded for images that fail the size
+    or aspect ratio check. Accepted images are decoded at reduced size (see
+    decode_resized) and kept in the resized-image cache, so they are not
+    downloaded again. The download is abandoned if stop_event is set.
+    
+    Args:
+        url (str): The image URL.
+        stop_event (threading.Event): Set by the caller once no more images are needed.
+        size (tuple): Size to resize accepted images to.
+        
+    Returns:
+        tuple: (image, reason). image is the resized PIL image, or None with the reason it was skipped.
+    """
+    response = None
     try:
-        print(f"Fetching article image: {url}")
+        cache = get_image_cache()
+        img = cache.get(url, size)
+        if img is not None:
+            count("cache_hits", cache="image")
+            return img, None
+        count("cache_misses", cache="image")
+        
         # Disable SSL verification for image fetch as well
-        response = requests.get(url, timeout=10, verify=False)
-        if response.status_code == 200:
-            img = Image.open(BytesIO(response.content))
-            return img.resize(size, Image.LANCZOS)
+        response = http_client.get(url, timeout=10, verify=False, stream=True)
+        if response.status_code != 200:
+            return None, f"HTTP {response.status_code}"
+        
+        # The parser only reads the header; it is dropped before it decodes the full-size pixels.
+        parser = ImageFile.Parser()
+        data = bytearray()
+        for chunk in response.iter_content(chunk_size):
+            if stop_event is not None and stop_event.is_set():
+                return None, "cancelled"
+            data += chunk
+            if parser is not None:
+                parser.feed(chunk)
+                if parser.image is not None:
+                    reason = check_image_dimensions(*parser.image.size)
+                    if reason:
+                        return None, reason
+                    parser = None
+        
+        if parser is not None:
+            # The header was never recognized while streaming; Image.open reads just the header.
+            reason = check_image_dimensions(*Image.open(BytesIO(data)).size)
+            if reason:
+                return None, reason
+        img = decode_resized(BytesIO(data), size)
+        img = cache.set(url, size, img)
+        return img, None
     except Exception as e:
-        print(f"Error fetching article image {url}: {e}")
-    return None
+        return None, f"error: {e}"
+    finally:
+        if response is not None:
+            response.close()
 
-def generate_video(summary_text, api_key=None, article_images=None, output_path="news_summary.mp4"):
+def select_article_images(article_images, limit=5, max_workers=8):
+    """
+    Picks up to `limit` usable article images, probing candidates concurrently.
+    
+    Candidates keep their priority order (the top image first). As soon as the
+    first `limit` usable images are known, the remaining downloads are cancelled.
+    
+    Args:
+        article_images (list): Candidate image URLs in priority order.
+        limit (int): Maximum number of images to return.
+        max_workers (int): Maximum concurrent downloads.
+        
+    Returns:
+        list: The selected PIL images, resized to 1280x720.
+    """
+    # 1. URL Keyword Filter
+    candidates = [url for url in article_images if not any(term in url.lower() for term in IGNORE_IMAGE_TERMS)]
+    count("images_skipped", len(article_images) - len(candidates), reason="keyword")
+    if not candidates or limit <= 0:
+        return []
+    
+    stop_event = threading.Event()
+    results = {}
+    selected = []
+    next_index = 0
+    futures = {}
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for i, url in enumerate(candidates):
+            futures[executor.submit(in_current_context(probe_article_image), url, stop_event)] = i
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            
+            # Accept images strictly in priority order, as far as results are known.
+            while next_index in results and len(selected) < limit:
+                img, reason = results[next_index]
+                url = candidates[next_index]
+                if img is not None:
+                    selected.append(img)
+                    print(f"Added article image to pool: {url}")
+                else:
+                    print(f"Skipping image {url}: {reason}")
+                    # "small image (120x90)" -> "small image", "error: ..." -> "error"
+                    count("images_skipped", reason=reason.split(" (")[0].split(":")[0])
+                next_index += 1
+            
+            if len(selected) >= limit:
+                break
+    finally:
+        stop_event.set()
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+    
+    return selected
+
+def slide_images(sentences, image_pool):
+    """
+    Picks each sentence's background from the pool, or black if it is empty.
+    
+    Sentences are visited in content-hash order and each takes the first unused
+    image from a start point given by its own hash, so slides get distinct
+    images while the pool lasts. The picks depend on the sentence text, not its
+    position, so reordering sentences keeps every pick. Editing or inserting a
+    sentence moves only the later sentences (in hash order) whose probe ran over
+    the image it now takes; that is usually none or one, but a run of colliding
+    sentences can all shift by one image, re-rendering their segments.
+    """
+    if not image_pool:
+        print("Pool empty. Using fallback black image.")
+        count("fallbacks", kind="black_image")
+        black = generate_black_image()
+        return [black] * len(sentences)
+
+    hashes = [int(content_hash("slide", sentence), 16) for sentence in sentences]
+    images = [None] * len(sentences)
+    used = set()
+    for i in sorted(range(len(sentences)), key=lambda i: (hashes[i], i)):
+        # Once every image has been shown, start reusing them.
+        if len(used) == len(image_pool):
+            used.clear()
+        pick = hashes[i] % len(image_pool)
+        while pick in used:
+            pick = (pick + 1) % len(image_pool)
+        used.add(pick)
+        images[i] = image_pool[pick]
+    return images
+
+def compose_slides(sentences, image_pool):
+    """Overlays each sentence on its background from the pool (see slide_images)."""
+    return [create_text_overlay(sentence, img) for sentence, img in zip(sentences, slide_images(sentences, image_pool))]
+
+def synthesize_speech(text, audio_path):
+    """Synthesizes the narration with gTTS and writes the MP3 stream to audio_path."""
+    from gtts import gTTS
+    
+    tts = gTTS(text=text, lang='en')
+    with open(audio_path, 'wb') as f:
+        tts.write_to_fp(f)
+    return audio_path
+
+VIDEO_OUTPUT_DIR = os.environ.get("NEWS_VIDEO_OUTPUT_DIR", os.path.join(tempfile.gettempdir(), "news_videos"))
+
+def default_output_path():
+    """Returns a unique MP4 path, so concurrent sessions never share an output file."""
+    os.makedirs(VIDEO_OUTPUT_DIR, exist_ok=True)
+    return os.path.join(VIDEO_OUTPUT_DIR, f"news_summary_{uuid.uuid4().hex}.mp4")
+
+def _timed(timings, name, func, *args, **kwargs):
+    """Runs func as the metrics stage `name` and records its duration in seconds under timings[name]."""
+    start = time.perf_counter()
+    try:
+        with span(name):
+            return func(*args, **kwargs)
+    finally:
+        timings[name] = time.perf_counter() - start
+
+def report_stage_overlap(timings, wall_time):
+    """
+    Prints how long each concurrent stage took and how much wall-clock time overlapping saved.
+    
+    A stage that finished within the longest stage's window cost nothing extra,
+    so its whole duration counts as saved compared to running it serially.
+    
+    Returns:
+        dict: Seconds saved per stage, plus 'total'.
+    """
+    longest = max(timings, key=timings.get)
+    saved = {name: (0.0 if name == longest else duration) for name, duration in timings.items()}
+    saved['total'] = max(0.0, sum(timings.values()) - wall_time)
+    details = ", ".join(f"{name} {duration:.2f}s (saved {saved[name]:.2f}s)" for name, duration in timings.items())
+    print(f"Media stages: {details}. Wall time {wall_time:.2f}s, {saved['total']:.2f}s saved vs. sequential.")
+    return saved
+
+def generate_video(summary_text, api_key=None, article_images=None, output_path=None, timings=None, encode_settings=None,
+                   progress_callback=None, story_id=None):
     """
     Generates a video from the summary text.
+    
+    Speech synthesis, the Imagen call and article image fetching run
+    concurrently; slides are composed as soon as the images are in, while
+    the narration may still be synthesizing.
+    
+    By default each sentence is narrated separately and encoded by ffmpeg
+    as its own segment, which lasts exactly as long as its narration.
+    Segments are cached (see segment_renderer), so re-rendering an edited
+    summary only encodes the sentences that changed; the video is then
+    joined without re-encoding. Any intermediate files live in a private
+    directory for this job, which is removed when the job ends.
+    
+    Args:
+        summary_text (str): The summary to narrate.
+        api_key (str): The Google API key used for Imagen.
+        article_images (list): Candidate article image URLs in priority order.
+        output_path (str): Where to write the MP4. Defaults to a unique file per job.
+        timings (dict): If given, filled with per-stage durations and time saved.
+        encode_settings (dict): Overrides for video_encoding.DEFAULT_ENCODE_SETTINGS
+            (mode, preset, crf, threads, resolution, fps, segments).
+        progress_callback (callable): Called as progress_callback(stage, fraction) when
+            a stage ("media", "slides", "encode", "done") starts, fraction being 0 to 1.
+        story_id (str): Stable identity of the story (article URL or video ID). The AI
+            illustration is cached under it, so edits to the summary keep the same image.
+        
+    Returns:
+        str: The path of the generated video, or None on failure.
     """
     try:
+        with span("video"), tempfile.TemporaryDirectory(prefix="news_video_") as workdir:
+            return _render_video(summary_text, api_key, article_images, output_path or default_output_path(),
+                                 timings, encode_settings, workdir, progress_callback or _no_progress, story_id)
+    except Exception as e:
+        print(f"Error generating video: {e}")
+        count("errors", stage="video")
+        return None
+
+def _no_progress(stage, fraction):
+    pass
+
+def _render_video(summary_text, api_key, article_images, output_path, timings, encode_settings, workdir,
+                  progress_callback, story_id=None):
+    """Renders the video, keeping every intermediate file inside workdir."""
+    settings = resolve_encode_settings(encode_settings)
+    # Per-sentence narration and cached segments need the ffmpeg path.
+    segmented = settings["segments"] and settings["mode"] == "fast"
+    sentences = split_sentences(summary_text)
+    stage_timings = {}
+    audio_path = os.path.join(workdir, "narration.mp3")
+    # Create a prompt that summarizes the story for the image
+    # We use the first 300 chars of the summary to avoid token limits but give enough context
+    ai_prompt = f"A news illustration representing: {summary_text[:300]}"
+    
+    progress_callback("media", 0.05)
+    media_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=3) as executor:
         # 1. Generate Audio
-        tts = gTTS(text=summary_text, lang='en')
-        audio_path = "temp_audio.mp3"
-        tts.save(audio_path)
-        audio_clip = AudioFileClip(audio_path)
+        if segmented:
+            # One clip per sentence, so each slide lasts exactly as long as its narration.
+            audio_future = executor.submit(in_current_context(_timed), stage_timings, 'tts', synthesize_sentences,
+                                           sentences, workdir, synthesize_speech, get_segment_cache())
+        else:
+            audio_future = executor.submit(in_current_context(_timed), stage_timings, 'tts', synthesize_speech, summary_text, audio_path)
+        # 2A. Generate ONE AI Image for the whole story
+        print("Generating 'Whole Story' AI Image...")
+        ai_future = executor.submit(in_current_context(_timed), stage_timings, 'imagen', fetch_ai_image, ai_prompt, api_key=api_key,
+                                    story_id=story_id)
+        # 2B. Process Article Images
+        article_future = None
+        if article_images:
+            print(f"Found {len(article_images)} article images. Verifying...")
+            article_future = executor.submit(in_current_context(_timed), stage_timings, 'article_images', select_article_images, article_images)
 
-        # 2. Prepare Image Pool
         image_pool = []
-        
-        # A. Generate ONE AI Image for the whole story
-        print("Generating 'Whole Story' AI Image...")
-        # Create a prompt that summarizes the story for the image
-        # We use the first 300 chars of the summary to avoid token limits but give enough context
-        ai_prompt = f"A news illustration representing: {summary_text[:300]}"
-        ai_img = fetch_ai_image(ai_prompt, api_key=api_key)
+        ai_img = ai_future.result()
         if ai_img:
             image_pool.append(ai_img)
             print("Successfully added AI image to pool.")
         else:
             print("Failed to generate AI image.")
-
-        # B. Process Article Images
-        if article_images:
-            print(f"Found {len(article_images)} article images. Verifying...")
-            
-            # Keywords to filter out irrelevant images
-            ignore_terms = ["logo", "icon", "avatar", "profile", "ad-", "ads", "banner", "social", "footer", "header", "button", "tracker", "pixel", "share"]
-            
-            count = 0
-            for url in article_images:
-                if count >= 5: # Limit to 5 good images
-                    break
-                    
-                # 1. URL Keyword Filter
-                if any(term in url.lower() for term in ignore_terms):
-                    continue
-                
-                # 2. Fetch and Dimension Check
-                try:
-                    # If it's the top image, we prioritize it, but still check if it's not a tiny icon
-                    is_top_image = (url == article_images[0])
-                    
-                    temp_img = fetch_article_image(url)
-                    if temp_img:
-                        w, h = temp_img.size
-                        
-                        # Filter out small images
-                        if w < 300 or h < 200:
-                            print(f"Skipping small image: {url} ({w}x{h})")
-                            continue
-                            
-                        # Filter out extreme aspect ratios (banners or skyscrapers)
-                        aspect_ratio = w / h
-                        if aspect_ratio > 3.0 or aspect_ratio < 0.3:
-                            print(f"Skipping odd aspect ratio: {url} ({aspect_ratio:.2f})")
-                            continue
-
-                        # If we made it here, it's a valid image
-                        image_pool.append(temp_img)
-                        count += 1
-                        print(f"Added article image to pool: {url}")
-                    
-                except Exception as e:
-                    print(f"Error processing image {url}: {e}")
-                    continue
+            count("fallbacks", kind="imagen_failed")
+        if article_future is not None:
+            image_pool.extend(article_future.result())
         
         print(f"Total images in pool: {len(image_pool)}")
 
-        # 3. Create Visuals
-        sentences = [s.strip() for s in summary_text.split('.') if s.strip()]
-        if len(sentences) < 2:
-            sentences = [summary_text]
-            
-        clips = []
-        duration_per_slide = audio_clip.duration / len(sentences)
+        # 3. Create Visuals (the narration may still be synthesizing)
+        progress_callback("slides", 0.5)
+        with span("overlay"):
+            if segmented:
+                # Slides are composed per segment, and only for segments that are not cached.
+                backgrounds = slide_images(sentences, image_pool)
+            else:
+                slide_frames = compose_slides(sentences, image_pool)
 
-        for i, sentence in enumerate(sentences):
-            img = None
-            
-            # Pick image from pool
-            if image_pool:
-                # Cycle through the pool
-                img = image_pool[i % len(image_pool)]
-            
-            # Fallback to Black
-            if img is None:
-                print("Pool empty. Using fallback black image.")
-                img = generate_black_image()
-                
+        narration = audio_future.result()
+    
+    saved = report_stage_overlap(stage_timings, time.perf_counter() - media_start)
+    if timings is not None:
+        timings.update(stage_timings)
+        timings['saved'] = saved
+
+    progress_callback("encode", 0.7)
+    if segmented:
+        with span("encode"):
+            try:
+                render_segments(sentences, backgrounds, narration, output_path, workdir, create_text_overlay,
+                                settings, get_segment_cache())
+            except Exception as e:
+                print(f"Segment encode failed: {e}. Falling back to moviepy...")
+                count("fallbacks", kind="segments_to_moviepy")
+                from moviepy.editor import AudioFileClip
                 
-            img_with_text = create_text_overlay(sentence, img)
-            
-            temp_img_path = f"temp_slide_{i}.png"
-            img_with_text.save(temp_img_path)
-            
-            clip = ImageClip(temp_img_path).set_duration(duration_per_slide)
-            clips.append(clip)
-            
-        final_video = concatenate_videoclips(clips)
-        final_video = final_video.set_audio(audio_clip)
-        
-        final_video.write_videofile(output_path, fps=24, codec='libx264', audio_codec='aac')
-        
-        final_video.close()
-        audio_clip.close()
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-        for i in range(len(sentences)):
-            p = f"temp_slide_{i}.png"
-            if os.path.exists(p):
-                os.remove(p)
-            
+                durations = []
+                for path in narration:
+                    clip = AudioFileClip(path)
+                    durations.append(clip.duration)
+                    clip.close()
+                encode_slideshow_moviepy(compose_slides(sentences, image_pool), durations, narration,
+                                         output_path, workdir, settings)
+        progress_callback("done", 1.0)
         return output_path
+
+    from moviepy.editor import AudioFileClip
+    
+    audio_clip = AudioFileClip(audio_path)
+    audio_duration = audio_clip.duration
+    audio_clip.close()
+    duration_per_slide = audio_duration / len(sentences)
+    
+    with span("encode"):
+        encode_slideshow(slide_frames, [duration_per_slide] * len(slide_frames), audio_path,
+                         output_path, workdir, encode_settings)
+    progress_callback("done", 1.0)
         
-    except Exception as e:
-        print(f"Error generating video: {e}")
-        return None
+    return output_path
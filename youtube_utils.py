@@ -1,5 +1,30 @@
 from youtube_transcript_api import YouTubeTranscriptApi
 from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import os
+import re
+import threading
+
+import http_client
+from cache import DEFAULT_CACHE_DIR, DiskCache, content_hash
+from metrics import count, span
+
+TRANSCRIPT_CACHE_PATH = os.environ.get(
+    "NEWS_TRANSCRIPT_CACHE_PATH", os.path.join(DEFAULT_CACHE_DIR, "transcripts.sqlite3")
+)
+TRANSCRIPT_CACHE_TTL = float(os.environ.get("NEWS_TRANSCRIPT_CACHE_TTL", 30 * 24 * 3600))
+
+_transcript_cache = None
+_transcript_cache_lock = threading.Lock()
+
+def get_transcript_cache():
+    """Returns the process-wide transcript cache, opening it on first use."""
+    global _transcript_cache
+    with _transcript_cache_lock:
+        if _transcript_cache is None:
+            _transcript_cache = DiskCache(TRANSCRIPT_CACHE_PATH, ttl=TRANSCRIPT_CACHE_TTL)
+        return _transcript_cache
 
 def extract_video_id(url):
     """
@@ -27,55 +52,205 @@ def extract_video_id(url):
     except Exception:
         return None
 
-def get_video_transcript(video_id):
+def extract_playlist_id(url):
     """
-    Fetches the transcript for a YouTube video.
-    Tries to get English transcript first, then falls back to any available and translates to English.
+    Extracts the playlist ID from a YouTube URL, or returns the input if it already looks like one.
     
     Args:
-        video_id (str): The YouTube video ID.
+        url (str): A YouTube playlist URL (or watch URL with a list parameter), or a playlist ID.
         
     Returns:
-        str: The transcript text, or None if an error occurs.
+        str: The playlist ID, or None if not found.
     """
     try:
+        parsed_url = urlparse(url)
+        if parsed_url.hostname in ('www.youtube.com', 'youtube.com', 'm.youtube.com'):
+            p = parse_qs(parsed_url.query)
+            if 'list' in p:
+                return p['list'][0]
+            return None
+        if re.fullmatch(r'[\w-]{12,}', url):
+            return url
+        return None
+    except Exception:
+        return None
+
+def get_playlist_video_ids(url):
+    """
+    Lists the video IDs on a YouTube playlist or channel page, in page order.
+    
+    Args:
+        url (str): A playlist URL or ID, or a channel videos URL (e.g. https://www.youtube.com/@name/videos).
+        
+    Returns:
+        list: The video IDs found on the page.
+    """
+    playlist_id = extract_playlist_id(url)
+    if playlist_id:
+        url = f"https://www.youtube.com/playlist?list={playlist_id}"
+    response = http_client.get(url, headers={"Accept-Language": "en-US,en"})
+    response.raise_for_status()
+    video_ids = []
+    for video_id in re.findall(r'"videoId":"([\w-]{11})"', response.text):
+        if video_id not in video_ids:
+            video_ids.append(video_id)
+    return video_ids
+
+def _find_transcript(transcript_list, route=None):
+    """
+    Picks the transcript to fetch, trying the previously successful route first.
+    
+    Returns:
+        tuple: (transcript, route) where route records which language path was taken.
+    """
+    if route:
+        try:
+            transcript = transcript_list.find_transcript([route['source_language']])
+            if route['path'] == 'translated':
+                transcript = transcript.translate('en')
+            return transcript, route
+        except Exception:
+            pass
+    
+    # Try to get English transcript (manual or auto-generated)
+    try:
+        transcript = transcript_list.find_transcript(['en'])
+        path = 'en'
+    except Exception:
+        # If no English, get the first available and translate to English
         try:
-            transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-            
-            # Try to get English transcript (manual or auto-generated)
-            try:
-                transcript = transcript_list.find_transcript(['en'])
-            except Exception:
-                # If no English, get the first available and translate to English
+            transcript = transcript_list.find_transcript(['en-US', 'en-GB'])
+            path = 'en-variant'
+        except:
+            # Fallback to any transcript
+            transcript = next(iter(transcript_list))
+            path = 'original'
+            if not transcript.is_translatable:
+                 pass
+            else:
                 try:
-                    transcript = transcript_list.find_transcript(['en-US', 'en-GB'])
+                    source_language = transcript.language_code
+                    transcript = transcript.translate('en')
+                    return transcript, {'path': 'translated', 'source_language': source_language, 'language': 'en'}
                 except:
-                    # Fallback to any transcript
-                    transcript = next(iter(transcript_list))
-                    if not transcript.is_translatable:
-                         pass
-                    else:
-                        try:
-                            transcript = transcript.translate('en')
-                        except:
-                            pass
-
-            transcript_data = transcript.fetch()
-        except AttributeError:
-            # Fallback for instance-based API (non-standard library version)
-            try:
-                api = YouTubeTranscriptApi()
-                if hasattr(api, 'fetch'):
-                    transcript_obj = api.fetch(video_id)
-                    # Handle FetchedTranscript object with snippets
-                    if hasattr(transcript_obj, 'snippets'):
-                        return " ".join([s.text for s in transcript_obj.snippets])
-                    # Fallback if structure is different (e.g. list of dicts)
-                    return " ".join([str(s) for s in transcript_obj])
-            except Exception as inner_e:
-                return f"Error using fallback method: {str(inner_e)}"
-
-        transcript_text = " ".join([t['text'] for t in transcript_data])
-        return transcript_text
+                    pass
+    
+    return transcript, {'path': path, 'source_language': transcript.language_code, 'language': transcript.language_code}
+
+def _list_transcripts(video_id, api):
+    """Lists a video's transcripts with the 1.x instance API, or the legacy 0.x classmethod."""
+    if hasattr(api, 'list'):
+        return api().list(video_id)
+    return api.list_transcripts(video_id)
+
+def _transcript_lines(transcript_data):
+    """Caption lines of a fetched transcript: a 1.x FetchedTranscript or a legacy list of dicts."""
+    snippets = getattr(transcript_data, 'snippets', None)
+    if snippets is not None:
+        return [s.text for s in snippets]
+    return [t['text'] for t in transcript_data]
+
+def _fetch_transcript(video_id, api, route=None):
+    """
+    Fetches a transcript from YouTube.
+    
+    Returns:
+        tuple: (text, route). text starts with "Error" if the transcript could not be retrieved.
+    """
+    try:
+        transcript_list = _list_transcripts(video_id, api)
+        transcript, route = _find_transcript(transcript_list, route)
+        transcript_data = transcript.fetch()
+
+        # One caption per line, so preprocessing can drop repeated caption lines.
+        transcript_text = "\n".join(_transcript_lines(transcript_data))
+        return transcript_text, route
     except Exception as e:
-        return f"Error: {str(e)}"
+        return f"Error: {str(e)}", None
+
+def get_video_transcript(video_id, use_cache=True, api=YouTubeTranscriptApi):
+    """
+    Fetches the transcript for a YouTube video.
+    Tries to get English transcript first, then falls back to any available and translates to English.
+    
+    Transcripts are cached on disk by video ID and resolved language, along
+    with the language path that worked, so later fetches skip the cascade.
+    
+    Args:
+        video_id (str): The YouTube video ID.
+        use_cache (bool): Whether to read from and write to the transcript cache.
+        api: The transcript API class; tests and benchmarks can pass a local stand-in.
+        
+    Returns:
+        str: The transcript text, or an error message starting with "Error" if it could not be retrieved.
+    """
+    with span("transcript"):
+        return _get_video_transcript(video_id, use_cache, api)
+
+def _get_video_transcript(video_id, use_cache, api):
+    cache = None
+    route = None
+    route_key = content_hash("route", video_id)
+    if use_cache:
+        try:
+            cache = get_transcript_cache()
+            cached_route = cache.get(route_key)
+            if cached_route is not None:
+                route = json.loads(cached_route)
+                cached_text = cache.get(content_hash("text", video_id, route['language']))
+                if cached_text is not None:
+                    count("cache_hits", cache="transcript")
+                    return cached_text
+            count("cache_misses", cache="transcript")
+        except Exception as e:
+            print(f"Transcript cache unavailable: {e}")
+            cache = None
+
+    with span("transcript_fetch"):
+        text, route = _fetch_transcript(video_id, api, route)
+    if route is None:
+        count("errors", stage="transcript")
+    elif route['path'] != 'en':
+        # Anything but a direct English transcript is a step down the fallback cascade.
+        count("fallbacks", kind=f"transcript_{route['path'].replace('-', '_')}")
+    if cache is not None and route is not None and text and not text.startswith("Error"):
+        try:
+            cache.set(route_key, json.dumps(route))
+            cache.set(content_hash("text", video_id, route['language']), text)
+        except Exception as e:
+            print(f"Failed to cache transcript: {e}")
+    return text
+
+def get_video_transcripts(video_ids, max_workers=4, use_cache=True, api=YouTubeTranscriptApi):
+    """
+    Fetches transcripts for many videos concurrently.
+    
+    Args:
+        video_ids (list): YouTube video IDs.
+        max_workers (int): Maximum concurrent fetches.
+        use_cache (bool): Whether to use the transcript cache.
+        api: The transcript API class, see get_video_transcript.
+        
+    Yields:
+        tuple: (video_id, transcript) in completion order; transcript is as returned by get_video_transcript.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(get_video_transcript, video_id, use_cache, api): video_id
+                   for video_id in dict.fromkeys(video_ids)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def get_playlist_transcripts(url, max_workers=4, use_cache=True, api=YouTubeTranscriptApi):
+    """
+    Fetches transcripts for every video on a playlist or channel page.
+    
+    Args:
+        url (str): Playlist URL/ID or channel videos URL.
+        max_workers (int): Maximum concurrent fetches.
+        
+    Returns:
+        dict: Transcript text (or error message) keyed by video ID, in page order.
+    """
+    video_ids = get_playlist_video_ids(url)
+    results = dict(get_video_transcripts(video_ids, max_workers=max_workers, use_cache=use_cache, api=api))
+    return {video_id: results[video_id] for video_id in video_ids}